@@ -0,0 +1 @@
+"""Helpers shared by the Everything{company} agents."""
@@ -0,0 +1,228 @@
+"""
+Shared async HTTP client for the agents.
+
+All upstream calls (company websites, NewsAPI, Yahoo Finance, Alpha Vantage,
+Hugging Face and Gemini) go through one aiohttp session per agent process, so
+connections are pooled and kept alive and a slow upstream no longer stalls the
+uagents event loop.
+"""
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from common.rate_limit import PRIORITY_RETRY, parse_retry_after, rate_limits
+
+# Pool and timeout configuration, overridable per deployment
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "30"))  # Total seconds per request
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))  # Across all hosts
+HTTP_PER_HOST_LIMIT = int(os.environ.get("HTTP_PER_HOST_LIMIT", "10"))  # Concurrent requests per host
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", "30"))
+RATE_LIMIT_RETRIES = int(os.environ.get("RATE_LIMIT_RETRIES", "3"))  # Resends after a 429 from a rate-limited upstream
+
+
+class HttpError(Exception):
+    """Raised for connection failures, timeouts and HTTP error statuses"""
+
+    def __init__(self, message: str, status: Optional[int] = None, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class HttpResponse:
+    """A fully read response exposing the parts of requests.Response the agents use"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes,
+                 encoding: Optional[str] = None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HttpError(f"{self.status_code} error for url: {self.url}",
+                            status=self.status_code, headers=self.headers)
+
+
+class StreamingResponse:
+    """A response whose body is read incrementally, optionally stopping at a byte cap"""
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+        self.url = str(response.url)
+        self.status_code = response.status
+        self.headers = dict(response.headers)
+        self.encoding = response.charset or "utf-8"
+        self.bytes_read = 0
+        self.truncated = False  # True when max_bytes cut the body short
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HttpError(f"{self.status_code} error for url: {self.url}",
+                            status=self.status_code, headers=self.headers)
+
+    async def iter_chunks(self, chunk_size: int = 16384, max_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield the body in chunks; stops after max_bytes without reading the rest"""
+        async for chunk in self._response.content.iter_chunked(chunk_size):
+            if max_bytes is not None and self.bytes_read + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - self.bytes_read]
+                self.truncated = True
+            self.bytes_read += len(chunk)
+            if chunk:
+                yield chunk
+            if self.truncated:
+                return
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP client with per-host concurrency limits"""
+
+    def __init__(self,
+                 timeout: float = HTTP_TIMEOUT,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 max_connections: int = HTTP_MAX_CONNECTIONS,
+                 per_host_limit: int = HTTP_PER_HOST_LIMIT,
+                 keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 host_limits: Optional[Dict[str, int]] = None):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.host_limits = dict(host_limits or {})
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def set_host_limit(self, host: str, limit: int):
+        """Override the concurrency limit for a single host"""
+        self.host_limits[host] = limit
+        self._host_semaphores.pop(host, None)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # The session has to be created inside the running event loop, so do it lazily
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            )
+        return self._session
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_limits.get(host, self.per_host_limit))
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def request(self, method: str, url: str, *,
+                      params: Optional[Dict[str, Any]] = None,
+                      headers: Optional[Dict[str, str]] = None,
+                      json: Any = None,
+                      data: Any = None,
+                      timeout: Optional[float] = None,
+                      upstream: Optional[str] = None,
+                      priority: Optional[int] = None) -> HttpResponse:
+        """
+        Send a request and read the whole body; raises HttpError on network failures.
+        With upstream set, the request waits its turn under that upstream's rate limit and
+        is resent (up to RATE_LIMIT_RETRIES times) after the server asks it to slow down.
+        """
+        if upstream is None:
+            return await self._send(method, url, params, headers, json, data, timeout)
+
+        limiter = rate_limits.get(upstream)
+        for _ in range(RATE_LIMIT_RETRIES + 1):
+            await limiter.acquire(priority)
+            response = await self._send(method, url, params, headers, json, data, timeout)
+            retry_after = parse_retry_after(response.headers)
+            if response.status_code != 429 and not (response.status_code == 503 and retry_after is not None):
+                if response.status_code < 400:
+                    limiter.record_success()
+                return response
+            limiter.backoff(retry_after)
+            # Already delayed once, so go ahead of requests that have not been sent yet
+            priority = PRIORITY_RETRY
+        return response
+
+    async def _send(self, method: str, url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]],
+                    json: Any, data: Any, timeout: Optional[float]) -> HttpResponse:
+        if params is not None:
+            # Like requests, leave out parameters set to None (e.g. an API key that is not configured)
+            params = {key: value for key, value in params.items() if value is not None}
+        request_timeout = None
+        if timeout is not None:
+            request_timeout = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, self.connect_timeout))
+
+        async with self._host_semaphore(url):
+            try:
+                async with self._get_session().request(
+                    method, url, params=params, headers=headers, json=json, data=data,
+                    timeout=request_timeout
+                ) as response:
+                    content = await response.read()
+                    return HttpResponse(str(response.url), response.status, dict(response.headers),
+                                        content, response.charset)
+            except asyncio.TimeoutError as e:
+                raise HttpError(f"Request to {url} timed out") from e
+            except aiohttp.ClientError as e:
+                raise HttpError(f"Request to {url} failed: {str(e)}") from e
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, *,
+                     params: Optional[Dict[str, Any]] = None,
+                     headers: Optional[Dict[str, str]] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[StreamingResponse]:
+        """Send a request and hand back the response before its body is read"""
+        request_timeout = None
+        if timeout is not None:
+            request_timeout = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, self.connect_timeout))
+
+        async with self._host_semaphore(url):
+            try:
+                async with self._get_session().request(
+                    method, url, params=params, headers=headers, timeout=request_timeout
+                ) as response:
+                    yield StreamingResponse(response)
+            except asyncio.TimeoutError as e:
+                raise HttpError(f"Request to {url} timed out") from e
+            except aiohttp.ClientError as e:
+                raise HttpError(f"Request to {url} failed: {str(e)}") from e
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        """Close pooled connections; call from the agent's shutdown hook"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._host_semaphores.clear()
+
+
+# One client per agent process so every handler shares the same connection pool
+http_client = HttpClient()
@@ -0,0 +1,144 @@
+"""
+Content-addressed cache for LLM responses.
+
+Remote LLM calls are the slowest and most expensive hop in the pipeline, and
+the same prompt is often sent again for a company profiled recently. Responses
+are stored in a SQLite file shared by all agents, keyed by a hash of the model,
+prompt and generation parameters, with a TTL chosen by each call site and
+least-recently-used eviction once the cache grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_cache.sqlite3")
+)
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") != "0"
+
+
+def cache_key(model: str, prompt: str, params: Optional[dict] = None) -> str:
+    """Stable key for a model call; any change to model, prompt or parameters is a new entry"""
+    material = json.dumps({"model": model, "prompt": prompt, "params": params or {}}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response cache with per-entry TTL and size-bounded LRU eviction"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._db: Optional[sqlite3.Connection] = None
+        self._bytes_written = 0  # Since the last size check
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            # Several agent processes share the file, so use WAL and wait on locks
+            self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT, size INTEGER, expires_at REAL, last_access REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached response for key, or None if missing or expired"""
+        if not self.enabled:
+            return None
+        db = self._connect()
+        now = time.time()
+        row = db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            db.commit()
+            return None
+        db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        db.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable response for ttl seconds"""
+        if not self.enabled or ttl <= 0:
+            return
+        db = self._connect()
+        now = time.time()
+        encoded = json.dumps(value)
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, encoded, len(encoded), now + ttl, now)
+        )
+        db.commit()
+        self._bytes_written += len(encoded)
+        if self._bytes_written > self.max_bytes // 10:
+            self.evict()
+
+    async def get_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]],
+                           parse: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Return the cached response, or await fetch() and cache what it returns. With parse, the result is
+        parse(response), and a response is only cached once parse accepts it: a reply that raises in parse
+        (an empty or malformed completion) propagates like a failed call and is never stored. A cached entry
+        that no longer parses is dropped and fetched again.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            if parse is None:
+                return cached
+            try:
+                return parse(cached)
+            except Exception:
+                self.delete(key)
+        value = await fetch()
+        parsed = value if parse is None else parse(value)
+        self.set(key, value, ttl)
+        return parsed
+
+    def delete(self, key: str):
+        if not self.enabled:
+            return
+        db = self._connect()
+        db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        db.commit()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        db = self._connect()
+        removed = db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            rows = db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+            victims = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                victims.append((key,))
+                excess -= size
+            db.executemany("DELETE FROM responses WHERE key = ?", victims)
+            removed += len(victims)
+        db.commit()
+        self._bytes_written = 0
+        return removed
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# One cache handle per agent process; all agents share the same file by default
+llm_cache = LLMCache()
@@ -0,0 +1,211 @@
+"""
+Per-upstream rate limiting for the agents' API calls.
+
+Alpha Vantage, NewsAPI, Yahoo, Hugging Face and Gemini all enforce per-minute
+and/or per-day quotas. Each upstream gets a token bucket sized so that no 60
+second window exceeds its per-minute limit, plus a daily counter. Requests over
+the limit wait in a priority queue instead of failing, so interactive requests
+go ahead of batch work. A 429 (or a 503 with Retry-After) pauses the upstream
+for the time the server asks for and halves its rate, which then recovers
+gradually as requests succeed.
+
+Limits apply per agent process. Override them with RATE_LIMIT_<UPSTREAM>,
+set to "per_minute,per_day", where 0 means no limit. For example:
+RATE_LIMIT_NEWSAPI=30,1000
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Lower numbers are served first
+PRIORITY_RETRY = 0  # Requests already turned away once by a 429
+PRIORITY_NORMAL = 10
+PRIORITY_BATCH = 20
+
+# Priority used for requests made by the current task; batch handlers lower it for everything they call
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_NORMAL)
+
+# (per minute, per day) defaults matching each provider's free tier; None means unlimited
+DEFAULT_LIMITS: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "alphavantage": (5, 25),
+    "newsapi": (None, 100),
+    "yahoo": (60, None),
+    "huggingface": (60, None),
+    "gemini": (15, 1500),
+}
+DEFAULT_BACKOFF = float(os.environ.get("RATE_LIMIT_DEFAULT_BACKOFF", "5"))  # Seconds paused after a 429 without Retry-After
+MAX_BACKOFF = float(os.environ.get("RATE_LIMIT_MAX_BACKOFF", "120"))
+MIN_RATE_SCALE = 0.1  # Rate never drops below this fraction of the configured limit
+RATE_RECOVERY_STEP = 0.1  # Fraction of the configured rate regained per successful request
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an upstream's daily quota is used up; waiting in the queue would not help"""
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP date), if present"""
+    value = None
+    for key, header_value in headers.items():
+        if key.lower() == "retry-after":
+            value = header_value.strip()
+            break
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def configured_limits(name: str) -> Tuple[Optional[int], Optional[int]]:
+    """Limits for an upstream: RATE_LIMIT_<NAME> if set, else the default"""
+    value = os.environ.get(f"RATE_LIMIT_{name.upper()}")
+    if value is None:
+        return DEFAULT_LIMITS.get(name, (None, None))
+    per_minute, _, per_day = value.partition(",")
+    return (int(per_minute) or None if per_minute.strip() else None,
+            int(per_day) or None if per_day.strip() else None)
+
+
+class TokenBucket:
+    """Refilling bucket; capacity plus a minute of refill never exceeds the per-minute limit"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = max(1, per_minute // 5)
+        self.rate = max(per_minute - self.capacity, 1) / 60.0  # Tokens per second
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float, scale: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate * scale)
+        self.updated = now
+
+    def delay(self, now: float, scale: float = 1.0) -> float:
+        """Seconds until a token is available"""
+        self._refill(now, scale)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / (self.rate * scale)
+
+    def take(self):
+        self.tokens -= 1
+
+
+class DailyQuota:
+    """Counter of requests made in the current UTC day"""
+
+    def __init__(self, per_day: int):
+        self.limit = per_day
+        self.day = time.gmtime().tm_yday
+        self.used = 0
+
+    def remaining(self) -> int:
+        day = time.gmtime().tm_yday
+        if day != self.day:
+            self.day = day
+            self.used = 0
+        return self.limit - self.used
+
+    def take(self):
+        self.used += 1
+
+
+class UpstreamLimiter:
+    """Paces requests to one upstream, serving queued requests in priority order"""
+
+    def __init__(self, name: str, per_minute: Optional[int] = None, per_day: Optional[int] = None):
+        self.name = name
+        self.bucket = TokenBucket(per_minute) if per_minute else None
+        self.quota = DailyQuota(per_day) if per_day else None
+        self.scale = 1.0  # Fraction of the configured rate currently used; lowered by 429s
+        self.blocked_until = 0.0  # Monotonic time before which nothing is sent
+        self.throttled = 0  # 429s seen
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()  # FIFO within a priority
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: Optional[int] = None):
+        """Wait for permission to send one request; raises RateLimitExceeded once the daily quota is spent"""
+        if self.quota is not None and self.quota.remaining() <= 0:
+            raise RateLimitExceeded(f"Daily quota of {self.quota.limit} requests to {self.name} is used up")
+        if self.bucket is None and self.quota is None and not self._waiters and time.monotonic() >= self.blocked_until:
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (request_priority.get() if priority is None else priority,
+                                       next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():  # Caller gave up while queued
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            delay = self.blocked_until - now
+            if self.bucket is not None:
+                delay = max(delay, self.bucket.delay(now, self.scale))
+            if delay > 0:
+                # Re-check the head afterwards; a higher-priority request may have arrived
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(self._waiters)
+            if self.quota is not None and self.quota.remaining() <= 0:
+                future.set_exception(RateLimitExceeded(
+                    f"Daily quota of {self.quota.limit} requests to {self.name} is used up"))
+                continue
+            if self.bucket is not None:
+                self.bucket.take()
+            if self.quota is not None:
+                self.quota.take()
+            future.set_result(None)
+
+    def backoff(self, retry_after: Optional[float] = None):
+        """The upstream said slow down: pause it and halve the rate"""
+        self.throttled += 1
+        pause = min(retry_after if retry_after is not None else DEFAULT_BACKOFF, MAX_BACKOFF)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+        self.scale = max(MIN_RATE_SCALE, self.scale / 2)
+
+    def record_success(self):
+        self.scale = min(1.0, self.scale + RATE_RECOVERY_STEP)
+
+
+class RateLimits:
+    """Registry of per-upstream limiters, created on first use from the configured limits"""
+
+    def __init__(self):
+        self._limiters: Dict[str, UpstreamLimiter] = {}
+
+    def get(self, name: str) -> UpstreamLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            limiter = UpstreamLimiter(name, *configured_limits(name))
+            self._limiters[name] = limiter
+        return limiter
+
+    def configure(self, name: str, per_minute: Optional[int] = None, per_day: Optional[int] = None):
+        """Replace an upstream's limits, e.g. for a paid plan"""
+        self._limiters[name] = UpstreamLimiter(name, per_minute, per_day)
+
+    async def acquire(self, name: str, priority: Optional[int] = None):
+        await self.get(name).acquire(priority)
+
+
+# One registry per agent process, shared by every request it makes
+rate_limits = RateLimits()
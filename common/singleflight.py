@@ -0,0 +1,49 @@
+"""
+Single-flight deduplication of in-progress work.
+
+When a batch names the same company twice, or two callers ask about the same
+ticker at once, each request used to repeat the full upstream round trip and
+spend NewsAPI, Alpha Vantage and LLM quota twice. SingleFlight runs the first
+call for a key and lets every concurrent caller with the same key await that
+one result. Nothing is kept once the call finishes; caching is left to the
+caches.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0  # Executions started
+        self.shared = 0  # Callers that joined an execution already in flight
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await func() for the first caller with this key; concurrent callers share its result or exception.
+        The result is shared between callers, so copy it before changing it.
+        """
+        future = self._calls.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda finished: self._finish(key, finished))
+        else:
+            self.shared += 1
+        # A caller that is cancelled must not cancel the work other callers are waiting on
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, finished: asyncio.Future):
+        if self._calls.get(key) is finished:
+            del self._calls[key]
+        if not finished.cancelled():
+            finished.exception()  # Mark the exception retrieved even if every caller has gone
@@ -0,0 +1,134 @@
+"""
+Summaries that never wait on a slow model.
+
+News summaries and website extraction come from a remote Hugging Face model
+that can take a minute or fail outright. SUMMARIZER_BACKEND picks one of three
+behaviours:
+
+- "remote": always wait for the model.
+- "local": never call it.
+- "auto" (default): give the model SUMMARY_LATENCY_BUDGET seconds.
+
+When the model misses its budget, the caller uses a local extractive summary:
+TextRank over TF-IDF sentence vectors, computed with NumPy in a few
+milliseconds. The late model call is left running, and its response lands in
+the LLM cache, so the next request for the same content gets the model's
+summary.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from typing import Awaitable, Callable, Hashable, List, Optional, Sequence, TypeVar, Union
+
+import numpy as np
+
+from common.singleflight import SingleFlight
+from common.tasks import spawn
+
+SUMMARIZER_BACKEND = os.environ.get("SUMMARIZER_BACKEND", "auto")  # "auto", "remote" or "local"
+SUMMARY_LATENCY_BUDGET = float(os.environ.get("SUMMARY_LATENCY_BUDGET", "8"))  # Seconds the model gets in auto mode
+SUMMARIZER_BACKENDS = ("auto", "remote", "local")
+
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+MIN_SENTENCE_WORDS = 4
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+WORD = re.compile(r"[a-z0-9][a-z0-9'-]*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their this to was "
+    "were will with we our you your they he she his her them than then so not no can more most all also".split()
+)
+
+T = TypeVar("T")
+
+# Model calls in progress, keyed by their LLM cache key, so a request arriving while a late call is still
+# running waits on that call instead of sending the same prompt again
+model_flights = SingleFlight()
+
+
+def split_sentences(text: Union[str, Sequence[str]]) -> List[str]:
+    """Sentences of a text (or of each text in a list) with at least MIN_SENTENCE_WORDS words, duplicates dropped"""
+    texts = [text] if isinstance(text, str) else text
+    sentences, seen = [], set()
+    for part in texts:
+        for sentence in SENTENCE_BREAK.split(part or ""):
+            sentence = " ".join(sentence.split())
+            key = sentence.lower()
+            if len(sentence.split()) >= MIN_SENTENCE_WORDS and key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+    return sentences
+
+
+def rank_sentences(sentences: Sequence[str]) -> np.ndarray:
+    """TextRank score per sentence, over cosine similarities of TF-IDF vectors"""
+    tokens = [[word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS] for sentence in sentences]
+    vocabulary = {word: i for i, word in enumerate(sorted({word for words in tokens for word in words}))}
+    n = len(sentences)
+    if n == 0 or not vocabulary:
+        return np.ones(n)
+
+    counts = np.zeros((n, len(vocabulary)))
+    rows = np.repeat(np.arange(n), [len(words) for words in tokens])
+    columns = np.array([vocabulary[word] for words in tokens for word in words], dtype=np.int64)
+    np.add.at(counts, (rows, columns), 1.0)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    tfidf = counts * (np.log((1 + n) / (1 + document_frequency)) + 1)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0.0)
+    totals = similarity.sum(axis=1, keepdims=True)
+    # Sentences similar to nothing pass their score evenly to everyone
+    transition = np.divide(similarity, totals, out=np.full_like(similarity, 1.0 / n), where=totals > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(TEXTRANK_ITERATIONS):
+        updated = (1 - TEXTRANK_DAMPING) / n + TEXTRANK_DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(text: Union[str, Sequence[str]], max_sentences: int = 3, max_chars: int = 600) -> str:
+    """The highest-ranked sentences, in their original order, within max_sentences and max_chars"""
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+    chosen, length = [], 0
+    for i in np.argsort(-rank_sentences(sentences), kind="stable"):
+        if len(chosen) == max_sentences:
+            break
+        if chosen and length + len(sentences[i]) > max_chars:
+            continue
+        chosen.append(i)
+        length += len(sentences[i]) + 1
+    return " ".join(sentences[i] for i in sorted(chosen))[:max_chars]
+
+
+async def call_with_budget(call: Callable[[], Awaitable[T]], key: Optional[Hashable] = None,
+                           backend: str = SUMMARIZER_BACKEND, budget: float = SUMMARY_LATENCY_BUDGET,
+                           logger: Optional[logging.Logger] = None) -> Optional[T]:
+    """
+    Result of a remote model call, or None when the caller should use its local summary instead: with the
+    local backend, or in auto mode once the budget runs out. A call that misses the budget keeps running in
+    the background so its response is cached for next time. Errors from the call are raised as usual.
+    Calls with the same key (the LLM cache key) run once and share the result, so copy it before changing it.
+    """
+    if backend == "local":
+        return None
+    if key is not None:
+        call = (lambda shared=call: model_flights.do(key, shared))
+    if backend == "remote":
+        return await call()
+    task = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({task}, timeout=budget)
+    if task in done:
+        return task.result()
+    (logger or logging.getLogger(__name__)).info(f"Model missed its {budget:g}s budget; using the local summary")
+    spawn(task, logger)
+    return None
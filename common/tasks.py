@@ -0,0 +1,42 @@
+"""
+Background task helper for message handlers.
+
+uagents awaits message handlers one at a time, so a handler that waits on an
+upstream API holds up every message queued behind it. Handlers hand their work
+to spawn() instead, which lets many requests be in flight in one agent process.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Coroutine, Iterable, List, Optional, Set
+
+# Strong references so running tasks are not garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine, logger: Optional[logging.Logger] = None) -> asyncio.Task:
+    """Run a coroutine in the background and log any exception it raises"""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+
+    def _on_done(finished: asyncio.Task):
+        _background_tasks.discard(finished)
+        if finished.cancelled():
+            return
+        error = finished.exception()
+        if error is not None:
+            (logger or logging.getLogger(__name__)).error(f"Background task failed: {str(error)}")
+
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def gather_limited(func: Callable[[Any], Awaitable[Any]], items: Iterable[Any], limit: int) -> List[Any]:
+    """Run func over items with at most `limit` in flight; exceptions are returned in place of results"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
@@ -0,0 +1,162 @@
+"""
+Batch profiling for the conductor.
+
+Reads websites or company names from a file (JSONL or one entry per line),
+runs them through the profile pipeline with a fixed concurrency window and
+streams each finished profile to a JSONL output file as soon as it is ready.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, Optional
+
+BATCH_CONCURRENCY = 50  # Profiles in flight at once
+
+
+@dataclass
+class BatchItem:
+    website: Optional[str] = None
+    company_name: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return self.website or self.company_name or ""
+
+
+@dataclass
+class BatchStats:
+    total: int = 0
+    succeeded: int = 0  # Every stage finished
+    partial: int = 0  # Profile produced but some stages failed
+    failed: int = 0  # No usable profile
+    elapsed: float = 0.0  # Seconds
+
+    @property
+    def throughput(self) -> float:
+        """Profiles per second"""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+
+def looks_like_website(value: str) -> bool:
+    return value.startswith("http") or ("." in value and " " not in value)
+
+
+def _text(value: Any) -> Optional[str]:
+    """A JSON field as a non-empty string, or None"""
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def parse_batch_line(line: str) -> Optional[BatchItem]:
+    """
+    Turn one input line into a BatchItem; accepts JSON objects, JSON strings or plain text.
+    Raises json.JSONDecodeError for a line that starts like JSON but does not parse.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    value: Any = line
+    if line[0] in "{\"":
+        value = json.loads(line)
+    if isinstance(value, dict):
+        website = _text(value.get("website") or value.get("company_website") or value.get("url"))
+        company_name = _text(value.get("company_name") or value.get("name"))
+        if not website and not company_name:
+            return None
+        return BatchItem(website=website, company_name=company_name)
+    value = str(value).strip()
+    if looks_like_website(value):
+        return BatchItem(website=value)
+    return BatchItem(company_name=value)
+
+
+def read_batch_file(path: str, logger: Optional[logging.Logger] = None) -> Iterator[BatchItem]:
+    """Lazily read batch items so large input files are never fully loaded; malformed lines are skipped"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            try:
+                item = parse_batch_line(line)
+            except json.JSONDecodeError as e:
+                (logger or logging.getLogger(__name__)).warning(f"Skipping line {number} of {path}: {str(e)}")
+                continue
+            if item is not None:
+                yield item
+
+
+def resolve_batch_path(name: str, directory: str) -> str:
+    """
+    Path of a batch file named in a remote request, which must stay inside directory.
+    Raises ValueError for absolute paths or names that lead outside it (.., symlinks).
+    """
+    if not name or os.path.isabs(name):
+        raise ValueError(f"Batch file must be a relative name inside the batch directory: {name!r}")
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"Batch file is outside the batch directory: {name!r}")
+    return path
+
+
+async def run_batch(items: Iterable[BatchItem],
+                    profile: Callable[[BatchItem], Awaitable[Any]],
+                    output_path: str,
+                    concurrency: int = BATCH_CONCURRENCY,
+                    classify: Optional[Callable[[Any], str]] = None,
+                    logger: Optional[logging.Logger] = None) -> BatchStats:
+    """
+    Profile every item with at most `concurrency` in flight and append results to output_path.
+
+    `profile` returns a uagents Model (or anything with .dict()); `classify` maps a result to
+    "succeeded", "partial" or "failed". Items are only pulled from the input when a worker is
+    free, so a slow pipeline applies backpressure to the reader instead of queuing everything.
+    """
+    logger = logger or logging.getLogger(__name__)
+    concurrency = max(1, concurrency)  # With no workers every item would be dropped
+    stats = BatchStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    started = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        def write(record: Dict[str, Any]):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                try:
+                    result = await profile(item)
+                    outcome = classify(result) if classify else "succeeded"
+                    write({"input": item.label, "status": outcome, "profile": json.loads(result.json())})
+                except Exception as e:
+                    outcome = "failed"
+                    write({"input": item.label, "status": outcome, "error": str(e)})
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+                stats.total += 1
+                if stats.total % 100 == 0:
+                    logger.info(f"Batch progress: {stats.total} profiled, {stats.failed} failed")
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        try:
+            for item in items:
+                await queue.put(item)  # Blocks while every worker is busy and the queue is full
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+    stats.elapsed = time.monotonic() - started
+    logger.info(f"Batch finished: {stats.total} profiles in {stats.elapsed:.1f}s "
+                f"({stats.throughput:.2f}/s), {stats.succeeded} complete, {stats.partial} partial, "
+                f"{stats.failed} failed")
+    return stats
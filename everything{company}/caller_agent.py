@@ -1,10 +1,24 @@
+import json
+import os
+import sys
 from uagents import Agent, Context, Model
 from typing import List, Optional, Dict, Any
 
+# Make the shared helpers in common/ importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.tasks import spawn
+from batch import BatchItem, read_batch_file, resolve_batch_path, run_batch
+from orchestrator import Orchestrator, Stage, StageTiming
+from partials import PARTIAL_SUBSCRIBERS, PartialStream
+from sessions import ProfileSession, SessionTable
+
 agent = Agent(name="company_requestor", port=8003)
 
 # Replace with the website you want to get information about
 WEBSITE_URL = "apple.com"
+# Optionally set the company name too, so news and ticker lookups start without waiting for the website
+COMPANY_NAME = None
 
 COMPANY_INFO_PROCESSOR_ADDRESS = "agent1qtz02l3radupfymrepmcmvjfpwd9c6zrql5u8hfykvqvaxm2wumm7rx0txw"
 TICKER_ADDRESS="agent1qd7wrm64tupqvtkpwu3ds5awmk30fmwnedr4fm36ty5na97aawjrc0p9mx9"
@@ -14,20 +28,41 @@ REVENUE_ADDRESS="agent1qwg43f9euf5vdtz5kxkz6mdch32sjgdqjdlx0n4un5lzpmj64ws85gfyd
 NEWS_AGENT_ADDRESS = "agent1qdsxvhmlg9mqlnqvujvs7cxf3x5yhglsqylgdgqfc0r0tfpx8yre6ghhh8s"
 MAX_NEWS_ARTICLES = 20
 
-# State variables
-company_data = None
-news_data = None
+# Seconds each branch of the profile may take before it is given up on
+STAGE_DEADLINES = {
+    "website": 60.0,
+    "news": 90.0,
+    "ticker": 30.0,
+    "revenue": 120.0
+}
+
+# Batch mode: set BATCH_INPUT to a JSONL or plain-text file of websites/company names
+# to profile all of them on startup instead of WEBSITE_URL
+BATCH_INPUT = os.environ.get("BATCH_INPUT")
+BATCH_OUTPUT = os.environ.get("BATCH_OUTPUT", "profiles.jsonl")
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "50"))  # Clamped to 1..MAX_SESSIONS
+# Only directory a BatchProfileRequest may read its input from or write its profiles to
+BATCH_DIR = os.environ.get("BATCH_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "batches"))
+
+# In-progress profiles keyed by the request ID carried on every message
+SESSION_TTL = 600.0  # Seconds
+MAX_SESSIONS = 1000
+sessions = SessionTable(ttl=SESSION_TTL, max_sessions=MAX_SESSIONS)
+# Versioned partial profiles, published as each stage lands
+partial_stream = PartialStream()
 
 # Models for news agent
 class NewsRequest(Model):
     """Model for news request"""
     company_name: str
     max_articles: Optional[int] = 20
+    request_id: Optional[str] = None
 
 class NewsSummary(Model):
     """Model for news summary"""
     overall_sentiment: str
     summary: str
+    sentiment_trend: Optional[Dict[str, Optional[float]]] = None  # Decayed and 1d/7d/30d average compound
 
 class Article(Model):
     """Model for a news article"""
@@ -38,6 +73,7 @@ class Article(Model):
     published_at: Optional[str] = ""
     content: Optional[str] = None
     sentiment: Optional[Dict[str, float]] = None  # Added sentiment field
+    duplicate_count: int = 1  # Near-identical copies of this story found, itself included
 
 
 class NewsResponse(Model):
@@ -46,14 +82,17 @@ class NewsResponse(Model):
     articles: List[Article]
     total_results: int
     summary: Optional[NewsSummary] = None  # Added summary field
+    request_id: Optional[str] = None
 
 
 class Request(Model):
     website: str
+    request_id: Optional[str] = None
 
 
 class Error(Model):
     text: str
+    request_id: Optional[str] = None
 
 
 class CompanyData(Model):
@@ -68,17 +107,21 @@ class CompanyData(Model):
     # Optional fields that might be extracted if available
     contact_info: str = "Not found"
     social_media: str = "Not found"
+    request_id: Optional[str] = None
 
 class CompanyRequest(Model):
     company_name: str
+    request_id: Optional[str] = None
 
 class TickerResponse(Model):
     company_name: str
     ticker: str
     success: bool
     message: str
+    request_id: Optional[str] = None
 class overviewRequest(Model):
     ticker :str
+    request_id: Optional[str] = None
 
 class CompanyAnalysis(Model):
     company_overview_summary: str
@@ -88,21 +131,329 @@ class CompanyAnalysis(Model):
     financial_health_summary: str
     stock_performance_summary: str
     analyst_sentiment_summary: str
+    request_id: Optional[str] = None
 
 class RequestsModel(Model):
     company_website: str
 
+class ProfileRequest(Model):
+    """Ask the conductor for a full profile; give a website, a company name or both"""
+    website: Optional[str] = None
+    company_name: Optional[str] = None
+    request_id: Optional[str] = None  # Echoed back on the CompanyProfile
+    stream_partials: bool = False  # Also send a PartialProfile to the sender each time a stage finishes
+
+class CompanyProfile(Model):
+    """Merged result of every agent in the pipeline"""
+    request_id: Optional[str] = None
+    website: Optional[str] = None
+    company_name: Optional[str] = None
+    company_data: Optional[CompanyData] = None
+    news: Optional[NewsResponse] = None
+    ticker: Optional[TickerResponse] = None
+    analysis: Optional[CompanyAnalysis] = None
+    stage_latencies: Dict[str, float] = {}  # Seconds per stage
+    critical_path: List[str] = []
+    total_latency: float = 0.0
+    errors: Dict[str, str] = {}
+
+class PartialProfile(Model):
+    """Profile so far, published each time a stage finishes; a higher version supersedes a lower one"""
+    request_id: str
+    version: int
+    stage: str  # Stage that finished, failed or was skipped to produce this version
+    final: bool = False  # True once every stage is done
+    website: Optional[str] = None
+    company_name: Optional[str] = None
+    company_data: Optional[CompanyData] = None
+    news: Optional[NewsResponse] = None
+    ticker: Optional[TickerResponse] = None
+    analysis: Optional[CompanyAnalysis] = None
+    stage_latencies: Dict[str, float] = {}  # Seconds per finished stage
+    errors: Dict[str, str] = {}
+
+class BatchProfileRequest(Model):
+    """Profile many companies; give the items inline or the name of a batch file in the conductor's BATCH_DIR"""
+    items: List[ProfileRequest] = []
+    input_path: Optional[str] = None  # Relative to BATCH_DIR
+    output_path: str = "profiles.jsonl"  # Relative to BATCH_DIR
+    concurrency: Optional[int] = None
+    request_id: Optional[str] = None
+
+class BatchProfileSummary(Model):
+    """Sent when a batch finishes; the profiles themselves are in output_path"""
+    total: int
+    succeeded: int
+    partial: int
+    failed: int
+    elapsed: float  # Seconds
+    throughput: float  # Profiles per second
+    output_path: str
+    request_id: Optional[str] = None
+    error: Optional[str] = None  # Set when the batch was rejected or could not run
+
+
+def clean_company_name(name: str) -> str:
+    """Strip JSON debris and legal suffixes so the name works as a search query"""
+    company_name = name.strip()
+    # Remove any quotes and other JSON syntax that might be in the string
+    for char in ['"', "'", '{', '}', '[', ']']:
+        company_name = company_name.replace(char, '')
+    
+    # If company name contains common suffixes, remove them for better news search
+    for suffix in [" Inc", " LLC", " Ltd", " Corporation", " Corp", " Co", " Group"]:
+        if company_name.endswith(suffix):
+            company_name = company_name[:-len(suffix)]
+    return company_name
+
+
+async def request_reply(ctx: Context, session: ProfileSession, stage: str, address: str, message: Model):
+    """Send a request tagged with the session's request ID and wait until its reply is handed over"""
+    message.request_id = session.request_id
+    future = session.wait_for(stage)
+    try:
+        await ctx.send(address, message)
+        return await future
+    finally:
+        session.pending.pop(stage, None)
+
+
+def resolve_reply(ctx: Context, stage: str, request_id: Optional[str], reply: Optional[Model] = None,
+                  error: Optional[str] = None):
+    """Hand a worker agent's reply to the profile that asked for it"""
+    session = sessions.get(request_id)
+    if session is None or not session.resolve(stage, reply, error):
+        ctx.logger.warning(f"Dropping {stage} reply for unknown or finished request {request_id}")
+
+
+def build_profile_stages(ctx: Context, session: ProfileSession) -> List[Stage]:
+    """Dependency graph for one profile; news and ticker start from the name as soon as it is known"""
+    website, company_name = session.website, session.company_name
+
+    async def analyze_website(results):
+        return await request_reply(ctx, session, "website", COMPANY_INFO_PROCESSOR_ADDRESS, Request(website=website))
+
+    async def resolve_name(results):
+        if company_name:
+            return clean_company_name(company_name)
+        return clean_company_name(results["website"].company_name)
+
+    async def fetch_news(results):
+        ctx.logger.info(f"Requesting news about '{results['name']}' from news agent")
+        news_request = NewsRequest(company_name=results["name"], max_articles=MAX_NEWS_ARTICLES)
+        return await request_reply(ctx, session, "news", NEWS_AGENT_ADDRESS, news_request)
+
+    async def fetch_ticker(results):
+        return await request_reply(ctx, session, "ticker", TICKER_ADDRESS, CompanyRequest(company_name=results["name"]))
+
+    async def fetch_revenue(results):
+        ticker = results["ticker"]
+        if not ticker.success:
+            raise RuntimeError(f"No ticker for {ticker.company_name}: {ticker.message}")
+        return await request_reply(ctx, session, "revenue", REVENUE_ADDRESS, overviewRequest(ticker=ticker.ticker))
+
+    stages = []
+    if website:
+        stages.append(Stage("website", analyze_website, deadline=STAGE_DEADLINES["website"]))
+    stages += [
+        Stage("name", resolve_name, deps=[] if company_name else ["website"]),
+        Stage("news", fetch_news, deps=["name"], deadline=STAGE_DEADLINES["news"]),
+        Stage("ticker", fetch_ticker, deps=["name"], deadline=STAGE_DEADLINES["ticker"]),
+        Stage("revenue", fetch_revenue, deps=["ticker"], deadline=STAGE_DEADLINES["revenue"])
+    ]
+    return stages
+
+
+def publish_partial(ctx: Context, request_id: str, stage: str, results: Dict[str, Any],
+                    timings: Dict[str, StageTiming], website: Optional[str], company_name: Optional[str],
+                    subscribers: List[str], final: bool = False):
+    """Publish the next version of a profile to the JSONL stream and every subscriber"""
+    if not subscribers and not partial_stream.enabled:
+        return
+    partial = PartialProfile(
+        request_id=request_id,
+        version=partial_stream.next_version(request_id),
+        stage=stage,
+        final=final,
+        website=website,
+        company_name=results.get("name", company_name),
+        company_data=results.get("website"),
+        news=results.get("news"),
+        ticker=results.get("ticker"),
+        analysis=results.get("revenue"),
+        stage_latencies={name: round(timing.latency, 3) for name, timing in timings.items()
+                         if timing.status != "skipped"},
+        errors={name: timing.error for name, timing in timings.items() if timing.error}
+    )
+    try:
+        partial_stream.write(json.loads(partial.json()))
+    except OSError as e:
+        ctx.logger.warning(f"Could not write partial profile to {partial_stream.path}: {str(e)}")
+    for address in subscribers:
+        # Sent in the background so a slow subscriber never holds up the pipeline; versions sort out ordering
+        spawn(ctx.send(address, partial), ctx.logger)
+    if final:
+        partial_stream.finish(request_id)
+
+
+async def profile_company(ctx: Context, website: Optional[str] = None, company_name: Optional[str] = None,
+                          request_id: Optional[str] = None, subscribers: Optional[List[str]] = None) -> CompanyProfile:
+    """Run the whole pipeline for one company and merge the results into a single profile"""
+    session = sessions.create(website, company_name)
+    request_id = request_id or session.request_id
+    subscribers = PARTIAL_SUBSCRIBERS + (subscribers or [])
+
+    def on_stage(stage: str, results: Dict[str, Any], timings: Dict[str, StageTiming]):
+        publish_partial(ctx, request_id, stage, results, timings, website, company_name, subscribers)
+
+    try:
+        result = await Orchestrator(build_profile_stages(ctx, session)).run(on_stage=on_stage)
+    finally:
+        sessions.close(session.request_id)
+    publish_partial(ctx, request_id, "complete", result.results, result.timings, website, company_name,
+                    subscribers, final=True)
+
+    latencies = {name: round(timing.latency, 3) for name, timing in result.timings.items()
+                 if timing.status != "skipped"}
+    for name, timing in result.timings.items():
+        ctx.logger.info(f"Stage {name}: {timing.status} in {timing.latency:.2f}s"
+                        + (f" ({timing.error})" if timing.error else ""))
+    ctx.logger.info(f"Critical path: {' -> '.join(result.critical_path)} ({result.total_latency:.2f}s total)")
+
+    return CompanyProfile(
+        request_id=request_id,
+        website=website,
+        company_name=result.results.get("name", company_name),
+        company_data=result.results.get("website"),
+        news=result.results.get("news"),
+        ticker=result.results.get("ticker"),
+        analysis=result.results.get("revenue"),
+        stage_latencies=latencies,
+        critical_path=result.critical_path,
+        total_latency=round(result.total_latency, 3),
+        errors=result.errors
+    )
+
+
+async def log_profile(ctx: Context, website: Optional[str], company_name: Optional[str]):
+    profile = await profile_company(ctx, website, company_name)
+    ctx.logger.info(f"Profile for {profile.company_name} complete with {len(profile.errors)} failed stage(s)")
+
+
+def classify_profile(profile: CompanyProfile) -> str:
+    """Batch outcome for a profile: succeeded, partial or failed"""
+    if not profile.errors:
+        return "succeeded"
+    if profile.company_data or profile.news or profile.ticker or profile.analysis:
+        return "partial"
+    return "failed"
+
+
+def batch_concurrency(requested: Optional[int]) -> int:
+    """
+    Profiles in flight for a batch, between 1 and MAX_SESSIONS: more would make the session table evict
+    profiles that are still running
+    """
+    return min(max(1, requested or BATCH_CONCURRENCY), MAX_SESSIONS)
+
+
+async def profile_batch(ctx: Context, items, output_path: str, concurrency: int):
+    """Profile every item, streaming results to output_path as they finish"""
+    async def profile_item(item: BatchItem) -> CompanyProfile:
+        return await profile_company(ctx, item.website, item.company_name)
+
+    return await run_batch(items, profile_item, output_path, concurrency=batch_concurrency(concurrency),
+                           classify=classify_profile, logger=ctx.logger)
+
+
 @agent.on_event("startup")
 async def request_company_info(ctx: Context):
-    """Send website URL to company info processor agent"""
+    """Profile the configured website (or batch file) in the background"""
+    if BATCH_INPUT:
+        ctx.logger.info(f"Profiling companies from {BATCH_INPUT} into {BATCH_OUTPUT}")
+        spawn(profile_batch(ctx, read_batch_file(BATCH_INPUT, ctx.logger), BATCH_OUTPUT, BATCH_CONCURRENCY),
+              ctx.logger)
+        return
     ctx.logger.info(f"Requesting company information for website: {WEBSITE_URL}")
-    await ctx.send(COMPANY_INFO_PROCESSOR_ADDRESS, Request(website=WEBSITE_URL))
+    spawn(log_profile(ctx, WEBSITE_URL, COMPANY_NAME), ctx.logger)
+
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    partial_stream.close()
+
+
+@agent.on_message(model=ProfileRequest)
+async def handle_profile_request(ctx: Context, sender: str, request: ProfileRequest):
+    """Profile a company for another agent and reply with the merged profile"""
+    if not request.website and not request.company_name:
+        await ctx.send(sender, Error(text="ProfileRequest needs a website or a company name"))
+        return
+    ctx.logger.info(f"Received profile request from {sender}: {request.website or request.company_name}")
+
+    async def reply():
+        profile = await profile_company(ctx, request.website, request.company_name, request.request_id,
+                                        subscribers=[sender] if request.stream_partials else None)
+        await ctx.send(sender, profile)
+
+    spawn(reply(), ctx.logger)
+
+
+def failed_batch_summary(request: BatchProfileRequest, error: str) -> BatchProfileSummary:
+    return BatchProfileSummary(total=0, succeeded=0, partial=0, failed=0, elapsed=0.0, throughput=0.0,
+                               output_path=request.output_path, request_id=request.request_id, error=error)
+
+
+@agent.on_message(model=BatchProfileRequest)
+async def handle_batch_request(ctx: Context, sender: str, request: BatchProfileRequest):
+    """Profile a batch of companies and reply with throughput and failure counts"""
+    # Remote senders only get to name files inside BATCH_DIR
+    try:
+        os.makedirs(BATCH_DIR, exist_ok=True)
+        output_path = resolve_batch_path(request.output_path, BATCH_DIR)
+        input_path = resolve_batch_path(request.input_path, BATCH_DIR) if request.input_path else None
+    except ValueError as e:
+        ctx.logger.warning(f"Rejected batch request from {sender}: {str(e)}")
+        await ctx.send(sender, failed_batch_summary(request, str(e)))
+        return
+    if input_path:
+        items = read_batch_file(input_path, ctx.logger)
+    else:
+        items = [BatchItem(website=item.website, company_name=item.company_name)
+                 for item in request.items if item.website or item.company_name]
+    ctx.logger.info(f"Received batch request from {sender}, writing profiles to {output_path}")
+
+    async def reply():
+        try:
+            stats = await profile_batch(ctx, items, output_path, request.concurrency)
+        except Exception as e:
+            # e.g. input_path names a file that does not exist; the sender still gets an answer
+            ctx.logger.error(f"Batch request from {sender} failed: {str(e)}")
+            await ctx.send(sender, failed_batch_summary(request, str(e)))
+            return
+        await ctx.send(sender, BatchProfileSummary(
+            total=stats.total,
+            succeeded=stats.succeeded,
+            partial=stats.partial,
+            failed=stats.failed,
+            elapsed=round(stats.elapsed, 3),
+            throughput=round(stats.throughput, 3),
+            output_path=request.output_path,
+            request_id=request.request_id
+        ))
+
+    spawn(reply(), ctx.logger)
+
+
+@agent.on_interval(period=60.0)
+async def evict_expired_sessions(ctx: Context):
+    """Drop profiles whose replies never arrived"""
+    evicted = sessions.evict_expired()
+    if evicted:
+        ctx.logger.warning(f"Evicted {evicted} expired profile session(s), {len(sessions)} still open")
 
 @agent.on_message(model=CompanyData)
 async def handle_company_data(ctx: Context, sender: str, data: CompanyData):
-    global company_data
-    company_data = data
-    
     """Log response from company info processor agent"""
     ctx.logger.info(f"Received company information from processor agent:")
     ctx.logger.info(f"Company Name: {data.company_name}")
@@ -113,39 +464,12 @@ async def handle_company_data(ctx: Context, sender: str, data: CompanyData):
     ctx.logger.info(f"Contact Info: {data.contact_info}")
     ctx.logger.info(f"Social Media: {data.social_media}")
     ctx.logger.info(f"Source URL: {data.source_url}")
-    
-    # Clean up company name for news request
-    company_name = data.company_name.strip()
-    # Remove any quotes and other JSON syntax that might be in the string
-    for char in ['"', "'", '{', '}', '[', ']']:
-        company_name = company_name.replace(char, '')
-    
-    # If company name contains common suffixes, remove them for better news search
-    for suffix in [" Inc", " LLC", " Ltd", " Corporation", " Corp", " Co", " Group"]:
-        if company_name.endswith(suffix):
-            company_name = company_name[:-len(suffix)]
-    
-    ctx.logger.info(f"Requesting news about '{company_name}' from news agent")
-    
-    news_request = NewsRequest(
-        company_name=company_name,
-        max_articles=MAX_NEWS_ARTICLES
-    )
-    ticker_request = CompanyRequest(
-        company_name = company_name
-    )
-    await ctx.send(TICKER_ADDRESS,ticker_request)
-    await ctx.send(NEWS_AGENT_ADDRESS, news_request)
-    
-    
+    resolve_reply(ctx, "website", data.request_id, data)
 
 
 @agent.on_message(model=NewsResponse)
 async def handle_news_response(ctx: Context, sender: str, news: NewsResponse):
     """Handle news response and display the information"""
-    global news_data
-    news_data = news
-    
     ctx.logger.info(f"Received news about {news.company_name}")
     ctx.logger.info(f"Found {news.total_results} articles, showing {len(news.articles)}")
     
@@ -166,26 +490,15 @@ async def handle_news_response(ctx: Context, sender: str, news: NewsResponse):
             ctx.logger.info("---")
     else:
         ctx.logger.info("No articles found in news response.")
-    
-    # A comprehensive report could be generated here combining company info and news
-    if company_data and news_data:
-        ctx.logger.info("Both company data and news data are available")
-        ctx.logger.info("A full business intelligence report could be generated")
+    resolve_reply(ctx, "news", news.request_id, news)
 
 @agent.on_message(model=TickerResponse)
 async def handle_ticker_response(ctx: Context, sender: str, ticker: TickerResponse):
-    global ticker_value
-    ticker_value = ticker
     ctx.logger.info(f"Received Ticker of company {ticker.ticker}")
-    overview_request=overviewRequest(
-        ticker = ticker_value.ticker
-    )
-    await ctx.send(REVENUE_ADDRESS,overview_request)
+    resolve_reply(ctx, "ticker", ticker.request_id, ticker)
 
 @agent.on_message(model=CompanyAnalysis)
 async def handle_company_analysis(ctx: Context, sender: str, analysis: CompanyAnalysis):
-    global companyanalysis
-    companyanalysis = analysis
     ctx.logger.info(f"Company Overview: {analysis.company_overview_summary}")
     ctx.logger.info(f"Valuation: {analysis.valuation_summary}")
     ctx.logger.info(f"Profitability: {analysis.profitability_summary}")
@@ -193,13 +506,18 @@ async def handle_company_analysis(ctx: Context, sender: str, analysis: CompanyAn
     ctx.logger.info(f"Financial Health: {analysis.financial_health_summary}")
     ctx.logger.info(f"Stock Performance: {analysis.stock_performance_summary}")
     ctx.logger.info(f"Analyst Sentiment: {analysis.analyst_sentiment_summary}")
+    resolve_reply(ctx, "revenue", analysis.request_id, analysis)
 
 
 
 @agent.on_message(model=Error)
 async def handle_error(ctx: Context, sender: str, error: Error):
-    """Log error from company info processor agent"""
+    """Log error from a worker agent and fail the stage waiting on it"""
     ctx.logger.error(f"Got error from agent: {error.text}")
+    if sender == COMPANY_INFO_PROCESSOR_ADDRESS:
+        resolve_reply(ctx, "website", error.request_id, error=error.text)
+    elif sender == NEWS_AGENT_ADDRESS:
+        resolve_reply(ctx, "news", error.request_id, error=error.text)
 
 
 if __name__ == "__main__":
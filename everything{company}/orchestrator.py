@@ -0,0 +1,136 @@
+"""
+Dependency-graph orchestration for the conductor.
+
+Each stage of a company profile (website analysis, news, ticker, revenue) is a
+node that starts as soon as the stages it depends on have finished, so
+independent branches run concurrently and end-to-end latency follows the
+critical path instead of the sum of all hops.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class Stage:
+    """A node in the profile graph"""
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]  # Receives the results of finished stages
+    deps: List[str] = field(default_factory=list)
+    deadline: float = 60.0  # Seconds, counted from when the stage starts
+
+
+@dataclass
+class StageTiming:
+    """When a stage ran and how it finished"""
+    status: str  # "ok", "timeout", "error" or "skipped"
+    start: float = 0.0  # Seconds since the orchestration started
+    end: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def latency(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class OrchestrationResult:
+    results: Dict[str, Any]
+    timings: Dict[str, StageTiming]
+    critical_path: List[str]
+    total_latency: float
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {name: timing.error for name, timing in self.timings.items() if timing.error}
+
+
+class Orchestrator:
+    """Runs a set of stages, starting each one as soon as its inputs exist"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self, inputs: Optional[Dict[str, Any]] = None,
+                  on_stage: Optional[Callable[[str, Dict[str, Any], Dict[str, StageTiming]], None]] = None
+                  ) -> OrchestrationResult:
+        """
+        Run every stage and collect whatever finished within its deadline.
+        on_stage(name, results, timings) is called as each stage finishes, fails or is skipped.
+        """
+        results: Dict[str, Any] = dict(inputs or {})
+        timings: Dict[str, StageTiming] = {}
+        started = time.monotonic()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage):
+            # Wait for every dependency; a failed dependency skips this branch
+            if stage.deps:
+                await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+            failed = [dep for dep in stage.deps if timings[dep].status != "ok"]
+            now = time.monotonic() - started
+            if failed:
+                timings[stage.name] = StageTiming("skipped", now, now, f"Skipped because {', '.join(failed)} did not finish")
+            else:
+                await execute(stage, now)
+            if on_stage is not None:
+                on_stage(stage.name, results, timings)
+
+        async def execute(stage: Stage, now: float):
+            try:
+                results[stage.name] = await asyncio.wait_for(stage.run(results), timeout=stage.deadline)
+                timings[stage.name] = StageTiming("ok", now, time.monotonic() - started)
+            except asyncio.TimeoutError:
+                timings[stage.name] = StageTiming("timeout", now, time.monotonic() - started,
+                                                  f"No result within {stage.deadline:g}s")
+            except Exception as e:
+                timings[stage.name] = StageTiming("error", now, time.monotonic() - started, str(e))
+
+        # Create all tasks first so dependents can await them by name
+        for name, stage in self.stages.items():
+            tasks[name] = asyncio.ensure_future(run_stage(stage))
+        await asyncio.gather(*tasks.values())
+
+        return OrchestrationResult(
+            results=results,
+            timings=timings,
+            critical_path=self._critical_path(timings),
+            total_latency=time.monotonic() - started
+        )
+
+    def _critical_path(self, timings: Dict[str, StageTiming]) -> List[str]:
+        """Chain of stages that determined when the last stage finished"""
+        ran = [name for name, timing in timings.items() if timing.status != "skipped"]
+        if not ran:
+            return []
+        path = [max(ran, key=lambda name: timings[name].end)]
+        while True:
+            deps = [dep for dep in self.stages[path[-1]].deps if timings[dep].status != "skipped"]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda name: timings[name].end))
+        return list(reversed(path))
@@ -0,0 +1,56 @@
+"""
+Incremental profile output for the conductor.
+
+A full profile waits on the slowest branch, usually the revenue LLM hop, while
+the company name and news are often ready within seconds. Each time a stage
+lands, the conductor publishes a new version of the profile so far: to agents
+that asked for partial results, to PARTIAL_SUBSCRIBERS, and to the
+PARTIAL_OUTPUT JSONL file that dashboards can tail. Versions count up per
+request, so a consumer keeps the highest version it has seen.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+# JSONL file that receives every partial profile; unset to disable
+PARTIAL_OUTPUT = os.environ.get("PARTIAL_OUTPUT")
+# Comma-separated agent addresses sent every partial profile, in addition to per-request subscribers
+PARTIAL_SUBSCRIBERS = [address.strip() for address in os.environ.get("PARTIAL_SUBSCRIBERS", "").split(",")
+                       if address.strip()]
+
+
+class PartialStream:
+    """Per-request version counters plus an optional append-only JSONL sink"""
+
+    def __init__(self, path: Optional[str] = PARTIAL_OUTPUT):
+        self.path = path
+        self._file = None
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def next_version(self, request_id: str) -> int:
+        version = self._versions.get(request_id, 0) + 1
+        self._versions[request_id] = version
+        return version
+
+    def write(self, record: Dict[str, Any]):
+        """Append one record and flush, so readers tailing the file see it immediately"""
+        if not self.path:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def finish(self, request_id: str):
+        """Forget a request's counter once its final version is out"""
+        self._versions.pop(request_id, None)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
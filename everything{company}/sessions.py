@@ -0,0 +1,106 @@
+"""
+Per-profile session table for the conductor.
+
+Every profile gets a request ID that is carried on each outgoing message and
+echoed back by the worker agents, so replies are matched to the profile that
+asked for them and many profiles can run in one conductor process.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+SESSION_TTL = 600.0  # Seconds a profile may stay open before it is evicted
+MAX_SESSIONS = 1000  # Oldest sessions are evicted beyond this
+
+
+class SessionEvicted(Exception):
+    """Raised in stages still waiting when their session expires or is pushed out"""
+
+
+class ProfileSession:
+    """State for one in-progress company profile"""
+
+    def __init__(self, request_id: str, website: Optional[str], company_name: Optional[str], ttl: float):
+        self.request_id = request_id
+        self.website = website
+        self.company_name = company_name
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl
+        # Futures waiting for a worker agent's reply, keyed by stage name
+        self.pending: Dict[str, asyncio.Future] = {}
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) >= self.expires_at
+
+    def wait_for(self, stage: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[stage] = future
+        return future
+
+    def resolve(self, stage: str, reply: Any = None, error: Optional[str] = None) -> bool:
+        """Hand a reply to the stage waiting for it; returns False if nothing was waiting"""
+        future = self.pending.pop(stage, None)
+        if future is None or future.done():
+            return False
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(reply)
+        return True
+
+    def fail_pending(self, reason: str):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(SessionEvicted(reason))
+        self.pending.clear()
+
+
+class SessionTable:
+    """Sessions keyed by request ID with TTL eviction and a hard size bound"""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ProfileSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, website: Optional[str] = None, company_name: Optional[str] = None) -> ProfileSession:
+        self.evict_expired()
+        while len(self._sessions) >= self.max_sessions:
+            _, oldest = self._sessions.popitem(last=False)
+            oldest.fail_pending("Session evicted to make room for newer profiles")
+        session = ProfileSession(uuid.uuid4().hex, website, company_name, self.ttl)
+        self._sessions[session.request_id] = session
+        return session
+
+    def get(self, request_id: Optional[str]) -> Optional[ProfileSession]:
+        if not request_id:
+            return None
+        session = self._sessions.get(request_id)
+        if session is not None and session.is_expired():
+            self.close(request_id, "Session expired")
+            return None
+        return session
+
+    def close(self, request_id: str, reason: str = "Session closed"):
+        session = self._sessions.pop(request_id, None)
+        if session is not None:
+            session.fail_pending(reason)
+
+    def evict_expired(self) -> int:
+        """Drop every expired session; returns how many were removed"""
+        now = time.monotonic()
+        # Sessions are kept in creation order with a fixed TTL, so expired ones are at the front
+        expired = []
+        for request_id, session in self._sessions.items():
+            if not session.is_expired(now):
+                break
+            expired.append(request_id)
+        for request_id in expired:
+            self.close(request_id, "Session expired")
+        return len(expired)
@@ -0,0 +1,131 @@
+"""
+Local store of NewsAPI articles for the news agent.
+
+Every NewsRequest used to download the same page of articles again and score
+each one again. Articles are now kept in SQLite keyed by a hash of their URL,
+with their sentiment, and linked to the companies they were found for. Each
+company has a watermark: the publishedAt up to which every article has been
+fetched, normally the newest one seen. The agent then asks NewsAPI only for
+articles from the watermark on, and answers from the store, so a request
+usually costs one small delta query.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+ARTICLE_STORE_PATH = os.environ.get(
+    "ARTICLE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "articles.sqlite3")
+)
+ARTICLE_RETENTION_DAYS = int(os.environ.get("ARTICLE_RETENTION_DAYS", "90"))  # By publishedAt
+
+
+def company_key(company_name: str) -> str:
+    """Case- and whitespace-insensitive key, so "Apple" and " apple " share a watermark"""
+    return " ".join(company_name.lower().split())
+
+
+def url_hash(url: str) -> str:
+    return hashlib.blake2b(url.strip().encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ArticleStore:
+    """SQLite articles keyed by URL hash, with a per-company publishedAt watermark"""
+
+    def __init__(self, path: str = ARTICLE_STORE_PATH):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "url_hash TEXT PRIMARY KEY, published_at TEXT, stored_at REAL, data TEXT);"
+            "CREATE TABLE IF NOT EXISTS company_articles ("
+            "company TEXT, url_hash TEXT, published_at TEXT, PRIMARY KEY (company, url_hash));"
+            "CREATE INDEX IF NOT EXISTS company_articles_recent ON company_articles (company, published_at);"
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "company TEXT PRIMARY KEY, published_at TEXT, checked_at REAL);"
+        )
+        self._db.commit()
+
+    def watermark(self, company_name: str) -> Optional[Dict[str, Any]]:
+        """{"published_at", "checked_at"} for a company, or None if it was never fetched"""
+        row = self._db.execute(
+            "SELECT published_at, checked_at FROM watermarks WHERE company = ?", (company_key(company_name),)
+        ).fetchone()
+        return None if row is None else {"published_at": row[0], "checked_at": row[1]}
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored articles by URL hash; hashes not in the store are left out"""
+        hashes = list(set(hashes))
+        found = {}
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT url_hash, data FROM articles WHERE url_hash IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((key, json.loads(data)) for key, data in rows)
+        return found
+
+    def add(self, company_name: str, articles: List[Dict[str, Any]], checked_at: Optional[float] = None,
+            watermark: Optional[str] = None) -> List[str]:
+        """
+        Store articles (dicts with at least url and published_at) for a company and move its watermark
+        to the newest published_at, or to `watermark` when the articles leave a gap before the newest ones.
+        The watermark is written even with no articles, to record the check.
+        Returns the URL hashes newly linked to the company, in the order given; a concurrent add() of the
+        same articles gets an empty list, so callers can fold each story into aggregates exactly once.
+        """
+        company = company_key(company_name)
+        now = time.time()
+        rows = [(url_hash(article["url"]), article.get("published_at") or "", now, json.dumps(article))
+                for article in articles if article.get("url")]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO articles (url_hash, published_at, stored_at, data) VALUES (?, ?, ?, ?)", rows
+        )
+        linked = []
+        for key, published_at, _, _ in rows:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO company_articles (company, url_hash, published_at) VALUES (?, ?, ?)",
+                (company, key, published_at)
+            )
+            if cursor.rowcount:
+                linked.append(key)
+        moved_to = watermark or max((published_at for _, published_at, _, _ in rows), default="")
+        # ISO 8601 UTC timestamps from NewsAPI compare correctly as strings
+        self._db.execute(
+            "INSERT INTO watermarks (company, published_at, checked_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (company) DO UPDATE SET published_at = MAX(published_at, excluded.published_at), "
+            "checked_at = excluded.checked_at",
+            (company, moved_to, checked_at if checked_at is not None else now)
+        )
+        self._db.commit()
+        return linked
+
+    def recent(self, company_name: str, limit: int) -> List[Dict[str, Any]]:
+        """A company's newest stored articles, newest first"""
+        rows = self._db.execute(
+            "SELECT a.data FROM company_articles c JOIN articles a ON a.url_hash = c.url_hash "
+            "WHERE c.company = ? ORDER BY c.published_at DESC LIMIT ?",
+            (company_key(company_name), limit)
+        ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def count(self, company_name: str) -> int:
+        row = self._db.execute(
+            "SELECT COUNT(*) FROM company_articles WHERE company = ?", (company_key(company_name),)
+        ).fetchone()
+        return row[0]
+
+    def purge(self, days: int = ARTICLE_RETENTION_DAYS) -> int:
+        """Delete articles published more than days ago; returns how many were removed"""
+        cutoff = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - days * 86400))
+        self._db.execute("DELETE FROM company_articles WHERE published_at < ?", (cutoff,))
+        cursor = self._db.execute("DELETE FROM articles WHERE published_at < ?", (cutoff,))
+        self._db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
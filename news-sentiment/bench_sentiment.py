@@ -0,0 +1,97 @@
+"""
+Microbenchmark: per-article VADER scoring vs the shared SentimentEngine.
+
+Builds a few thousand synthetic headlines (with the repetition typical of
+syndicated news across companies) and times:
+
+  * legacy     - a new SentimentIntensityAnalyzer per article, as fetch_news used to do
+  * cold batch - SentimentEngine.score_batch with an empty memo
+  * warm batch - the same batch again, served from the memo
+
+Usage: python news-sentiment/bench_sentiment.py [--headlines 3000] [--legacy-sample 500]
+"""
+
+import argparse
+import random
+import time
+
+import nltk
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from sentiment import SentimentEngine
+
+COMPANIES = ["Apple", "Microsoft", "Tesla", "Amazon", "Nvidia", "Alphabet", "Meta", "Netflix", "Intel", "AMD"]
+TEMPLATES = [
+    "{c} shares soar after record quarterly earnings beat expectations",
+    "{c} stock slumps as regulators open antitrust investigation",
+    "{c} announces layoffs amid slowing demand",
+    "Analysts upgrade {c} citing strong growth in cloud revenue",
+    "{c} faces lawsuit over alleged privacy violations",
+    "{c} unveils new product line at annual developer conference",
+    "Investors cheer {c} buyback plan and dividend increase",
+    "{c} misses revenue estimates, guidance disappoints Wall Street",
+    "{c} partners with startup to expand AI capabilities",
+    "Supply chain problems continue to hurt {c} margins",
+]
+DESCRIPTIONS = [
+    "The company said it expects continued momentum into next year.",
+    "Executives declined to comment on the report.",
+    "Shares moved sharply in after-hours trading.",
+    "The news comes weeks after a difficult quarter.",
+    "",
+]
+
+
+def make_headlines(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(TEMPLATES).format(c=rng.choice(COMPANIES))} {rng.choice(DESCRIPTIONS)}"
+        for _ in range(count)
+    ]
+
+
+def legacy_score(text):
+    # The old analyze_sentiment: a fresh analyzer (and lexicon load) for every article
+    return SentimentIntensityAnalyzer().polarity_scores(text)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headlines", type=int, default=3000)
+    parser.add_argument("--legacy-sample", type=int, default=500,
+                        help="Headlines timed on the slow legacy path; the total is extrapolated")
+    args = parser.parse_args()
+
+    nltk.download("vader_lexicon", quiet=True)
+    headlines = make_headlines(args.headlines)
+    sample = headlines[:min(args.legacy_sample, len(headlines))]
+
+    legacy_time, legacy_scores = timed(lambda: [legacy_score(text) for text in sample])
+    legacy_per_item = legacy_time / len(sample)
+
+    engine = SentimentEngine()
+    engine.analyzer  # Exclude the one-off lexicon load from the batch timings
+    cold_time, cold_scores = timed(lambda: engine.score_batch(headlines))
+    warm_time, _ = timed(lambda: engine.score_batch(headlines))
+
+    assert cold_scores[:len(sample)] == legacy_scores, "Engine scores differ from the legacy path"
+
+    print(f"{len(headlines)} headlines ({len(set(headlines))} distinct)")
+    print(f"{'path':<12}{'total (s)':>12}{'per item (us)':>16}{'speedup':>10}")
+    rows = [
+        ("legacy", legacy_per_item * len(headlines), legacy_per_item),
+        ("cold batch", cold_time, cold_time / len(headlines)),
+        ("warm batch", warm_time, warm_time / len(headlines)),
+    ]
+    for name, total, per_item in rows:
+        print(f"{name:<12}{total:>12.3f}{per_item * 1e6:>16.1f}{legacy_per_item / per_item:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
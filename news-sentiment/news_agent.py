@@ -1,10 +1,27 @@
+import asyncio
+import math
 import os
+import sys
 import json
-import requests
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from uagents import Agent, Context, Model
 import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+# Make the shared helpers in common/ importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.http_client import http_client
+from common.llm_cache import cache_key, llm_cache
+from common.rate_limit import PRIORITY_BATCH, request_priority
+from common.singleflight import SingleFlight
+from common.summarizer import call_with_budget, extractive_summary
+from common.tasks import gather_limited, spawn
+from article_store import ArticleStore, company_key, url_hash
+from dedup import cluster_stories
+from sentiment_aggregates import SentimentAggregates, label_for, parse_published_at
+from sentiment_series import INTERVALS, SentimentSeries
+from sentiment import sentiment_engine
 
 # Download NLTK data if not already present
 nltk.download('vader_lexicon', quiet=True)
@@ -15,20 +32,50 @@ agent = Agent(name="news_agent", port=8007, endpoint=["http://localhost:8007/sub
 # Get a free API key from https://newsapi.org/
 NEWS_API_KEY = os.environ.get("NEWS_API_KEY", "news_api_key_here")
 NEWS_API_URL = "https://newsapi.org/v2/everything"
+NEWS_PAGE_SIZE = int(os.environ.get("NEWS_PAGE_SIZE", "100"))  # NewsAPI's maximum page size
+# Articles fetched per query at most; NewsAPI's free plan stops at 100
+NEWS_MAX_RESULTS = int(os.environ.get("NEWS_MAX_RESULTS", "100"))
+# Queries per refresh when more than NEWS_MAX_RESULTS articles arrived since the watermark; each older window
+# ends where the previous one was cut off
+NEWS_MAX_DELTA_QUERIES = int(os.environ.get("NEWS_MAX_DELTA_QUERIES", "5"))
+# Seconds a company's stored articles are served without asking NewsAPI for newer ones
+NEWS_REFRESH_INTERVAL = float(os.environ.get("NEWS_REFRESH_INTERVAL", "300"))
+# Stored articles considered per requested article, so max_articles distinct stories remain after deduplication
+DEDUP_POOL_FACTOR = int(os.environ.get("DEDUP_POOL_FACTOR", "3"))
+# Stored articles folded into a company's rolling sentiment when it has none yet (e.g. after losing the file)
+AGGREGATE_SEED_ARTICLES = int(os.environ.get("AGGREGATE_SEED_ARTICLES", "1000"))
+AGGREGATES_SAVE_INTERVAL = float(os.environ.get("AGGREGATES_SAVE_INTERVAL", "300"))  # Seconds
 
 # Hugging Face API configuration
 HUGGINGFACE_API_KEY = os.environ.get("HUGGINGFACE_API_KEY", "hf_api_key_here")
-HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models/tiiuae/falcon-7b-instruct"
+HUGGINGFACE_MODEL = "tiiuae/falcon-7b-instruct"
+HUGGINGFACE_API_URL = f"https://api-inference.huggingface.co/models/{HUGGINGFACE_MODEL}"
+HUGGINGFACE_TIMEOUT = float(os.environ.get("HUGGINGFACE_TIMEOUT", "60"))  # Seconds
 HEADERS = {
     "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
     "Content-Type": "application/json"
 }
+# Seconds an identical summary prompt is answered from the LLM cache
+SUMMARY_CACHE_TTL = float(os.environ.get("NEWS_SUMMARY_CACHE_TTL", str(6 * 3600)))
+
+# Companies fetched in parallel for a BatchNewsRequest
+BATCH_CONCURRENCY = int(os.environ.get("NEWS_BATCH_CONCURRENCY", "5"))
+# News fetches in progress, keyed by company and article count
+news_flights = SingleFlight()
+# Articles and their sentiment, with the newest publishedAt seen per company
+article_store = ArticleStore()
+# Time-decayed and 1d/7d/30d rolling sentiment per company, updated as articles are stored
+sentiment_aggregates = SentimentAggregates()
+# Per-story scores with hourly and daily buckets, for sentiment history queries
+sentiment_series = SentimentSeries()
+SERIES_DEFAULT_DAYS = 30  # Range returned when a SentimentSeriesRequest gives no start
 
 # Model definitions
 class NewsRequest(Model):
     """Model for news request"""
     company_name: str  # Name of the company to get news for
     max_articles: Optional[int] = 20  # Maximum number of articles to return
+    request_id: Optional[str] = None  # Echoed back so callers can match the response
 
 class Article(Model):
     """Model for a news article"""
@@ -39,11 +86,15 @@ class Article(Model):
     published_at: Optional[str] = ""
     content: Optional[str] = None
     sentiment: Optional[Dict[str, float]] = None  # Added sentiment field
+    duplicate_count: int = 1  # Near-identical copies of this story found, itself included
 
 class NewsSummary(Model):
     """Model for news summary"""
     overall_sentiment: str
     summary: str
+    # Average compound score: "decayed" (recent stories count most), "1d", "7d" and "30d"; "weight" is the
+    # decayed number of stories behind it
+    sentiment_trend: Optional[Dict[str, Optional[float]]] = None
 
 class NewsResponse(Model):
     """Model for news response"""
@@ -51,33 +102,68 @@ class NewsResponse(Model):
     articles: List[Article]
     total_results: int
     summary: Optional[NewsSummary] = None  # Added summary field
+    request_id: Optional[str] = None
 
 class Error(Model):
-    """Model for error response"""
+    # No docstring: it is part of the schema digest, which must match the conductor's Error
     text: str
+    request_id: Optional[str] = None
+
+class BatchNewsRequest(Model):
+    """Model for fetching news about several companies in one message"""
+    requests: List[NewsRequest]
+    request_id: Optional[str] = None
+
+class NewsResult(Model):
+    """Outcome for one company in a batch; exactly one of response/error is set"""
+    company_name: str
+    response: Optional[NewsResponse] = None
+    error: Optional[str] = None
+
+class BatchNewsResponse(Model):
+    """Model for batch news response, one result per request in order"""
+    results: List[NewsResult]
+    request_id: Optional[str] = None
+
+class SentimentSeriesRequest(Model):
+    """Model for a company's sentiment history, bucketed by hour or day"""
+    company_name: str
+    start: Optional[str] = None  # ISO 8601 date or time (UTC if no offset); default SERIES_DEFAULT_DAYS before end
+    end: Optional[str] = None  # Exclusive; default now
+    interval: str = "day"  # "day" or "hour"
+    include_empty: bool = False  # Also return buckets without any stories
+    request_id: Optional[str] = None
+
+class SentimentSeriesResponse(Model):
+    """Model for sentiment history; the lists are columns, one entry per bucket in time order"""
+    company_name: str
+    interval: str
+    start: List[str]  # Bucket start, ISO 8601 UTC
+    count: List[int]  # Stories published in the bucket
+    compound: List[Optional[float]]  # Mean scores; None for empty buckets
+    pos: List[Optional[float]]
+    neg: List[Optional[float]]
+    neu: List[Optional[float]]
+    request_id: Optional[str] = None
 
 def analyze_sentiment(text: str) -> Dict[str, float]:
     """Analyze sentiment of the given text using NLTK's VADER"""
-    if not text:
-        return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
-    
-    sia = SentimentIntensityAnalyzer()
-    sentiment_scores = sia.polarity_scores(text)
-    
-    return sentiment_scores  # Returns {'neg': x, 'neu': y, 'pos': z, 'compound': c}
+    # The shared engine keeps one analyzer loaded and memoizes repeated texts
+    return sentiment_engine.score(text)  # Returns {'neg': x, 'neu': y, 'pos': z, 'compound': c}
 
 def get_overall_sentiment(articles: List[Article]) -> str:
     """Calculate the overall sentiment based on all articles"""
-    if not articles:
-        return "Neutral"
-    
-    # Calculate average compound sentiment score
-    total_compound = 0
+    # Each story counts once, with a little extra weight for wide syndication rather than one vote per copy
+    weighted_compound, total_weight = 0.0, 0.0
     for article in articles:
         if article.sentiment and "compound" in article.sentiment:
-            total_compound += article.sentiment["compound"]
-    
-    avg_compound = total_compound / len(articles)
+            weight = 1 + math.log(max(article.duplicate_count, 1))
+            weighted_compound += weight * article.sentiment["compound"]
+            total_weight += weight
+    if not total_weight:
+        return "Neutral"
+
+    avg_compound = weighted_compound / total_weight
     
     # Interpret the average sentiment
     if avg_compound >= 0.05:
@@ -87,8 +173,60 @@ def get_overall_sentiment(articles: List[Article]) -> str:
     else:
         return "Neutral"
 
-def generate_news_summary(company_name: str, articles: List[Article]) -> Optional[NewsSummary]:
+def story_text(article: Article) -> Tuple[str, str]:
+    """Title and description, without the " - Source" suffix NewsAPI often appends to titles"""
+    title = article.title or ""
+    if article.source and title.endswith(f" - {article.source}"):
+        title = title[:-len(article.source) - 3]
+    return title, article.description or ""
+
+def deduplicate_articles(articles: List[Article]) -> List[Article]:
+    """
+    One article per cluster of near-duplicates, in the order the clusters first appear. The earliest
+    published copy represents the cluster, with duplicate_count set to the cluster size.
+    """
+    representatives = []
+    for members in cluster_stories([story_text(article) for article in articles]):
+        original = min(members, key=lambda i: (articles[i].published_at or "", i))
+        representative = articles[original].copy()
+        representative.duplicate_count = sum(articles[i].duplicate_count for i in members)
+        representatives.append(representative)
+    return representatives
+
+def generated_summary(result) -> str:
+    """The generated text of a Hugging Face response; raises ValueError if the model returned none"""
+    summary_text = ""
+    
+    # Different models might return data in different formats
+    if isinstance(result, list) and len(result) > 0:
+        summary_text = result[0].get('generated_text', '')
+    elif isinstance(result, dict):
+        summary_text = result.get('generated_text', '')
+    
+    # If we still don't have a summary, try other possible response formats
+    if not summary_text and isinstance(result, list) and len(result) > 0:
+        if 'text' in result[0]:
+            summary_text = result[0]['text']
+    
+    if not summary_text or not summary_text.strip():
+        raise ValueError("Empty summary from Hugging Face API")
+    return summary_text
+
+
+def local_news_summary(company_name: str, articles: List[Article]) -> str:
+    """Extractive summary of the articles' titles and descriptions, used when the model is slow or unavailable"""
+    texts = [f"{article.title}. {article.description or ''}" for article in articles]
+    summary = extractive_summary(texts, max_sentences=3)
+    return f"Recent news about {company_name}: {summary}" if summary else \
+        f"No recent news about {company_name} could be summarized."
+
+
+async def generate_news_summary(company_name: str, articles: List[Article],
+                                trend: Optional[Dict[str, Optional[float]]] = None) -> Optional[NewsSummary]:
     """Generate a summary of news articles using Hugging Face model"""
+    # The company's decayed rolling sentiment covers every stored story, not just this page of articles
+    overall_sentiment = label_for(trend["decayed"]) if trend and trend.get("decayed") is not None \
+        else get_overall_sentiment(articles)
     try:
         # Prepare the content for the model (same as before)
         article_texts = []
@@ -115,123 +253,238 @@ def generate_news_summary(company_name: str, articles: List[Article]) -> Optiona
             }
         }
 
-        # Add debugging to see what we're sending
-        print(f"Sending request to Hugging Face API with prompt length: {len(prompt)}")
-        
-        # Make request to Hugging Face Inference API
-        response = requests.post(HUGGINGFACE_API_URL, headers=HEADERS, json=payload)
-        
-        # Debug the response
-        print(f"Hugging Face API response status code: {response.status_code}")
-        print(f"Response content: {response.text[:500]}...")  # Print first 500 chars
-        
-        response.raise_for_status()
-        
-        # Extract the generated text from the response - improved parsing
-        result = response.json()
-        summary_text = ""
-        
-        # Different models might return data in different formats
-        if isinstance(result, list) and len(result) > 0:
-            summary_text = result[0].get('generated_text', '')
-        elif isinstance(result, dict):
-            summary_text = result.get('generated_text', '')
+        async def call_model():
+            # Add debugging to see what we're sending
+            print(f"Sending request to Hugging Face API with prompt length: {len(prompt)}")
+            
+            # Make request to Hugging Face Inference API
+            response = await http_client.post(HUGGINGFACE_API_URL, headers=HEADERS, json=payload,
+                                              timeout=HUGGINGFACE_TIMEOUT, upstream="huggingface")
+            
+            # Debug the response
+            print(f"Hugging Face API response status code: {response.status_code}")
+            print(f"Response content: {response.text[:500]}...")  # Print first 500 chars
+            
+            response.raise_for_status()
+            return response.json()
         
-        # If we still don't have a summary, try other possible response formats
-        if not summary_text and isinstance(result, list) and len(result) > 0:
-            if 'text' in result[0]:
-                summary_text = result[0]['text']
+        # Identical prompts within the TTL are answered from the cache without any HTTP call, and only
+        # non-empty summaries are cached. A model call that misses the latency budget finishes in the
+        # background and fills the cache for the next request; identical requests meanwhile wait on it.
+        key = cache_key(HUGGINGFACE_MODEL, prompt, payload["parameters"])
+        summary_text = await call_with_budget(
+            lambda: llm_cache.get_or_fetch(key, SUMMARY_CACHE_TTL, call_model, parse=generated_summary), key
+        ) or ""
         
         print(f"Extracted summary text: {summary_text[:100]}...")  # Print first 100 chars
         
         # Fallback if no summary is generated
         if not summary_text:
-            print("No summary from API, generating fallback summary")
-            # Create a simple fallback summary
-            summary_text = f"Recent news about {company_name} includes "
-            # Add titles of a few articles
-            for i, article in enumerate(articles[:3]):
-                if i > 0:
-                    summary_text += ", " if i < len(articles[:3])-1 else " and "
-                summary_text += f"'{article.title}'"
-            summary_text += "."
-        
-        # Calculate overall sentiment
-        overall_sentiment = get_overall_sentiment(articles)
+            print("No summary from API, using the local extractive summary")
+            summary_text = local_news_summary(company_name, articles)
         
         return NewsSummary(
             overall_sentiment=overall_sentiment,
-            summary=summary_text
+            summary=summary_text,
+            sentiment_trend=trend
         )
     
     except Exception as e:
         print(f"Error generating summary: {str(e)}")
-        # Create a fallback summary on exception
-        fallback_summary = f"Recent news about {company_name} includes multiple articles with an overall {get_overall_sentiment(articles).lower()} sentiment."
         return NewsSummary(
-            overall_sentiment=get_overall_sentiment(articles),
-            summary=fallback_summary
+            overall_sentiment=overall_sentiment,
+            summary=local_news_summary(company_name, articles),
+            sentiment_trend=trend
+        )
+async def fetch_news_page(company_name: str, page: int, since: Optional[str] = None,
+                          until: Optional[str] = None) -> Dict[str, Any]:
+    """One page of NewsAPI results, newest first, optionally only articles published from `since` to `until`"""
+    params = {
+        "q": company_name,  # Search query
+        "apiKey": NEWS_API_KEY,
+        "language": "en",
+        "sortBy": "publishedAt",
+        "pageSize": NEWS_PAGE_SIZE,
+        "page": page,
+        "from": since,
+        "to": until
+    }
+    response = await http_client.get(NEWS_API_URL, params=params, upstream="newsapi")
+    response.raise_for_status()  # Raise exception for HTTP errors
+    data = response.json()
+    if data.get("status") != "ok":
+        raise RuntimeError(f"NewsAPI error: {data.get('message', 'Unknown error')}")
+    return data
+
+
+async def fetch_news_query(company_name: str, since: Optional[str],
+                           until: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Up to NEWS_MAX_RESULTS raw articles for one query, and whether NewsAPI had more than that;
+    pages after the first are fetched concurrently
+    """
+    first = await fetch_news_page(company_name, 1, since, until)
+    wanted = min(first.get("totalResults", 0), NEWS_MAX_RESULTS)
+    pages = max(1, math.ceil(wanted / NEWS_PAGE_SIZE))
+    rest = await asyncio.gather(*(fetch_news_page(company_name, page, since, until)
+                                  for page in range(2, pages + 1)))
+    articles = first.get("articles", []) + [article for data in rest for article in data.get("articles", [])]
+    return articles, first.get("totalResults", 0) > NEWS_MAX_RESULTS
+
+
+async def fetch_new_articles(company_name: str, since: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Raw NewsAPI articles published since the watermark, and the watermark they cover. A delta cut off at
+    NEWS_MAX_RESULTS is followed by queries for older windows until the old watermark is reached; if it still
+    is not after NEWS_MAX_DELTA_QUERIES, the watermark only moves to the oldest article fetched. None means
+    the newest article fetched, as for a first fetch, which never looks further back.
+    """
+    articles, truncated = await fetch_news_query(company_name, since)
+    for _ in range(NEWS_MAX_DELTA_QUERIES - 1):
+        if not (since and truncated):
+            return articles, None
+        until = min((article.get("publishedAt") or "" for article in articles), default="")
+        window, truncated = await fetch_news_query(company_name, since, until)
+        articles += window
+        if min((article.get("publishedAt") or "" for article in window), default=until) >= until:
+            break  # More than NEWS_MAX_RESULTS articles share one timestamp; going further would not help
+    if not (since and truncated):
+        return articles, None
+    oldest = min((article.get("publishedAt") or "" for article in articles), default="") or None
+    print(f"Articles about {company_name} between {since} and {oldest} were skipped; "
+          f"more than {NEWS_MAX_DELTA_QUERIES} queries would be needed")
+    return articles, oldest
+
+
+async def store_new_articles(company_name: str, articles_data: List[Dict[str, Any]], checked_at: float,
+                             watermark: Optional[str] = None) -> int:
+    """
+    Score the articles not seen before and add everything to the store, moving the company's watermark to
+    `watermark` if given; returns how many were scored
+    """
+    articles = {}
+    for article_data in articles_data:
+        title = article_data.get("title", "")
+        description = article_data.get("description", "")
+        article = Article(
+            title=title or "No title",
+            description=description or "No description",
+            source=(article_data.get("source") or {}).get("name", "Unknown source"),
+            url=article_data.get("url", ""),
+            published_at=article_data.get("publishedAt", ""),
+            content=article_data.get("content", "")
         )
-def fetch_news(company_name: str, max_articles: int = 20) -> Dict[str, Any]:
-    """Fetch news about a company from NewsAPI"""
+        if article.url:
+            articles[url_hash(article.url)] = article
+
+    # Articles already stored (for this company or another) keep their sentiment instead of being rescored
+    stored = article_store.get_many(articles)
+    to_score = [key for key in articles if not (stored.get(key) or {}).get("sentiment")]
+    # Near-duplicate copies of a story share the score of its first copy
+    clusters = cluster_stories([story_text(articles[key]) for key in to_score])
+    # Analyze sentiment from title and description, scoring one copy of each new story in one call
+    sentiments = await sentiment_engine.score_batch_async(
+        [f"{articles[to_score[members[0]]].title} {articles[to_score[members[0]]].description}"
+         for members in clusters]
+    )
+    scored = {to_score[i]: sentiment for members, sentiment in zip(clusters, sentiments) for i in members}
+    for key, article in articles.items():
+        article.sentiment = scored.get(key) or stored[key]["sentiment"]
+
+    # Only the articles this call linked to the company count as new; a concurrent fetch of the same
+    # stories gets none back, so nothing is folded into the aggregates twice
+    new_for_company = article_store.add(company_name, [article.dict() for article in articles.values()], checked_at,
+                                        watermark)
+    add_to_aggregates(company_name, [articles[key] for key in new_for_company])
+    add_to_series(company_name, [articles[key] for key in new_for_company])
+    return len(clusters)
+
+
+def scored_stories(articles: List[Article]) -> List[Article]:
+    """One article per cluster of copies, keeping those with a sentiment score and a usable publish time"""
+    return [story for story in deduplicate_articles(articles)
+            if story.sentiment and parse_published_at(story.published_at) is not None]
+
+
+def add_to_aggregates(company_name: str, articles: List[Article]):
+    """Fold stories newly stored for a company into its rolling sentiment, each cluster of copies once"""
+    stories = scored_stories(articles)
+    sentiment_aggregates.add(
+        company_key(company_name),
+        [parse_published_at(story.published_at) for story in stories],
+        [story.sentiment.get("compound", 0.0) for story in stories],
+        [1 + math.log(story.duplicate_count) for story in stories]
+    )
+
+
+def add_to_series(company_name: str, articles: List[Article]):
+    """Append stories newly stored for a company to its sentiment time series"""
+    stories = scored_stories(articles)
+    sentiment_series.append(
+        company_key(company_name),
+        [parse_published_at(story.published_at) for story in stories],
+        [story.sentiment for story in stories]
+    )
+
+
+def seed_series(company_name: str):
+    """Backfill a company's sentiment series from stored articles if the series has none yet"""
+    if company_key(company_name) not in sentiment_series:
+        stored = article_store.recent(company_name, AGGREGATE_SEED_ARTICLES)
+        add_to_series(company_name, [Article(**article) for article in stored])
+
+
+def sentiment_trend(company_name: str) -> Optional[Dict[str, Optional[float]]]:
+    """Rolling sentiment for a company, first rebuilt from stored articles if there is none yet"""
+    key = company_key(company_name)
+    if key not in sentiment_aggregates:
+        stored = article_store.recent(company_name, AGGREGATE_SEED_ARTICLES)
+        add_to_aggregates(company_name, [Article(**article) for article in stored])
+    return sentiment_aggregates.summary(key)
+
+
+async def fetch_news(company_name: str, max_articles: int = 20) -> Dict[str, Any]:
+    """News about a company from the article store, after pulling anything new from NewsAPI"""
     try:
-        # Prepare the API request
-        params = {
-            "q": company_name,  # Search query
-            "apiKey": NEWS_API_KEY,
-            "language": "en",
-            "pageSize": max_articles  # Limit the number of articles returned
-        }
-        
-        # Make the API request
-        response = requests.get(NEWS_API_URL, params=params)
-        response.raise_for_status()  # Raise exception for HTTP errors
-        
-        data = response.json()
-        
-        if data.get("status") != "ok":
-            return Error(text=f"NewsAPI error: {data.get('message', 'Unknown error')}")
-        
-        # Add debug logging to see what we're getting from the API
-        articles_data = data.get("articles", [])
-        print(f"API returned {len(articles_data)} articles")
-        if len(articles_data) > 0:
-            print(f"First article: {articles_data[0]}")
-        
-        # Process all the articles returned (up to max_articles)
-        articles = []
-        # Make sure we're processing all returned articles
-        for article_data in articles_data:
-            # Analyze sentiment from title and description
-            title = article_data.get("title", "")
-            description = article_data.get("description", "")
-            text_for_sentiment = f"{title} {description}"
-            sentiment = analyze_sentiment(text_for_sentiment)
-            
-            article = Article(
-                title=title or "No title",
-                description=description or "No description",
-                source=article_data.get("source", {}).get("name", "Unknown source"),
-                url=article_data.get("url", ""),
-                published_at=article_data.get("publishedAt", ""),
-                content=article_data.get("content", ""),
-                sentiment=sentiment  # Add sentiment analysis
-            )
-            articles.append(article)
-        
+        watermark = article_store.watermark(company_name)
+        if watermark is not None:
+            # Make sure articles stored before the aggregates and series existed are counted before new ones
+            # are added; afterwards the company is registered and would never be backfilled
+            sentiment_trend(company_name)
+            seed_series(company_name)
+        now = time.time()
+        if watermark is None or watermark["checked_at"] + NEWS_REFRESH_INTERVAL <= now:
+            since = watermark["published_at"] if watermark else None
+            try:
+                articles_data, covered = await fetch_new_articles(company_name, since or None)
+            except Exception as e:
+                if watermark is None:
+                    raise
+                # NewsAPI is down or out of quota; what is already stored is still worth returning
+                print(f"Serving stored articles for {company_name}: {str(e)}")
+            else:
+                scored = await store_new_articles(company_name, articles_data, now, covered)
+                print(f"NewsAPI returned {len(articles_data)} articles since {since or 'the start'}, "
+                      f"{scored} new stories scored")
+
+        # Syndicated copies are collapsed before the summary so its article budget goes to distinct stories
+        candidates = [Article(**article)
+                      for article in article_store.recent(company_name, max_articles * DEDUP_POOL_FACTOR)]
+        articles = deduplicate_articles(candidates)[:max_articles]
+
         # Generate a summary using Hugging Face
         summary = None
         if articles:
-            summary = generate_news_summary(company_name, articles)
-        
+            summary = await generate_news_summary(company_name, articles, sentiment_trend(company_name))
+
         # Create the response
         return NewsResponse(
             company_name=company_name,
             articles=articles,
-            total_results=data.get("totalResults", 0),
+            total_results=article_store.count(company_name),
             summary=summary
         )
-    
+
     except Exception as e:
         print(f"Error fetching news: {str(e)}")
         return Error(text=f"Failed to fetch news: {str(e)}")
@@ -245,9 +498,15 @@ async def startup(ctx: Context):
         ctx.logger.warning("NewsAPI key not configured. Please set the NEWS_API_KEY environment variable.")
     if HUGGINGFACE_API_KEY == "hf_api_key_here":
         ctx.logger.warning("Hugging Face API key not configured. Please set the HUGGINGFACE_API_KEY environment variable.")
+    if sentiment_engine.workers > 0:
+        sentiment_engine.start_pool()
+        ctx.logger.info(f"Sentiment scoring pool started with {sentiment_engine.workers} worker processes")
+    removed = article_store.purge()
+    if removed:
+        ctx.logger.info(f"Purged {removed} old articles from the article store")
     
     # # Test fetch news and log the result
-    # test_result = fetch_news("Apple", 5)  # Reduced to 5 for faster testing
+    # test_result = await fetch_news("Apple", 5)  # Reduced to 5 for faster testing
     # if isinstance(test_result, NewsResponse):
     #     ctx.logger.info(f"Test fetch news found {len(test_result.articles)} articles")
     #     for i, article in enumerate(test_result.articles):
@@ -257,13 +516,38 @@ async def startup(ctx: Context):
     # else:
     #     ctx.logger.error(f"Test fetch failed: {test_result.text}")
 
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    """Close pooled HTTP connections and sentiment workers"""
+    await http_client.close()
+    sentiment_engine.shutdown()
+    sentiment_aggregates.save()
+    sentiment_series.flush()
+    article_store.close()
+
+@agent.on_interval(period=AGGREGATES_SAVE_INTERVAL)
+async def save_aggregates(ctx: Context):
+    """Persist rolling sentiment and the time series now and then, so a crash loses little"""
+    sentiment_aggregates.save()
+    sentiment_series.flush()
+
+async def fetch_news_once(company_name: str, max_articles: int = 20):
+    """fetch_news, shared by concurrent requests for the same company; returns a copy the caller may modify"""
+    key = (" ".join(company_name.lower().split()), max_articles)
+    response = await news_flights.do(key, lambda: fetch_news(company_name, max_articles))
+    return response.copy()
+
 @agent.on_message(model=NewsRequest)
 async def handle_news_request(ctx: Context, sender: str, request: NewsRequest):
     """Handle news request and return news articles"""
     ctx.logger.info(f"Received request to fetch news about: {request.company_name}")
-    
+    # Fetch in the background so other requests are not queued behind NewsAPI and Hugging Face
+    spawn(process_news_request(ctx, sender, request), ctx.logger)
+
+async def process_news_request(ctx: Context, sender: str, request: NewsRequest):
+    """Fetch news for a request and send the response back"""
     # Fetch news about the company
-    response = fetch_news(request.company_name, request.max_articles)
+    response = await fetch_news_once(request.company_name, request.max_articles)
 
     # Add more detailed logging to debug
     if isinstance(response, NewsResponse):
@@ -283,6 +567,69 @@ async def handle_news_request(ctx: Context, sender: str, request: NewsRequest):
         ctx.logger.error(f"Error response: {response.text}")
     
     # Send the response
+    response.request_id = request.request_id
+    await ctx.send(sender, response)
+
+@agent.on_message(model=BatchNewsRequest)
+async def handle_batch_news_request(ctx: Context, sender: str, batch: BatchNewsRequest):
+    """Handle news requests for several companies and return per-company results"""
+    ctx.logger.info(f"Received batch request to fetch news about {len(batch.requests)} companies")
+    spawn(process_batch_news_request(ctx, sender, batch), ctx.logger)
+
+async def process_batch_news_request(ctx: Context, sender: str, batch: BatchNewsRequest):
+    """Fetch news for every company concurrently and send back whatever succeeded"""
+    # Batch fetches queue behind single requests when NewsAPI quota is tight
+    request_priority.set(PRIORITY_BATCH)
+    async def fetch(request: NewsRequest) -> NewsResult:
+        response = await fetch_news_once(request.company_name, request.max_articles)
+        if isinstance(response, NewsResponse):
+            response.request_id = request.request_id
+            return NewsResult(company_name=request.company_name, response=response)
+        return NewsResult(company_name=request.company_name, error=response.text)
+
+    results = await gather_limited(fetch, batch.requests, BATCH_CONCURRENCY)
+    results = [
+        result if isinstance(result, NewsResult)
+        else NewsResult(company_name=request.company_name, error=f"Failed to fetch news: {str(result)}")
+        for request, result in zip(batch.requests, results)
+    ]
+    failed = sum(1 for result in results if result.error)
+    ctx.logger.info(f"Returning news for {len(results) - failed} of {len(results)} companies to {sender}")
+    await ctx.send(sender, BatchNewsResponse(results=results, request_id=batch.request_id))
+
+def sentiment_history(request: SentimentSeriesRequest) -> SentimentSeriesResponse:
+    """Bucketed sentiment for a company, first backfilled from stored articles if the series has none yet"""
+    if request.interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+    end = parse_published_at(request.end) if request.end else time.time()
+    start = parse_published_at(request.start) if request.start else end - SERIES_DEFAULT_DAYS * 86400
+    if start is None or end is None:
+        raise ValueError("start and end must be ISO 8601 dates or times")
+    seed_series(request.company_name)
+    series = sentiment_series.query(company_key(request.company_name), start, end, request.interval,
+                                    request.include_empty)
+    # Columns are already typed, so skip per-value validation for long ranges
+    return SentimentSeriesResponse.construct(
+        company_name=request.company_name,
+        interval=request.interval,
+        start=[time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t)) for t in series["start"]],
+        count=series["count"],
+        compound=series["compound"],
+        pos=series["pos"],
+        neg=series["neg"],
+        neu=series["neu"],
+        request_id=request.request_id
+    )
+
+@agent.on_message(model=SentimentSeriesRequest)
+async def handle_sentiment_series_request(ctx: Context, sender: str, request: SentimentSeriesRequest):
+    """Answer sentiment history from the local series; no NewsAPI or model calls"""
+    try:
+        response = sentiment_history(request)
+    except ValueError as e:
+        await ctx.send(sender, Error(text=str(e), request_id=request.request_id))
+        return
+    ctx.logger.info(f"Returning {len(response.start)} {request.interval} buckets for {request.company_name} to {sender}")
     await ctx.send(sender, response)
 
 if __name__ == "__main__":
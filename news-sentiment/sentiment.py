@@ -0,0 +1,145 @@
+"""
+Sentiment scoring engine for the news agent.
+
+Building a SentimentIntensityAnalyzer reloads the VADER lexicon from disk, so
+the engine builds one per process and reuses it. Scores are memoized by a hash
+of the text because the same syndicated headlines show up across companies,
+and score_batch() scores each distinct text in a batch only once.
+
+With SENTIMENT_WORKERS > 0, score_batch_async() sends large batches to a pool
+of worker processes in chunks, so scoring big article sets uses every core and
+does not block the agent's event loop.
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+SENTIMENT_CACHE_SIZE = int(os.environ.get("SENTIMENT_CACHE_SIZE", "50000"))  # Memoized texts
+SENTIMENT_WORKERS = int(os.environ.get("SENTIMENT_WORKERS", "0"))  # Worker processes; 0 scores in-process
+SENTIMENT_CHUNK_SIZE = int(os.environ.get("SENTIMENT_CHUNK_SIZE", "200"))  # Texts sent to a worker at once
+SENTIMENT_MIN_POOL_BATCH = int(os.environ.get("SENTIMENT_MIN_POOL_BATCH", "50"))  # Smaller batches stay in-process
+
+NEUTRAL_SCORES = {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+# Analyzer owned by each worker process, loaded once when the worker starts
+_worker_analyzer: Optional[SentimentIntensityAnalyzer] = None
+
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_chunk(texts: List[str]) -> List[Dict[str, float]]:
+    return [_worker_analyzer.polarity_scores(text) for text in texts]
+
+
+class SentimentEngine:
+    """VADER scoring with a single shared analyzer, a bounded score memo and an optional process pool"""
+
+    def __init__(self, cache_size: int = SENTIMENT_CACHE_SIZE, workers: int = SENTIMENT_WORKERS,
+                 chunk_size: int = SENTIMENT_CHUNK_SIZE, min_pool_batch: int = SENTIMENT_MIN_POOL_BATCH):
+        self.cache_size = cache_size
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.min_pool_batch = min_pool_batch
+        self._analyzer: Optional[SentimentIntensityAnalyzer] = None
+        self._cache: "OrderedDict[bytes, Dict[str, float]]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def analyzer(self) -> SentimentIntensityAnalyzer:
+        # Loaded on first use so importing the module stays cheap
+        if self._analyzer is None:
+            self._analyzer = SentimentIntensityAnalyzer()
+        return self._analyzer
+
+    def score(self, text: str) -> Dict[str, float]:
+        return self.score_batch([text])[0]
+
+    def start_pool(self):
+        """Start the worker processes and make each one load the lexicon now rather than on first use"""
+        if self.workers <= 0 or self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        for future in [self._pool.submit(_score_chunk, []) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def score_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """Scores for every text, in order; repeated and previously seen texts are not rescored"""
+        results, misses = self._lookup(texts)
+        for key, positions in misses.items():
+            self._fill(results, key, positions, self.analyzer.polarity_scores(texts[positions[0]]))
+        return results
+
+    async def score_batch_async(self, texts: List[str]) -> List[Dict[str, float]]:
+        """Like score_batch, but large batches are scored in the worker pool off the event loop"""
+        if self._pool is None:
+            return self.score_batch(texts)
+        results, misses = self._lookup(texts)
+        if len(misses) < self.min_pool_batch:
+            for key, positions in misses.items():
+                self._fill(results, key, positions, self.analyzer.polarity_scores(texts[positions[0]]))
+            return results
+
+        keys = list(misses)
+        unique_texts = [texts[misses[key][0]] for key in keys]
+        chunks = [unique_texts[i:i + self.chunk_size] for i in range(0, len(unique_texts), self.chunk_size)]
+        loop = asyncio.get_running_loop()
+        chunk_scores = await asyncio.gather(*(loop.run_in_executor(self._pool, _score_chunk, chunk)
+                                              for chunk in chunks))
+        scores = [score for chunk in chunk_scores for score in chunk]
+        for key, score in zip(keys, scores):
+            self._fill(results, key, misses[key], score)
+        return results
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[Optional[Dict[str, float]]], Dict[bytes, List[int]]]:
+        """Fill in empty and memoized texts; returns the partial results and positions still to score"""
+        results: List[Optional[Dict[str, float]]] = [None] * len(texts)
+        misses: Dict[bytes, List[int]] = {}
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = dict(NEUTRAL_SCORES)
+                continue
+            key = text_key(text)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                results[i] = dict(cached)
+            else:
+                misses.setdefault(key, []).append(i)
+        return results, misses
+
+    def _fill(self, results: List[Optional[Dict[str, float]]], key: bytes, positions: List[int],
+              scores: Dict[str, float]):
+        self._remember(key, scores)
+        for i in positions:
+            results[i] = dict(scores)
+
+    def _remember(self, key: bytes, scores: Dict[str, float]):
+        self._cache[key] = scores
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+
+# Shared by every request the agent handles
+sentiment_engine = SentimentEngine()
@@ -0,0 +1,176 @@
+"""
+Rolling, time-decayed sentiment per company for the news agent.
+
+The overall sentiment used to be a flat average over whatever articles one
+request returned. Instead, each company keeps a row of hourly buckets in NumPy
+arrays: a 30-day ring holding the weighted compound sum and weight per hour.
+Alongside it is a running average that decays exponentially with article age
+(half-life SENTIMENT_HALF_LIFE_HOURS). New articles are folded in as they are
+stored, so a query reads one row and never rescores anything. The arrays are
+saved to an .npz file on shutdown and loaded at startup.
+"""
+
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+SENTIMENT_AGGREGATES_PATH = os.environ.get(
+    "SENTIMENT_AGGREGATES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_aggregates.npz")
+)
+SENTIMENT_HALF_LIFE_HOURS = float(os.environ.get("SENTIMENT_HALF_LIFE_HOURS", "72"))
+
+RING_HOURS = 30 * 24  # Hourly buckets kept per company
+WINDOWS = {"1d": 24, "7d": 7 * 24, "30d": 30 * 24}  # Rolling windows reported, in hours
+
+
+def parse_published_at(value: Optional[str]) -> Optional[float]:
+    """Unix time of a NewsAPI publishedAt such as 2024-05-01T12:30:00Z, or None if missing or malformed"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def label_for(compound: Optional[float]) -> str:
+    """VADER's usual thresholds for an average compound score"""
+    if compound is None:
+        return "Neutral"
+    if compound >= 0.05:
+        return "Positive"
+    if compound <= -0.05:
+        return "Negative"
+    return "Neutral"
+
+
+class SentimentAggregates:
+    """One row of hourly buckets and a decayed running average per company"""
+
+    def __init__(self, path: Optional[str] = SENTIMENT_AGGREGATES_PATH,
+                 half_life_hours: float = SENTIMENT_HALF_LIFE_HOURS):
+        self.path = path
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)  # Per second
+        self.index: Dict[str, int] = {}
+        self.sums = np.zeros((0, RING_HOURS))  # Weighted compound per hour
+        self.weights = np.zeros((0, RING_HOURS))  # Weight (stories) per hour
+        self.head = np.zeros(0, dtype=np.int64)  # Newest hour (since the epoch) in each company's ring
+        self.decayed_sum = np.zeros(0)  # Weighted compound, decayed to decay_ref
+        self.decayed_weight = np.zeros(0)
+        self.decay_ref = np.zeros(0)  # Unix time the decayed sums are expressed at
+        if path and os.path.exists(path):
+            self.load()
+
+    def __contains__(self, company: str) -> bool:
+        return company in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _row(self, company: str) -> int:
+        row = self.index.get(company)
+        if row is not None:
+            return row
+        row = len(self.index)
+        if row >= len(self.head):
+            # Grow every array by doubling, so adding companies stays cheap
+            capacity = max(16, 2 * len(self.head))
+            grow = capacity - len(self.head)
+            self.sums = np.vstack([self.sums, np.zeros((grow, RING_HOURS))])
+            self.weights = np.vstack([self.weights, np.zeros((grow, RING_HOURS))])
+            self.head = np.concatenate([self.head, np.zeros(grow, dtype=np.int64)])
+            self.decayed_sum = np.concatenate([self.decayed_sum, np.zeros(grow)])
+            self.decayed_weight = np.concatenate([self.decayed_weight, np.zeros(grow)])
+            self.decay_ref = np.concatenate([self.decay_ref, np.zeros(grow)])
+        self.index[company] = row
+        return row
+
+    def add(self, company: str, timestamps: Sequence[float], compounds: Sequence[float],
+            weights: Optional[Sequence[float]] = None):
+        """Fold newly stored stories (unix publish times and compound scores) into a company's aggregates"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if not len(timestamps):
+            return
+        compounds = np.asarray(compounds, dtype=np.float64)
+        weights = np.ones(len(timestamps)) if weights is None else np.asarray(weights, dtype=np.float64)
+        row = self._row(company)
+
+        # Advance the ring to the newest hour, clearing buckets that now fall outside it
+        hours = (timestamps // 3600).astype(np.int64)
+        newest = int(hours.max())
+        head = int(self.head[row])
+        if newest > head:
+            cleared = np.arange(max(head + 1, newest - RING_HOURS + 1), newest + 1) % RING_HOURS
+            self.sums[row, cleared] = 0.0
+            self.weights[row, cleared] = 0.0
+            self.head[row] = head = newest
+        in_ring = hours > head - RING_HOURS
+        np.add.at(self.sums[row], hours[in_ring] % RING_HOURS, weights[in_ring] * compounds[in_ring])
+        np.add.at(self.weights[row], hours[in_ring] % RING_HOURS, weights[in_ring])
+
+        # Move the decayed sums forward to the newest story, then add each story decayed to that point
+        latest = float(timestamps.max())
+        if latest > self.decay_ref[row]:
+            factor = math.exp(-self.decay_rate * (latest - self.decay_ref[row])) if self.decay_ref[row] else 0.0
+            self.decayed_sum[row] *= factor
+            self.decayed_weight[row] *= factor
+            self.decay_ref[row] = latest
+        decay = np.exp(-self.decay_rate * (self.decay_ref[row] - timestamps))
+        self.decayed_sum[row] += float(np.sum(weights * compounds * decay))
+        self.decayed_weight[row] += float(np.sum(weights * decay))
+
+    def summary(self, company: str, now: Optional[float] = None) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Decayed average compound score and the average over each rolling window ending now (None for an empty
+        window), plus "weight", the decayed number of stories behind the decayed average. None if unknown.
+        """
+        row = self.index.get(company)
+        if row is None:
+            return None
+        now = time.time() if now is None else now
+        now_hour = int(now // 3600)
+        head = int(self.head[row])
+        result: Dict[str, Optional[float]] = {}
+        decayed_weight = self.decayed_weight[row]
+        result["decayed"] = float(self.decayed_sum[row] / decayed_weight) if decayed_weight > 0 else None
+        result["weight"] = float(decayed_weight * math.exp(-self.decay_rate * max(0.0, now - self.decay_ref[row])))
+        for name, hours in WINDOWS.items():
+            # Only hours still held in the ring and not in the future of `now`
+            start = max(now_hour - hours + 1, head - RING_HOURS + 1)
+            slots = np.arange(start, min(now_hour, head) + 1) % RING_HOURS
+            weight = float(self.weights[row, slots].sum())
+            result[name] = float(self.sums[row, slots].sum() / weight) if weight > 0 else None
+        return result
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        size = len(self.index)
+        companies = sorted(self.index, key=self.index.get)
+        # Write next to the target and rename, so a crash never leaves a half-written file
+        temporary = f"{path}.tmp.npz"
+        np.savez_compressed(
+            temporary, companies=np.array(companies, dtype=str), sums=self.sums[:size],
+            weights=self.weights[:size], head=self.head[:size], decayed_sum=self.decayed_sum[:size],
+            decayed_weight=self.decayed_weight[:size], decay_ref=self.decay_ref[:size]
+        )
+        os.replace(temporary, path)
+
+    def load(self, path: Optional[str] = None):
+        with np.load(path or self.path) as data:
+            self.index = {str(company): row for row, company in enumerate(data["companies"])}
+            self.sums = data["sums"]
+            self.weights = data["weights"]
+            self.head = data["head"]
+            self.decayed_sum = data["decayed_sum"]
+            self.decayed_weight = data["decayed_weight"]
+            self.decay_ref = data["decay_ref"]
@@ -0,0 +1,206 @@
+"""
+Sentiment time series for the news agent.
+
+Every stored story's scores are appended to a columnar store: one
+memory-mapped file per column (company id, timestamp, compound, pos, neg, neu)
+in SENTIMENT_SERIES_DIR. As rows are appended they are also added to hourly
+and daily buckets per company. The buckets are dense memory-mapped arrays
+indexed by hours or days since SERIES_EPOCH, holding the story count and the
+score sums. A date-range query is a slice of one company's bucket file, so a
+year of daily or hourly history comes back in milliseconds without reading
+the raw rows. Files grow by doubling and rely on the filesystem for sparse
+zero fill.
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+SENTIMENT_SERIES_DIR = os.environ.get(
+    "SENTIMENT_SERIES_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_series")
+)
+SERIES_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp()  # Stories published earlier are not bucketed
+
+RAW_COLUMNS = {"company": np.uint32, "timestamp": np.float64, "compound": np.float32, "pos": np.float32,
+               "neg": np.float32, "neu": np.float32}
+SCORES = ["compound", "pos", "neg", "neu"]
+BUCKET_FIELDS = ["count"] + SCORES  # Per bucket: story count, then the sum of each score
+INTERVALS = {"hour": 3600, "day": 86400}  # Bucket width in seconds
+MIN_CAPACITY = 1024  # Rows (or buckets) allocated when a file is created
+OPEN_BUCKET_FILES = 256  # Bucket files kept mapped at once; each mapping holds a file descriptor
+# Most buckets one query may return (about two years of hours); longer ranges are rejected
+MAX_QUERY_BUCKETS = int(os.environ.get("SERIES_MAX_QUERY_BUCKETS", "17568"))
+
+
+class GrowableArray:
+    """A memory-mapped array on disk whose first dimension grows by doubling"""
+
+    def __init__(self, path: str, dtype, width: Optional[int] = None):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.array: Optional[np.memmap] = None
+        if os.path.exists(path) and os.path.getsize(path):
+            self._open(os.path.getsize(path) // self._row_bytes)
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.dtype.itemsize * (self.width or 1)
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self.array is None else self.array.shape[0]
+
+    def _open(self, rows: int):
+        shape = (rows, self.width) if self.width else (rows,)
+        self.array = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=shape)
+
+    def ensure(self, rows: int):
+        """Make room for at least `rows` rows; new rows read as zero"""
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity, MIN_CAPACITY)
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+        with open(self.path, "ab") as f:
+            f.truncate(capacity * self._row_bytes)
+        self._open(capacity)
+
+    def flush(self):
+        if self.array is not None:
+            self.array.flush()
+
+
+class SentimentSeries:
+    """Append-only columnar sentiment rows with dense hourly and daily buckets per company"""
+
+    def __init__(self, directory: str = SENTIMENT_SERIES_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        meta = {"rows": 0, "companies": {}}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        self.rows: int = meta["rows"]
+        self.companies: Dict[str, int] = meta["companies"]
+        self.columns = {name: GrowableArray(os.path.join(directory, f"{name}.col"), dtype)
+                        for name, dtype in RAW_COLUMNS.items()}
+        self._buckets: "OrderedDict[tuple, GrowableArray]" = OrderedDict()
+
+    def __contains__(self, company: str) -> bool:
+        return company in self.companies
+
+    def _company_id(self, company: str) -> int:
+        if company not in self.companies:
+            company_id = len(self.companies)
+            # Bucket files left by an id that was never saved (a crash before the last flush) are not this company's
+            for interval in INTERVALS:
+                leftover = os.path.join(self.directory, f"{interval}_{company_id}.buckets")
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            self.companies[company] = company_id
+            # Bucket files persist as soon as they are written, so the id they belong to must as well
+            self._write_meta()
+        return self.companies[company]
+
+    def _bucket_file(self, company_id: int, interval: str) -> GrowableArray:
+        key = (company_id, interval)
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            path = os.path.join(self.directory, f"{interval}_{company_id}.buckets")
+            buckets = self._buckets[key] = GrowableArray(path, np.float64, width=len(BUCKET_FIELDS))
+            if len(self._buckets) > OPEN_BUCKET_FILES:
+                _, evicted = self._buckets.popitem(last=False)
+                evicted.flush()
+        self._buckets.move_to_end(key)
+        return buckets
+
+    def append(self, company: str, timestamps: Sequence[float], scores: Sequence[Dict[str, float]]):
+        """Store one row per story (unix publish time and VADER scores) and add it to the buckets"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if not len(timestamps):
+            return
+        company_id = self._company_id(company)
+        values = np.array([[score.get(name, 0.0) for name in SCORES] for score in scores], dtype=np.float64)
+
+        start, end = self.rows, self.rows + len(timestamps)
+        for column in self.columns.values():
+            column.ensure(end)
+        self.columns["company"].array[start:end] = company_id
+        self.columns["timestamp"].array[start:end] = timestamps
+        for j, name in enumerate(SCORES):
+            self.columns[name].array[start:end] = values[:, j]
+        self.rows = end
+
+        bucketed = timestamps >= SERIES_EPOCH
+        contributions = np.column_stack([np.ones(int(bucketed.sum())), values[bucketed]])
+        for interval, width in INTERVALS.items():
+            indexes = ((timestamps[bucketed] - SERIES_EPOCH) // width).astype(np.int64)
+            if not len(indexes):
+                continue
+            buckets = self._bucket_file(company_id, interval)
+            buckets.ensure(int(indexes.max()) + 1)
+            np.add.at(buckets.array, indexes, contributions)
+
+    def query(self, company: str, start: float, end: float, interval: str = "day",
+              include_empty: bool = False, now: Optional[float] = None) -> Dict[str, list]:
+        """
+        Buckets of `interval` ("hour" or "day") overlapping [start, end): bucket start times (unix), story counts
+        and the mean of each score (None for empty buckets). Empty buckets are left out unless include_empty.
+        The range is clamped to [SERIES_EPOCH, now + one interval]; ValueError if it still spans more than
+        MAX_QUERY_BUCKETS buckets.
+        """
+        width = INTERVALS[interval]
+        series = {"start": [], "count": [], **{name: [] for name in SCORES}}
+        now = time.time() if now is None else now
+        end = min(end, now + width)
+        first = max(0, int((start - SERIES_EPOCH) // width))
+        last = int(np.ceil((end - SERIES_EPOCH) / width))  # Exclusive
+        if last <= first:
+            return series
+        if last - first > MAX_QUERY_BUCKETS:
+            raise ValueError(f"Range spans {last - first} {interval} buckets; at most {MAX_QUERY_BUCKETS} are allowed")
+        available = np.zeros((0, len(BUCKET_FIELDS)))
+        company_id = self.companies.get(company)
+        if company_id is not None:
+            stored = self._bucket_file(company_id, interval)
+            if stored.capacity > first:
+                available = stored.array[first:min(last, stored.capacity)]
+        if include_empty:
+            buckets = np.zeros((last - first, len(BUCKET_FIELDS)))
+            buckets[:len(available)] = available
+        else:
+            # Buckets past the end of the file are empty, so only the stored part is read
+            buckets = available
+        counts = buckets[:, 0]
+        keep = np.arange(len(buckets)) if include_empty else np.flatnonzero(counts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = buckets[keep, 1:] / counts[keep, None]
+        series["start"] = (SERIES_EPOCH + (first + keep) * width).tolist()
+        series["count"] = counts[keep].astype(np.int64).tolist()
+        for j, name in enumerate(SCORES):
+            series[name] = [None if count == 0 else float(value)
+                            for count, value in zip(counts[keep], means[:, j])]
+        return series
+
+    def flush(self):
+        """Write mapped pages and the row count/company ids to disk"""
+        for column in self.columns.values():
+            column.flush()
+        for buckets in self._buckets.values():
+            buckets.flush()
+        self._write_meta()
+
+    def _write_meta(self):
+        temporary = f"{self._meta_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"rows": self.rows, "companies": self.companies}, f)
+        os.replace(temporary, self._meta_path)
@@ -0,0 +1,320 @@
+"""
+Deterministic analytics over Alpha Vantage company overviews.
+
+The OVERVIEW payload is ~50 string fields, most of them numbers the model used
+to re-derive ratios from. Here the numeric fields are parsed into a float
+matrix (one row per company, NaN where missing) and the valuation,
+profitability, growth, health, price-trend and analyst metrics are computed for
+all rows at once with NumPy. From those metrics we build either a compact
+feature block for the Gemini prompt, or a full set of CompanyAnalysis
+summaries from templates, with no model call at all.
+"""
+
+import math
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Numeric OVERVIEW fields, in matrix column order
+NUMERIC_FIELDS = [
+    "MarketCapitalization", "EBITDA", "PERatio", "PEGRatio", "BookValue", "DividendPerShare", "DividendYield",
+    "EPS", "RevenuePerShareTTM", "ProfitMargin", "OperatingMarginTTM", "ReturnOnAssetsTTM", "ReturnOnEquityTTM",
+    "RevenueTTM", "GrossProfitTTM", "DilutedEPSTTM", "QuarterlyEarningsGrowthYOY", "QuarterlyRevenueGrowthYOY",
+    "AnalystTargetPrice", "AnalystRatingStrongBuy", "AnalystRatingBuy", "AnalystRatingHold", "AnalystRatingSell",
+    "AnalystRatingStrongSell", "TrailingPE", "ForwardPE", "PriceToSalesRatioTTM", "PriceToBookRatio", "EVToRevenue",
+    "EVToEBITDA", "Beta", "52WeekHigh", "52WeekLow", "50DayMovingAverage", "200DayMovingAverage",
+    "SharesOutstanding",
+]
+COLUMNS = {field: i for i, field in enumerate(NUMERIC_FIELDS)}
+MISSING_VALUES = {None, "None", "-", ""}  # How Alpha Vantage marks a field it has no value for
+DESCRIPTION_BUDGET = 400  # Characters of the business description kept for the prompt
+
+# CompanyAnalysis fields, in the order the model is asked for them
+SUMMARY_KEYS = [
+    "company_overview_summary", "valuation_summary", "profitability_summary", "growth_summary",
+    "financial_health_summary", "stock_performance_summary", "analyst_sentiment_summary",
+]
+
+
+def parse_number(value: Any) -> float:
+    """Alpha Vantage sends numbers as strings and "None", "-" or "" when missing"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def overview_matrix(overviews: List[Dict[str, Any]]) -> np.ndarray:
+    """Float matrix of NUMERIC_FIELDS, one row per overview"""
+    raw = ["nan" if value in MISSING_VALUES else str(value)
+           for overview in overviews for value in map(overview.get, NUMERIC_FIELDS)]
+    # Parsing in one C call instead of a float() per field keeps thousands of overviews in the millisecond range
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            flat = np.fromstring(",".join(raw), dtype=np.float64, sep=",") if raw else np.empty(0)
+        except ValueError:
+            flat = np.empty(0)
+    if len(flat) != len(raw):
+        # A non-numeric value stopped the fast parse; fall back to parsing field by field
+        flat = np.array([parse_number(value) for value in raw], dtype=np.float64)
+    flat[~np.isfinite(flat)] = np.nan
+    return flat.reshape(len(overviews), len(NUMERIC_FIELDS))
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def compute_metrics(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """Derived metrics for every row of an overview matrix; NaN wherever inputs are missing"""
+    col = lambda field: matrix[:, COLUMNS[field]]  # noqa: E731
+
+    # OVERVIEW has no quote, so back the price out of P/E or P/B, else use the 50-day average
+    price = col("TrailingPE") * col("DilutedEPSTTM")
+    price = np.where(np.isnan(price) | (price <= 0), col("PriceToBookRatio") * col("BookValue"), price)
+    price = np.where(np.isnan(price) | (price <= 0), col("50DayMovingAverage"), price)
+
+    ratings = matrix[:, [COLUMNS[field] for field in ("AnalystRatingStrongBuy", "AnalystRatingBuy", "AnalystRatingHold",
+                                                      "AnalystRatingSell", "AnalystRatingStrongSell")]]
+    rating_count = np.nansum(ratings, axis=1)
+    rating_count = np.where(np.all(np.isnan(ratings), axis=1), np.nan, rating_count)
+    # 1 = strong buy ... 5 = strong sell
+    rating_score = _ratio(np.nansum(ratings * np.arange(1, 6), axis=1), rating_count)
+
+    return {
+        # Valuation
+        "market_cap": col("MarketCapitalization"),
+        "trailing_pe": col("TrailingPE"),
+        "forward_pe": col("ForwardPE"),
+        "peg": col("PEGRatio"),
+        "price_to_sales": col("PriceToSalesRatioTTM"),
+        "price_to_book": col("PriceToBookRatio"),
+        "ev_to_ebitda": col("EVToEBITDA"),
+        "ev_to_revenue": col("EVToRevenue"),
+        "earnings_yield": _ratio(np.ones(len(matrix)), col("TrailingPE")),
+        # Profitability
+        "gross_margin": _ratio(col("GrossProfitTTM"), col("RevenueTTM")),
+        "ebitda_margin": _ratio(col("EBITDA"), col("RevenueTTM")),
+        "operating_margin": col("OperatingMarginTTM"),
+        "profit_margin": col("ProfitMargin"),
+        "return_on_equity": col("ReturnOnEquityTTM"),
+        "return_on_assets": col("ReturnOnAssetsTTM"),
+        # Growth
+        "revenue": col("RevenueTTM"),
+        "revenue_growth": col("QuarterlyRevenueGrowthYOY"),
+        "earnings_growth": col("QuarterlyEarningsGrowthYOY"),
+        "implied_eps_growth": _ratio(col("TrailingPE"), col("ForwardPE")) - 1,
+        # Financial health
+        "eps": col("DilutedEPSTTM"),
+        "book_value_per_share": col("BookValue"),
+        "dividend_yield": col("DividendYield"),
+        "payout_ratio": _ratio(col("DividendPerShare"), col("DilutedEPSTTM")),
+        "equity_to_market_cap": _ratio(col("BookValue") * col("SharesOutstanding"), col("MarketCapitalization")),
+        # Stock performance
+        "price": price,
+        "beta": col("Beta"),
+        "range_position": _ratio(price - col("52WeekLow"), col("52WeekHigh") - col("52WeekLow")),
+        "from_52w_high": _ratio(price, col("52WeekHigh")) - 1,
+        "price_vs_50dma": _ratio(price, col("50DayMovingAverage")) - 1,
+        "dma50_vs_dma200": _ratio(col("50DayMovingAverage"), col("200DayMovingAverage")) - 1,
+        # Analyst sentiment
+        "analyst_count": rating_count,
+        "buy_share": _ratio(ratings[:, 0] + ratings[:, 1], rating_count),
+        "sell_share": _ratio(ratings[:, 3] + ratings[:, 4], rating_count),
+        "rating_score": rating_score,
+        "target_upside": _ratio(col("AnalystTargetPrice"), price) - 1,
+        "target_price": col("AnalystTargetPrice"),
+    }
+
+
+def company_metrics(overview: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """Metrics for a single overview as plain floats, None where unavailable"""
+    metrics = compute_metrics(overview_matrix([overview]))
+    return {name: (None if np.isnan(values[0]) else float(values[0])) for name, values in metrics.items()}
+
+
+def _money(value: Optional[float]) -> str:
+    if value is None:
+        return "n/a"
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if abs(value) >= threshold:
+            return f"${value / threshold:.1f}{suffix}"
+    return f"${value:,.0f}"
+
+
+def _pct(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value * 100:.1f}%"
+
+
+def _num(value: Optional[float], suffix: str = "") -> str:
+    return "n/a" if value is None else f"{value:.2f}{suffix}"
+
+
+def _count(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:.0f}"
+
+
+def feature_block(overview: Dict[str, Any], metrics: Optional[Dict[str, Optional[float]]] = None) -> str:
+    """Compact, pre-computed summary of an overview for the analysis prompt"""
+    m = metrics if metrics is not None else company_metrics(overview)
+    description = (overview.get("Description") or "")[:DESCRIPTION_BUDGET]
+    lines = [
+        f"Company: {overview.get('Name', 'n/a')} ({overview.get('Symbol', 'n/a')}), {overview.get('Sector', 'n/a')} / "
+        f"{overview.get('Industry', 'n/a')}, {overview.get('Exchange', 'n/a')}, {overview.get('Country', 'n/a')}",
+        f"Business: {description}",
+        f"Valuation: market cap {_money(m['market_cap'])}; P/E {_num(m['trailing_pe'])} trailing, "
+        f"{_num(m['forward_pe'])} forward; PEG {_num(m['peg'])}; P/S {_num(m['price_to_sales'])}; "
+        f"P/B {_num(m['price_to_book'])}; EV/EBITDA {_num(m['ev_to_ebitda'])}; earnings yield {_pct(m['earnings_yield'])}",
+        f"Profitability: gross margin {_pct(m['gross_margin'])}; EBITDA margin {_pct(m['ebitda_margin'])}; "
+        f"operating margin {_pct(m['operating_margin'])}; net margin {_pct(m['profit_margin'])}; "
+        f"ROE {_pct(m['return_on_equity'])}; ROA {_pct(m['return_on_assets'])}",
+        f"Growth: revenue TTM {_money(m['revenue'])}; quarterly revenue YoY {_pct(m['revenue_growth'])}; "
+        f"quarterly earnings YoY {_pct(m['earnings_growth'])}; EPS growth implied by forward P/E "
+        f"{_pct(m['implied_eps_growth'])}",
+        f"Financial health: diluted EPS {_num(m['eps'])}; book value/share {_num(m['book_value_per_share'])}; "
+        f"dividend yield {_pct(m['dividend_yield'])}; payout ratio {_pct(m['payout_ratio'])}; "
+        f"book equity / market cap {_pct(m['equity_to_market_cap'])}",
+        f"Stock: price ~{_num(m['price'])}; beta {_num(m['beta'])}; {_pct(m['range_position'])} of 52-week range; "
+        f"{_pct(m['from_52w_high'])} from 52-week high; {_pct(m['price_vs_50dma'])} vs 50-day MA; "
+        f"50-day MA {_pct(m['dma50_vs_dma200'])} vs 200-day MA",
+        f"Analysts: {_count(m['analyst_count'])} ratings, {_pct(m['buy_share'])} buy, {_pct(m['sell_share'])} sell, "
+        f"mean score {_num(m['rating_score'])} (1 strong buy - 5 strong sell); target {_num(m['target_price'])} "
+        f"({_pct(m['target_upside'])} vs price)",
+    ]
+    return "\n".join(lines)
+
+
+def _level(value: Optional[float], bands, labels) -> Optional[str]:
+    """Label for the band value falls in; bands are ascending upper bounds, one fewer than labels"""
+    if value is None:
+        return None
+    for bound, label in zip(bands, labels):
+        if value < bound:
+            return label
+    return labels[-1]
+
+
+def template_analysis(overview: Dict[str, Any], metrics: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, str]:
+    """CompanyAnalysis summaries written from the metrics alone, without a model call"""
+    m = metrics if metrics is not None else company_metrics(overview)
+    name = overview.get("Name") or overview.get("Symbol") or "The company"
+
+    description = (overview.get("Description") or "").split(". ")[0].strip().rstrip(".")
+    overview_summary = (f"{name} is a {(overview.get('Sector') or 'n/a').lower()} company in "
+                        f"{(overview.get('Industry') or 'n/a').lower()}, listed on {overview.get('Exchange') or 'n/a'} "
+                        f"with a market capitalization of {_money(m['market_cap'])}.")
+    if description:
+        overview_summary += f" {description}."
+
+    pe_level = _level(m["trailing_pe"], (0, 15, 30), ("negative-earnings", "low", "moderate", "premium"))
+    valuation = (f"Shares trade at {_num(m['trailing_pe'], 'x')} trailing and {_num(m['forward_pe'], 'x')} forward "
+                 f"earnings (PEG {_num(m['peg'])}), {_num(m['price_to_sales'], 'x')} sales and "
+                 f"{_num(m['price_to_book'], 'x')} book value, with EV/EBITDA of {_num(m['ev_to_ebitda'], 'x')}.")
+    if pe_level:
+        valuation += f" That is a {pe_level} earnings multiple."
+
+    margin_level = _level(m["profit_margin"], (0, 0.05, 0.15), ("loss-making", "thin", "healthy", "strong"))
+    profitability = (f"Gross margin is {_pct(m['gross_margin'])}, operating margin {_pct(m['operating_margin'])} "
+                     f"and net margin {_pct(m['profit_margin'])}, with return on equity of "
+                     f"{_pct(m['return_on_equity'])} and return on assets of {_pct(m['return_on_assets'])}.")
+    if margin_level:
+        profitability += f" Overall profitability is {margin_level}."
+
+    growth_level = _level(m["revenue_growth"], (0, 0.05, 0.15), ("shrinking", "slow", "steady", "fast"))
+    growth = (f"Trailing revenue is {_money(m['revenue'])}, with quarterly revenue {_pct(m['revenue_growth'])} and "
+              f"earnings {_pct(m['earnings_growth'])} year over year; the forward P/E implies EPS growth of "
+              f"{_pct(m['implied_eps_growth'])}.")
+    if growth_level:
+        growth += f" The top line is {growth_level}."
+
+    health = (f"Diluted EPS is {_num(m['eps'])} and book value {_num(m['book_value_per_share'])} per share. "
+              f"The dividend yield is {_pct(m['dividend_yield'])} with a payout ratio of {_pct(m['payout_ratio'])}.")
+    if m["payout_ratio"] is not None and m["payout_ratio"] > 1:
+        health += " Dividends currently exceed earnings."
+
+    trend = _level(m["dma50_vs_dma200"], (-0.02, 0.02), ("a downtrend", "a sideways trend", "an uptrend"))
+    performance = (f"The stock sits at {_pct(m['range_position'])} of its 52-week range, {_pct(m['from_52w_high'])} "
+                   f"from the high, with a beta of {_num(m['beta'])}.")
+    if trend:
+        performance += (f" The 50-day average is {_pct(m['dma50_vs_dma200'])} against the 200-day average, "
+                        f"{trend}.")
+
+    stance = _level(m["rating_score"], (2.0, 2.5, 3.5), ("strongly positive", "positive", "neutral", "negative"))
+    analysts = (f"{_count(m['analyst_count'])} analysts cover the stock: {_pct(m['buy_share'])} rate it a buy and "
+                f"{_pct(m['sell_share'])} a sell. The mean target of {_num(m['target_price'])} implies "
+                f"{_pct(m['target_upside'])} from the current price.")
+    if stance:
+        analysts += f" Sentiment is {stance}."
+
+    return dict(zip(SUMMARY_KEYS, [overview_summary, valuation, profitability, growth, health, performance, analysts]))
+
+
+# Metrics compared across peers, with whether a higher value is better
+PEER_METRICS = [
+    ("trailing_pe", False), ("forward_pe", False), ("peg", False), ("price_to_sales", False),
+    ("price_to_book", False), ("ev_to_ebitda", False), ("gross_margin", True), ("operating_margin", True),
+    ("profit_margin", True), ("return_on_equity", True), ("return_on_assets", True), ("revenue_growth", True),
+    ("earnings_growth", True), ("dividend_yield", True), ("target_upside", True),
+]
+# Multiples are only comparable while earnings/book value are positive
+POSITIVE_ONLY = {"trailing_pe", "forward_pe", "peg", "price_to_sales", "price_to_book", "ev_to_ebitda"}
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Column-wise percentile rank (0-100, ties averaged) among the non-NaN values; NaN stays NaN"""
+    ranks = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        present = ~np.isnan(column)
+        if not present.any():
+            continue
+        ordered = np.sort(column[present])
+        below = np.searchsorted(ordered, column[present], side="left")
+        through = np.searchsorted(ordered, column[present], side="right")
+        ranks[present, j] = (below + through) / 2 / len(ordered) * 100
+    return ranks
+
+
+def _nanmean(values: np.ndarray, axis: int) -> np.ndarray:
+    """np.nanmean without the warning for all-NaN slices, which are common in sparse overviews"""
+    count = np.sum(~np.isnan(values), axis=axis)
+    return _ratio(np.nansum(values, axis=axis), count.astype(np.float64))
+
+
+def z_scores(values: np.ndarray) -> np.ndarray:
+    """Column-wise standard scores ignoring NaN; columns without spread score 0"""
+    mean = _nanmean(values, axis=0)
+    std = np.sqrt(_nanmean((values - mean) ** 2, axis=0))
+    scores = _ratio(values - mean, std)
+    return np.where(np.isnan(values) | ~(std > 0), np.where(np.isnan(values), np.nan, 0.0), scores)
+
+
+def peer_comparison(overviews: Dict[str, Dict[str, Any]], metrics=PEER_METRICS) -> Dict[str, Any]:
+    """
+    Percentile ranks and z-scores of every company against the rest of the group.
+    Returns tickers, metric names, the raw values, percentiles and z-scores (rows x metrics), and a composite
+    score: the mean percentile with lower-is-better metrics flipped, so 100 is best on everything.
+    """
+    tickers = list(overviews)
+    computed = compute_metrics(overview_matrix([overviews[ticker] for ticker in tickers]))
+    names = [name for name, _ in metrics]
+    values = np.column_stack([computed[name] for name in names]) if tickers else np.empty((0, len(names)))
+    for j, name in enumerate(names):
+        if name in POSITIVE_ONLY:
+            values[values[:, j] <= 0, j] = np.nan
+    percentiles = percentile_ranks(values)
+    higher_is_better = np.array([better for _, better in metrics])
+    oriented = np.where(higher_is_better, percentiles, 100 - percentiles)
+    score = _nanmean(oriented, axis=1)
+    return {
+        "tickers": tickers,
+        "metrics": names,
+        "values": values,
+        "percentiles": percentiles,
+        "z_scores": z_scores(values),
+        "score": score,
+    }
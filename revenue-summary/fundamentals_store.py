@@ -0,0 +1,113 @@
+"""
+Local store of Alpha Vantage company overviews.
+
+OVERVIEW data changes at most once a day, but the free tier allows only a few
+requests per minute and per day. Each fetched overview is kept as a snapshot
+keyed by ticker and UTC fetch date in a SQLite file. The agent answers from the
+newest snapshot while it is younger than FUNDAMENTALS_MAX_AGE, and falls back to
+an older one when Alpha Vantage is throttling or down. prefetch_fundamentals.py
+warms the store for a ticker list ahead of time.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from common.http_client import http_client
+from common.rate_limit import rate_limits
+
+FUNDAMENTALS_STORE_PATH = os.environ.get(
+    "FUNDAMENTALS_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fundamentals.sqlite3")
+)
+FUNDAMENTALS_MAX_AGE = float(os.environ.get("FUNDAMENTALS_MAX_AGE", str(24 * 3600)))  # Seconds a snapshot is fresh
+FUNDAMENTALS_HISTORY_DAYS = int(os.environ.get("FUNDAMENTALS_HISTORY_DAYS", "365"))  # Snapshots kept per ticker
+
+ALPHAVANTAGE_API_URL = "https://www.alphavantage.co/query"
+# Seconds to pause Alpha Vantage after it answers with a throttling Note
+ALPHAVANTAGE_THROTTLE_BACKOFF = 60
+
+
+def is_valid_overview(data: Dict[str, Any]) -> bool:
+    """True for a real overview; unknown symbols return {} and throttling returns a Note or Information"""
+    return isinstance(data, dict) and bool(data.get("Symbol"))
+
+
+async def fetch_overview(ticker: str, api_key: Optional[str]) -> Dict[str, Any]:
+    """Alpha Vantage OVERVIEW for a ticker, paced by the alphavantage rate limit"""
+    params = {"function": "OVERVIEW", "symbol": ticker, "apikey": api_key}
+    r = await http_client.get(ALPHAVANTAGE_API_URL, params=params, upstream="alphavantage")
+    data = r.json()
+    if "Note" in data:
+        # Alpha Vantage reports per-minute throttling as a 200 with a Note, so back off and try once more
+        rate_limits.get("alphavantage").backoff(ALPHAVANTAGE_THROTTLE_BACKOFF)
+        r = await http_client.get(ALPHAVANTAGE_API_URL, params=params, upstream="alphavantage")
+        data = r.json()
+    return data
+
+
+class FundamentalsStore:
+    """SQLite snapshots of company overviews, one per ticker per UTC day"""
+
+    def __init__(self, path: str = FUNDAMENTALS_STORE_PATH, max_age: float = FUNDAMENTALS_MAX_AGE):
+        self.max_age = max_age
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS overviews ("
+            "ticker TEXT, fetch_date TEXT, fetched_at REAL, data TEXT, PRIMARY KEY (ticker, fetch_date))"
+        )
+        self._db.commit()
+
+    def latest(self, ticker: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Newest snapshot for a ticker, or None if there is none younger than max_age (any age if None)"""
+        row = self._db.execute(
+            "SELECT data, fetched_at FROM overviews WHERE ticker = ? ORDER BY fetched_at DESC LIMIT 1",
+            (ticker.upper(),)
+        ).fetchone()
+        if row is None or (max_age is not None and row[1] + max_age <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def fresh(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Newest snapshot if it is within the freshness window"""
+        return self.latest(ticker, self.max_age)
+
+    def latest_many(self, tickers: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Newest snapshot of each ticker (all stored tickers if None), regardless of age"""
+        query = ("SELECT o.ticker, o.data FROM overviews o JOIN "
+                 "(SELECT ticker, MAX(fetched_at) AS fetched_at FROM overviews GROUP BY ticker) newest "
+                 "ON o.ticker = newest.ticker AND o.fetched_at = newest.fetched_at")
+        rows = self._db.execute(query).fetchall()
+        wanted = None if tickers is None else {ticker.upper() for ticker in tickers}
+        return {ticker: json.loads(data) for ticker, data in rows if wanted is None or ticker in wanted}
+
+    def put(self, ticker: str, data: Dict[str, Any]):
+        """Store today's snapshot for a ticker, replacing an earlier one from the same day"""
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO overviews (ticker, fetch_date, fetched_at, data) VALUES (?, ?, ?, ?)",
+            (ticker.upper(), time.strftime("%Y-%m-%d", time.gmtime(now)), now, json.dumps(data))
+        )
+        self._db.commit()
+
+    def stale_tickers(self, tickers: Iterable[str]) -> List[str]:
+        """Tickers without a fresh snapshot, never-fetched first and then oldest first"""
+        newest = dict(self._db.execute("SELECT ticker, MAX(fetched_at) FROM overviews GROUP BY ticker").fetchall())
+        cutoff = time.time() - self.max_age
+        stale = {ticker.upper() for ticker in tickers if newest.get(ticker.upper(), 0) <= cutoff}
+        return sorted(stale, key=lambda ticker: (newest.get(ticker, 0), ticker))
+
+    def purge_history(self, days: int = FUNDAMENTALS_HISTORY_DAYS) -> int:
+        """Delete snapshots older than days, keeping each ticker's newest; returns how many were removed"""
+        cursor = self._db.execute(
+            "DELETE FROM overviews WHERE fetched_at <= ? AND fetched_at < "
+            "(SELECT MAX(fetched_at) FROM overviews newest WHERE newest.ticker = overviews.ticker)",
+            (time.time() - days * 86400,)
+        )
+        self._db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
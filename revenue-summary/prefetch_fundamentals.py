@@ -0,0 +1,85 @@
+"""
+Warm the fundamentals store for a list of tickers.
+
+Fetches Alpha Vantage overviews for every ticker that has no fresh snapshot,
+never-fetched tickers first and then the oldest, paced by the same rate limits
+the agent uses. It stops cleanly when the daily quota or --max-requests is
+reached, so run it off-hours (e.g. from cron) and daytime requests are served
+from the store.
+
+Usage: python revenue-summary/prefetch_fundamentals.py tickers.txt [--max-requests 20] [--max-age 86400]
+
+The ticker file has one symbol per line; blank lines and lines starting with # are ignored.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.http_client import HttpError, http_client
+from common.rate_limit import RateLimitExceeded
+from fundamentals_store import FUNDAMENTALS_MAX_AGE, FundamentalsStore, fetch_overview, is_valid_overview
+
+ALPHAVANTAGE_API_KEY = os.environ.get("ALPHAVANTAGE_API_KEY")
+
+
+def read_tickers(path: str):
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line.split()[0].upper() for line in lines if line and not line.startswith("#")]
+
+
+async def prefetch(tickers, store: FundamentalsStore, max_requests=None):
+    """Fetch stale tickers one at a time until done or out of quota; returns (stored, failed, skipped)"""
+    stale = store.stale_tickers(tickers)
+    print(f"{len(tickers) - len(stale)} of {len(tickers)} tickers already fresh, {len(stale)} to fetch")
+    stored, failed = 0, []
+    for count, ticker in enumerate(stale):
+        if max_requests is not None and count >= max_requests:
+            print(f"Stopping at --max-requests {max_requests}")
+            break
+        try:
+            data = await fetch_overview(ticker, ALPHAVANTAGE_API_KEY)
+        except RateLimitExceeded as e:
+            print(f"Stopping: {str(e)}")
+            break
+        except HttpError as e:
+            failed.append(ticker)
+            print(f"{ticker}: {str(e)}")
+            continue
+        if "Information" in data:
+            # Alpha Vantage's own daily limit message; further requests today would be refused too
+            print(f"Stopping: {data['Information']}")
+            break
+        if not is_valid_overview(data):
+            failed.append(ticker)
+            print(f"{ticker}: no overview ({data.get('Note') or 'unknown symbol'})")
+            continue
+        store.put(ticker, data)
+        stored += 1
+        print(f"{ticker}: stored")
+    return stored, failed, len(stale) - stored - len(failed)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tickers", help="File with one ticker per line")
+    parser.add_argument("--max-requests", type=int, help="Leave the rest of today's quota for live traffic")
+    parser.add_argument("--max-age", type=float, default=FUNDAMENTALS_MAX_AGE,
+                        help="Seconds after which a stored snapshot is refetched")
+    args = parser.parse_args()
+
+    store = FundamentalsStore(max_age=args.max_age)
+    try:
+        stored, failed, skipped = await prefetch(read_tickers(args.tickers), store, args.max_requests)
+    finally:
+        await http_client.close()
+        store.close()
+    print(f"Stored {stored}, failed {len(failed)}, left for the next run {skipped}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,22 @@
 import json
+import math
 import os
-import requests
+import sys
 from bs4 import BeautifulSoup
+from typing import Dict, List, Optional
 from uagents import Agent, Context, Model
 
+# Make the shared helpers in common/ importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.http_client import HttpError, http_client
+from common.llm_cache import cache_key, llm_cache
+from common.rate_limit import PRIORITY_BATCH, RateLimitExceeded, request_priority
+from common.singleflight import SingleFlight
+from common.tasks import gather_limited, spawn
+from fundamentals_analytics import company_metrics, feature_block, peer_comparison, template_analysis
+from fundamentals_store import FundamentalsStore, fetch_overview, is_valid_overview
+
 agent = Agent(name="revenue_summary", port=8009)
 
 # Hugging Face API configuration
@@ -12,14 +25,26 @@ GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 ALPHAVANTAGE_API_KEY = os.environ.get("ALPHAVANTAGE_API_KEY")
 
 # Using the Falcon-7B-Instruct model
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+GEMINI_MODEL = "gemini-2.0-flash"
+GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
 HEADERS = {
     "Content-Type": "application/json"
 }
+GEMINI_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", "60"))  # Seconds
+# Seconds an identical analysis prompt is answered from the LLM cache
+REVENUE_SUMMARY_CACHE_TTL = float(os.environ.get("REVENUE_SUMMARY_CACHE_TTL", str(24 * 3600)))
+# Alpha Vantage and Gemini calls in progress, keyed by ticker
+analysis_flights = SingleFlight()
+# Alpha Vantage overviews, served locally within FUNDAMENTALS_MAX_AGE
+fundamentals_store = FundamentalsStore()
+BATCH_CONCURRENCY = int(os.environ.get("REVENUE_BATCH_CONCURRENCY", "5"))  # Tickers analyzed in parallel per batch
+# "llm" has Gemini write the analysis from pre-computed metrics; "template" fills it in locally without Gemini
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "llm")
 
 
 class overviewRequest(Model):
     ticker :str
+    request_id: Optional[str] = None  # Echoed back so callers can match the response
 
 class CompanyAnalysis(Model):
     company_overview_summary: str
@@ -29,10 +54,65 @@ class CompanyAnalysis(Model):
     financial_health_summary: str
     stock_performance_summary: str
     analyst_sentiment_summary: str
+    request_id: Optional[str] = None
+
+class BatchOverviewRequest(Model):
+    tickers: List[str]
+    request_id: Optional[str] = None
+
+class TickerAnalysis(Model):
+    # Outcome for one ticker in a batch; analysis is None when it failed
+    ticker: str
+    analysis: Optional[CompanyAnalysis] = None
+    error: Optional[str] = None
+
+class BatchCompanyAnalysis(Model):
+    results: List[TickerAnalysis]  # One per ticker, in request order
+    request_id: Optional[str] = None
+
+class PeerComparisonRequest(Model):
+    tickers: List[str] = []  # Companies to compare; empty means every company in the fundamentals store
+    sector: Optional[str] = None  # Only compare companies in this Alpha Vantage sector, e.g. "TECHNOLOGY"
+    request_id: Optional[str] = None
+
+class PeerRanking(Model):
+    ticker: str
+    name: Optional[str] = None
+    sector: Optional[str] = None
+    values: Dict[str, Optional[float]]
+    percentiles: Dict[str, Optional[float]]  # 0-100 within the group; None where the metric is missing
+    z_scores: Dict[str, Optional[float]]
+    score: Optional[float] = None  # Mean percentile with lower-is-better metrics flipped; 100 is best
+    rank: int
+
+class PeerComparison(Model):
+    results: List[PeerRanking]  # Best score first
+    missing: List[str] = []  # Requested tickers with no stored overview
+    request_id: Optional[str] = None
+
+def parse_gemini_analysis(result) -> dict:
+    """The analysis JSON object from a Gemini response; raises if the reply has no usable text"""
+    # Parse the actual text content from Gemini's response structure
+    generated_text = result['candidates'][0]['content']['parts'][0]['text']
+    
+    # Clean the text to extract just the JSON part
+    # Remove markdown code block indicators if present
+    cleaned_text = generated_text.replace('```json', '').replace('```', '').strip()
+    
+    # Parse the JSON
+    parsed_data = json.loads(cleaned_text)
+    if not isinstance(parsed_data, dict):
+        raise ValueError("Gemini did not return a JSON object")
+    return parsed_data
+
+async def get_revenue_summary(company_overview):
+    # Ratios, margins and price trends are computed locally; the model only has to interpret them
+    metrics = company_metrics(company_overview)
+    if ANALYSIS_MODE == "template":
+        return CompanyAnalysis(**template_analysis(company_overview, metrics))
 
-def get_revenue_summary(company_overview):
     # Formatted prompt that explicitly requests JSON formatting with specific keys
-    prompt = f"""You are a specialized financial analyst. Analyze the following company data: {json.dumps(company_overview, indent=2)} Create a comprehensive financial analysis with the following structure: 1. Company Overview: Briefly describe the company's business model and sector. 2. Valuation: Analyze P/E, PEG, P/S, P/B, EV/EBITDA ratios. 3. Profitability: Review profit margins, ROE, ROA, and operational efficiency. 4. Growth: Examine revenue and earnings growth rates. 5. Financial Health: Assess EPS, book value, and dividend policies. 6. Stock Performance: Evaluate beta, moving averages, and 52-week range. 7. Analyst Sentiment: Summarize analyst ratings and target prices. Return ONLY a valid JSON object with these exact keys: 'company_overview_summary', 'valuation_summary', 'profitability_summary', 'growth_summary', 'financial_health_summary', 'stock_performance_summary', 'analyst_sentiment_summary' Each value should be a concise, insightful paragraph without any formatting. Do not include any text outside the JSON object."""
+    prompt = f"""You are a specialized financial analyst. Analyze the following company data: {feature_block(company_overview, metrics)} Create a comprehensive financial analysis with the following structure: 1. Company Overview: Briefly describe the company's business model and sector. 2. Valuation: Analyze P/E, PEG, P/S, P/B, EV/EBITDA ratios. 3. Profitability: Review profit margins, ROE, ROA, and operational efficiency. 4. Growth: Examine revenue and earnings growth rates. 5. Financial Health: Assess EPS, book value, and dividend policies. 6. Stock Performance: Evaluate beta, moving averages, and 52-week range. 7. Analyst Sentiment: Summarize analyst ratings and target prices. Return ONLY a valid JSON object with these exact keys: 'company_overview_summary', 'valuation_summary', 'profitability_summary', 'growth_summary', 'financial_health_summary', 'stock_performance_summary', 'analyst_sentiment_summary' Each value should be a concise, insightful paragraph without any formatting. Do not include any text outside the JSON object."""
 
     payload = {
     "contents": [
@@ -47,21 +127,17 @@ def get_revenue_summary(company_overview):
     }
 
     try:
-        # Make request to Gemini API
-        response = requests.post(GEMINI_API_URL, headers=HEADERS, json=payload)
-        response.raise_for_status()
-
-        # Extract the response
-        result = response.json()
-        # Parse the actual text content from Gemini's response structure
-        generated_text = result['candidates'][0]['content']['parts'][0]['text']
-        
-        # Clean the text to extract just the JSON part
-        # Remove markdown code block indicators if present
-        cleaned_text = generated_text.replace('```json', '').replace('```', '').strip()
-        
-        # Parse the JSON
-        parsed_data = json.loads(cleaned_text)
+        async def call_model():
+            # Make request to Gemini API
+            response = await http_client.post(GEMINI_API_URL, headers=HEADERS, json=payload, timeout=GEMINI_TIMEOUT,
+                                              upstream="gemini")
+            response.raise_for_status()
+            return response.json()
+
+        # Identical prompts within the TTL are answered from the cache without any HTTP call; only replies
+        # that parse into an analysis are cached
+        parsed_data = await llm_cache.get_or_fetch(cache_key(GEMINI_MODEL, prompt), REVENUE_SUMMARY_CACHE_TTL,
+                                                   call_model, parse=parse_gemini_analysis)
         
         # Create and return a CompanyAnalysis object with the extracted data
         return CompanyAnalysis(
@@ -74,7 +150,7 @@ def get_revenue_summary(company_overview):
             analyst_sentiment_summary=parsed_data.get("analyst_sentiment_summary", "No analyst sentiment information available.")
         )
 
-    except requests.exceptions.RequestException as e:
+    except HttpError as e:
         # Handle API connection errors
         return CompanyAnalysis(
             company_overview_summary=f"Error connecting to Gemini API: {str(e)}",
@@ -108,29 +184,150 @@ def get_revenue_summary(company_overview):
             analyst_sentiment_summary="Error: Unexpected failure"
         )
 
-def get_company_overview(ticker):
-    url = f'https://www.alphavantage.co/query?function=OVERVIEW&symbol={ticker}&apikey={ALPHAVANTAGE_API_KEY}'
-    r = requests.get(url)
-    data = r.json()
-    return data
+async def get_company_overview(ticker):
+    """Company overview from the fundamentals store while fresh, otherwise from Alpha Vantage"""
+    ticker = ticker.strip().upper()
+    stored = fundamentals_store.fresh(ticker)
+    if stored is not None:
+        return stored
+    try:
+        data = await fetch_overview(ticker, ALPHAVANTAGE_API_KEY)
+    except Exception:
+        # Out of quota or unreachable: an older snapshot is better than no analysis
+        stale = fundamentals_store.latest(ticker)
+        if stale is not None:
+            return stale
+        raise
+    if is_valid_overview(data):
+        fundamentals_store.put(ticker, data)
+        return data
+    stale = fundamentals_store.latest(ticker)
+    if stale is not None:
+        return stale
+    # Throttling notes and the empty reply for an unknown symbol are not worth analyzing
+    reason = (data.get("Note") or data.get("Information")) if isinstance(data, dict) else None
+    raise ValueError(reason or f"No company overview for {ticker}")
 
 # @agent.on_event("startup")
 # async def request_company_info(ctx: Context):
 #     ctx.logger.info(f"Requesting company information for ticker: {company_test_ticker}")
-#     overview = get_company_overview("IBM")
+#     overview = await get_company_overview("IBM")
 #     ctx.logger.info(f"Overview {str(overview)}")
-#     revenue_overview_summary = get_revenue_summary(overview)
+#     revenue_overview_summary = await get_revenue_summary(overview)
 #     ctx.logger.info(f"Revenue Overview Summary {str(revenue_overview_summary)}")
 
 
+def compare_peers(tickers: List[str], sector: Optional[str] = None):
+    """Rank stored overviews against each other; returns (rankings, tickers with no stored overview)"""
+    wanted = [ticker.strip().upper() for ticker in tickers]
+    stored = fundamentals_store.latest_many(wanted or None)
+    overviews = {ticker: overview for ticker, overview in stored.items()
+                 if not sector or (overview.get("Sector") or "").upper() == sector.strip().upper()}
+    comparison = peer_comparison(overviews)
+
+    def row(values, i):
+        return {name: (None if math.isnan(value) else round(float(value), 4))
+                for name, value in zip(comparison["metrics"], values[i])}
+
+    rankings = []
+    for i, ticker in enumerate(comparison["tickers"]):
+        score = comparison["score"][i]
+        # Built from already-typed values; skipping validation keeps whole-sector comparisons fast
+        rankings.append(PeerRanking.construct(
+            ticker=ticker,
+            name=overviews[ticker].get("Name"),
+            sector=overviews[ticker].get("Sector"),
+            values=row(comparison["values"], i),
+            percentiles=row(comparison["percentiles"], i),
+            z_scores=row(comparison["z_scores"], i),
+            score=None if math.isnan(score) else round(float(score), 2),
+            rank=0,
+        ))
+    rankings.sort(key=lambda ranking: (ranking.score is None, -(ranking.score or 0), ranking.ticker))
+    for rank, ranking in enumerate(rankings, 1):
+        ranking.rank = rank
+    missing = [ticker for ticker in wanted if ticker not in stored]
+    return rankings, missing
+
+
+@agent.on_event("startup")
+async def startup(ctx: Context):
+    removed = fundamentals_store.purge_history()
+    if removed:
+        ctx.logger.info(f"Purged {removed} old fundamentals snapshots")
+
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    await http_client.close()
+    fundamentals_store.close()
+
+
+async def analyze_ticker(ticker):
+    """Overview plus Gemini analysis for a ticker; concurrent requests for one ticker share a single run"""
+    async def analyze():
+        overview = await get_company_overview(ticker)
+        return await get_revenue_summary(overview)
+
+    return await analysis_flights.do(ticker.strip().upper(), analyze)
+
+
 @agent.on_message(model=overviewRequest)
 async def handle_response(ctx: Context, sender: str, msg: overviewRequest):
     ctx.logger.info(f"Received response from {sender}:")
-    overview = get_company_overview(msg.ticker)
-    revenue_overview_summary = get_revenue_summary(overview)
+    # Run the Alpha Vantage + Gemini round trip in the background so requests overlap
+    spawn(process_overview_request(ctx, sender, msg), ctx.logger)
+
+
+def failed_analysis(error: Exception) -> CompanyAnalysis:
+    """Analysis whose sections carry the error, for a ticker whose overview could not be fetched"""
+    return CompanyAnalysis(
+        company_overview_summary=f"Error fetching company overview: {str(error)}",
+        valuation_summary="Error: No company overview",
+        profitability_summary="Error: No company overview",
+        growth_summary="Error: No company overview",
+        financial_health_summary="Error: No company overview",
+        stock_performance_summary="Error: No company overview",
+        analyst_sentiment_summary="Error: No company overview"
+    )
+
+
+async def process_overview_request(ctx: Context, sender: str, msg: overviewRequest):
+    try:
+        # The analysis may be shared with concurrent requests for the same ticker, so reply with a copy
+        revenue_overview_summary = (await analyze_ticker(msg.ticker)).copy()
+    except (RateLimitExceeded, HttpError, ValueError) as e:
+        # Alpha Vantage is out of quota, unreachable or has no overview, and there is no stored snapshot
+        ctx.logger.warning(f"No overview for {msg.ticker}: {e}")
+        revenue_overview_summary = failed_analysis(e)
     ctx.logger.info(f"Revenue Overview Summary {str(revenue_overview_summary)}")
+    revenue_overview_summary.request_id = msg.request_id
     await ctx.send(sender,revenue_overview_summary)
 
 
+@agent.on_message(model=BatchOverviewRequest)
+async def handle_batch_request(ctx: Context, sender: str, msg: BatchOverviewRequest):
+    ctx.logger.info(f"Received batch of {len(msg.tickers)} tickers from {sender}")
+    spawn(process_batch_overview_request(ctx, sender, msg), ctx.logger)
+
+
+async def process_batch_overview_request(ctx: Context, sender: str, msg: BatchOverviewRequest):
+    # Batch lookups queue behind single requests when Alpha Vantage or Gemini quota is tight
+    request_priority.set(PRIORITY_BATCH)
+    analyses = await gather_limited(analyze_ticker, msg.tickers, BATCH_CONCURRENCY)
+    results = []
+    for ticker, analysis in zip(msg.tickers, analyses):
+        if isinstance(analysis, Exception):
+            results.append(TickerAnalysis(ticker=ticker, error=str(analysis)))
+        else:
+            results.append(TickerAnalysis(ticker=ticker, analysis=analysis))
+    ctx.logger.info(f"Analyzed {sum(1 for r in results if r.analysis)} of {len(results)} tickers in batch")
+    await ctx.send(sender, BatchCompanyAnalysis(results=results, request_id=msg.request_id))
 
 
+@agent.on_message(model=PeerComparisonRequest)
+async def handle_peer_comparison(ctx: Context, sender: str, msg: PeerComparisonRequest):
+    # Works only from stored overviews, so it answers straight away without Alpha Vantage or Gemini
+    rankings, missing = compare_peers(msg.tickers, msg.sector)
+    ctx.logger.info(f"Compared {len(rankings)} companies for {sender}, {len(missing)} not in the fundamentals store")
+    await ctx.send(sender, PeerComparison(results=rankings, missing=missing, request_id=msg.request_id))
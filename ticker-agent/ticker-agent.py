@@ -2,9 +2,21 @@
 This agent writes a greeting in the logs on startup.
 """
 
-from uagents import Agent, Context, Model
-import requests
+import os
 import re
+import sys
+from typing import List, Optional
+from uagents import Agent, Context, Model
+
+# Make the shared helpers in common/ importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.http_client import http_client
+from common.rate_limit import PRIORITY_BATCH, request_priority
+from common.singleflight import SingleFlight
+from common.tasks import gather_limited, spawn
+from ticker_cache import TickerCache
+from ticker_index import TICKER_LISTING_PATH, TRUSTED_FUZZY_SCORE, load_default_index
 
 # Create the agent
 agent = Agent(
@@ -13,69 +25,152 @@ agent = Agent(
     endpoint="http://localhost:8008/submit"
 )
 
+YAHOO_SEARCH_URL = "https://query1.finance.yahoo.com/v1/finance/search"
+BATCH_CONCURRENCY = int(os.environ.get("TICKER_BATCH_CONCURRENCY", "10"))  # Lookups in flight per batch
+NO_MATCH_MESSAGE = "No matching ticker found"
+
+# Found tickers and confirmed misses are cached on disk, keyed by the cleaned company name
+ticker_cache = TickerCache()
+# Local listing searched before any network call; empty when no listing file is present
+ticker_index = load_default_index()
+# Concurrent lookups of the same cleaned name share one search
+ticker_flights = SingleFlight()
+
 # Define message schemas
 class CompanyRequest(Model):
     company_name: str
+    request_id: Optional[str] = None  # Echoed back so callers can match the response
 
 class TickerResponse(Model):
     company_name: str
     ticker: str
     success: bool
     message: str
+    request_id: Optional[str] = None
+
+class BatchCompanyRequest(Model):
+    company_names: List[str]
+    request_id: Optional[str] = None
+
+class BatchTickerResponse(Model):
+    results: List[TickerResponse]  # One per company name, in request order
+    request_id: Optional[str] = None
 
 @agent.on_event("startup")
 async def startup(ctx: Context):
     """Logs hello message on startup"""
     ctx.logger.info(f"Ticker Agent started. Address: {ctx.address}")
+    if len(ticker_index):
+        ctx.logger.info(f"Loaded {len(ticker_index)} symbols from {TICKER_LISTING_PATH}")
+    else:
+        ctx.logger.info(f"No symbol listing at {TICKER_LISTING_PATH}, all lookups go to Yahoo Finance")
+    removed = ticker_cache.purge_expired()
+    if removed:
+        ctx.logger.info(f"Purged {removed} expired ticker cache entries")
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    """Closes pooled HTTP connections and the ticker cache"""
+    await http_client.close()
+    ticker_cache.close()
 
 @agent.on_message(model=CompanyRequest)
 async def handle_company_request(ctx: Context, sender: str, request: CompanyRequest):
     """Handles incoming requests for company ticker symbols"""
-    company_name = request.company_name
-    ctx.logger.info(f"Received request for company: {company_name}")
+    # Look the ticker up in the background so other requests are not queued behind Yahoo
+    spawn(process_company_request(ctx, sender, request), ctx.logger)
 
+async def process_company_request(ctx: Context, sender: str, request: CompanyRequest):
+    """Resolves a ticker symbol and replies to the sender"""
+    ctx.logger.info(f"Received request for company: {request.company_name}")
+    await ctx.send(sender, await lookup_ticker(ctx, request.company_name, request.request_id))
+
+@agent.on_message(model=BatchCompanyRequest)
+async def handle_batch_company_request(ctx: Context, sender: str, request: BatchCompanyRequest):
+    """Handles requests for many ticker symbols in one message"""
+    ctx.logger.info(f"Received batch request for {len(request.company_names)} companies")
+    spawn(process_batch_company_request(ctx, sender, request), ctx.logger)
+
+async def process_batch_company_request(ctx: Context, sender: str, request: BatchCompanyRequest):
+    """Resolves every company concurrently and replies with one result per company"""
+    # Batch lookups queue behind single requests when Yahoo pacing kicks in
+    request_priority.set(PRIORITY_BATCH)
+    results = await gather_limited(lambda name: lookup_ticker(ctx, name), request.company_names,
+                                   BATCH_CONCURRENCY)
+    found = sum(1 for result in results if result.success)
+    ctx.logger.info(f"Found {found} of {len(results)} tickers in batch")
+    await ctx.send(sender, BatchTickerResponse(results=results, request_id=request.request_id))
+
+async def lookup_ticker(ctx: Context, company_name: str, request_id: Optional[str] = None) -> TickerResponse:
+    """Looks up one company and wraps the outcome, including failures, in a TickerResponse"""
     try:
         # Search for the ticker symbol using Yahoo Finance search API
-        ticker_info = get_ticker_symbol(company_name)
+        ticker_info = await ticker_flights.do(clean_company_name(company_name).lower(),
+                                              lambda: get_ticker_symbol(company_name))
 
         if ticker_info["success"]:
             ctx.logger.info(f"Found ticker for {company_name}: {ticker_info['ticker']}")
         else:
             ctx.logger.info(f"Could not find ticker for {company_name}: {ticker_info['message']}")
 
-        # Send the response
-        await ctx.send(
-            sender,
-            TickerResponse(
-                company_name=company_name,
-                ticker=ticker_info["ticker"],
-                success=ticker_info["success"],
-                message=ticker_info["message"]
-            )
+        return TickerResponse(
+            company_name=company_name,
+            ticker=ticker_info["ticker"],
+            success=ticker_info["success"],
+            message=ticker_info["message"],
+            request_id=request_id
         )
     except Exception as e:
         ctx.logger.error(f"Error processing request: {str(e)}")
-        await ctx.send(
-            sender,
-            TickerResponse(
-                company_name=company_name,
-                ticker="",
-                success=False,
-                message=f"Error processing request: {str(e)}"
-            )
+        return TickerResponse(
+            company_name=company_name,
+            ticker="",
+            success=False,
+            message=f"Error processing request: {str(e)}",
+            request_id=request_id
         )
 
-def get_ticker_symbol(company_name):
+async def get_ticker_symbol(company_name):
+    """
+    Looks up a ticker symbol from the local index, then the cache, and Yahoo Finance only on a miss.
+    Exact, alias and near-identical index matches are trusted; a looser fuzzy match ("meta" vs "metal")
+    is only used when Yahoo cannot be reached.
+    """
+    query = clean_company_name(company_name)
+    match = ticker_index.lookup(query)
+    if match is not None and (match.method != "fuzzy" or match.score >= TRUSTED_FUZZY_SCORE):
+        return index_result(match)
+
+    cache_key = query.lower()
+    cached = ticker_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = await search_yahoo_ticker(query)
+    # Only cache real answers; API errors and exceptions should be retried next time
+    if result["success"] or result["message"] == NO_MATCH_MESSAGE:
+        ticker_cache.set(cache_key, result)
+    elif match is not None:
+        return index_result(match)
+    return result
+
+def index_result(match):
+    return {
+        "success": True,
+        "ticker": match.entry.symbol,
+        "message": f"Ticker found in local index ({match.method} match on '{match.entry.name}')"
+    }
+
+async def search_yahoo_ticker(query):
     """
     Searches Yahoo Finance for a ticker symbol based on company name using their search API.
     """
     try:
-        query = clean_company_name(company_name)
-        url = f"https://query1.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=1&newsCount=0"
+        params = {"q": query, "quotesCount": 1, "newsCount": 0}
         headers = {
             "User-Agent": "Mozilla/5.0"
         }
-        response = requests.get(url, headers=headers)
+        response = await http_client.get(YAHOO_SEARCH_URL, params=params, headers=headers, upstream="yahoo")
 
         if response.status_code == 200:
             data = response.json()
@@ -91,7 +186,7 @@ def get_ticker_symbol(company_name):
                 return {
                     "success": False,
                     "ticker": "",
-                    "message": "No matching ticker found"
+                    "message": NO_MATCH_MESSAGE
                 }
         else:
             return {
@@ -0,0 +1,84 @@
+"""
+Persistent cache for ticker lookups.
+
+Company-to-ticker mappings almost never change, so results are kept in a small
+SQLite file with separate lifetimes for found and not-found answers, behind an
+in-process LRU so repeat lookups never leave memory.
+"""
+
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+TICKER_CACHE_PATH = os.environ.get(
+    "TICKER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ticker_cache.sqlite3")
+)
+POSITIVE_TTL = float(os.environ.get("TICKER_CACHE_POSITIVE_TTL", str(30 * 24 * 3600)))  # 30 days
+NEGATIVE_TTL = float(os.environ.get("TICKER_CACHE_NEGATIVE_TTL", str(24 * 3600)))  # 1 day
+LRU_SIZE = int(os.environ.get("TICKER_CACHE_LRU_SIZE", "10000"))
+
+
+class TickerCache:
+    """SQLite-backed ticker cache with an in-memory LRU in front"""
+
+    def __init__(self, path: str = TICKER_CACHE_PATH, positive_ttl: float = POSITIVE_TTL,
+                 negative_ttl: float = NEGATIVE_TTL, lru_size: int = LRU_SIZE):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tickers ("
+            "key TEXT PRIMARY KEY, ticker TEXT, success INTEGER, message TEXT, expires_at REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached lookup result for a cleaned company name, or None if missing or expired"""
+        now = time.time()
+        entry = self._lru.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._lru.move_to_end(key)
+                return dict(entry[0])
+            del self._lru[key]
+
+        row = self._db.execute(
+            "SELECT ticker, success, message, expires_at FROM tickers WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[3] <= now:
+            return None
+        result = {"success": bool(row[1]), "ticker": row[0], "message": row[2]}
+        self._remember(key, result, row[3])
+        return dict(result)
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """Store a lookup result; found and not-found answers get different lifetimes"""
+        ttl = self.positive_ttl if result["success"] else self.negative_ttl
+        expires_at = time.time() + ttl
+        entry = {"success": result["success"], "ticker": result["ticker"], "message": result["message"]}
+        self._db.execute(
+            "INSERT OR REPLACE INTO tickers (key, ticker, success, message, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, entry["ticker"], int(entry["success"]), entry["message"], expires_at)
+        )
+        self._db.commit()
+        self._remember(key, entry, expires_at)
+
+    def purge_expired(self) -> int:
+        """Delete expired rows; returns how many were removed"""
+        cursor = self._db.execute("DELETE FROM tickers WHERE expires_at <= ?", (time.time(),))
+        self._db.commit()
+        return cursor.rowcount
+
+    def _remember(self, key: str, result: Dict[str, Any], expires_at: float):
+        self._lru[key] = (result, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def close(self):
+        self._db.close()
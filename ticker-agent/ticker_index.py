@@ -0,0 +1,181 @@
+"""
+Local symbol index for offline ticker lookup.
+
+Loads a listing file of symbols and company names and answers lookups by exact
+normalized name, by alias, or by trigram similarity, so most requests never
+need the Yahoo Finance search call.
+
+The listing is a CSV (or pipe-delimited file such as Nasdaq's nasdaqlisted.txt)
+with a header row. Recognised columns are symbol, name, exchange and aliases,
+where aliases are separated by "|" or ";" (only in comma-delimited files).
+"""
+
+import csv
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+TICKER_LISTING_PATH = os.environ.get(
+    "TICKER_LISTING_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "listings.csv")
+)
+MIN_FUZZY_SCORE = float(os.environ.get("TICKER_INDEX_MIN_SCORE", "0.7"))  # Dice similarity, 0-1
+# Fuzzy matches at least this similar are answered without asking Yahoo; weaker ones are only a fallback
+TRUSTED_FUZZY_SCORE = float(os.environ.get("TICKER_INDEX_TRUSTED_SCORE", "0.9"))
+PREFERRED_EXCHANGES = [e.strip().upper() for e in
+                       os.environ.get("TICKER_PREFERRED_EXCHANGES", "NASDAQ,NYSE").split(",") if e.strip()]
+
+# Header spellings accepted for each column
+SYMBOL_COLUMNS = {"symbol", "ticker", "act symbol"}
+NAME_COLUMNS = {"name", "company name", "security name", "company"}
+EXCHANGE_COLUMNS = {"exchange", "market"}
+ALIAS_COLUMNS = {"aliases", "alias"}
+
+LEGAL_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "company", "co", "ltd", "limited",
+                  "plc", "llc", "lp", "sa", "ag", "nv", "holdings", "group", "the", "com"}
+
+
+@dataclass
+class ListingEntry:
+    symbol: str
+    name: str
+    exchange: str = ""
+
+
+@dataclass
+class IndexMatch:
+    entry: ListingEntry
+    score: float  # 1.0 for exact or alias matches
+    method: str  # "exact", "alias" or "fuzzy"
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case, drop share-class descriptions, punctuation and legal suffixes"""
+    name = name.lower().split(" - ")[0]
+    name = name.replace("&", " and ")
+    name = re.sub(r"[^a-z0-9 ]+", " ", name)
+    tokens = name.split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens.pop(0)
+    return " ".join(tokens)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TickerIndex:
+    """In-memory symbol index searchable by normalized name, alias and trigram similarity"""
+
+    def __init__(self, min_score: float = MIN_FUZZY_SCORE):
+        self.min_score = min_score
+        self.entries: List[ListingEntry] = []
+        self._by_name: Dict[str, List[int]] = defaultdict(list)
+        self._by_alias: Dict[str, List[int]] = defaultdict(list)
+        self._keys: List[str] = []  # Normalized names and aliases that have trigrams
+        self._key_entries: List[int] = []  # Entry id for each key
+        self._key_sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)  # Trigram -> key ids
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, symbol: str, name: str, exchange: str = "", aliases: Optional[List[str]] = None):
+        entry_id = len(self.entries)
+        self.entries.append(ListingEntry(symbol=symbol.strip().upper(), name=name.strip(),
+                                         exchange=exchange.strip().upper()))
+        normalized = normalize_name(name)
+        if normalized:
+            self._by_name[normalized].append(entry_id)
+            self._add_key(normalized, entry_id)
+        for alias in aliases or []:
+            normalized_alias = normalize_name(alias)
+            if normalized_alias and normalized_alias != normalized:
+                self._by_alias[normalized_alias].append(entry_id)
+                self._add_key(normalized_alias, entry_id)
+
+    def _add_key(self, key: str, entry_id: int):
+        key_id = len(self._keys)
+        grams = trigrams(key)
+        self._keys.append(key)
+        self._key_entries.append(entry_id)
+        self._key_sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(key_id)
+
+    def load(self, path: str) -> int:
+        """Add every row of a listing file; returns the number of entries loaded"""
+        with open(path, newline="", encoding="utf-8") as f:
+            header = f.readline()
+            f.seek(0)
+            delimiter = "|" if header.count("|") > header.count(",") else ","
+            reader = csv.DictReader(f, delimiter=delimiter)
+            columns = {column.strip().lower(): column for column in reader.fieldnames or []}
+
+            def pick(names):
+                return next((columns[n] for n in names if n in columns), None)
+
+            symbol_col, name_col = pick(SYMBOL_COLUMNS), pick(NAME_COLUMNS)
+            exchange_col, alias_col = pick(EXCHANGE_COLUMNS), pick(ALIAS_COLUMNS)
+            if not symbol_col or not name_col:
+                raise ValueError(f"Listing file {path} needs symbol and name columns")
+
+            loaded = 0
+            for row in reader:
+                symbol, name = (row.get(symbol_col) or "").strip(), (row.get(name_col) or "").strip()
+                if not symbol or not name:
+                    continue
+                aliases = []
+                if alias_col and row.get(alias_col):
+                    aliases = [a for a in re.split(r"[|;]", row[alias_col]) if a.strip()]
+                self.add(symbol, name, (row.get(exchange_col) or "") if exchange_col else "", aliases)
+                loaded += 1
+            return loaded
+
+    def _best(self, entry_ids: List[int]) -> ListingEntry:
+        """Pick among equally good entries, preferring primary exchanges"""
+        def rank(entry_id):
+            exchange = self.entries[entry_id].exchange
+            preferred = PREFERRED_EXCHANGES.index(exchange) if exchange in PREFERRED_EXCHANGES else len(PREFERRED_EXCHANGES)
+            return preferred, len(self.entries[entry_id].symbol)
+        return self.entries[min(entry_ids, key=rank)]
+
+    def lookup(self, company_name: str) -> Optional[IndexMatch]:
+        """Best match for a company name, or None if nothing is similar enough"""
+        query = normalize_name(company_name)
+        if not query:
+            return None
+        if query in self._by_name:
+            return IndexMatch(self._best(self._by_name[query]), 1.0, "exact")
+        if query in self._by_alias:
+            return IndexMatch(self._best(self._by_alias[query]), 1.0, "alias")
+
+        # Count shared trigrams per indexed key and score with the Dice coefficient
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            for key_id in self._postings.get(gram, ()):
+                shared[key_id] += 1
+        best_score, best_keys = 0.0, []
+        for key_id, count in shared.items():
+            score = 2.0 * count / (len(query_grams) + self._key_sizes[key_id])
+            if score > best_score:
+                best_score, best_keys = score, [key_id]
+            elif score == best_score:
+                best_keys.append(key_id)
+        if best_score < self.min_score:
+            return None
+        return IndexMatch(self._best([self._key_entries[k] for k in best_keys]), round(best_score, 3), "fuzzy")
+
+
+def load_default_index() -> TickerIndex:
+    """Index built from TICKER_LISTING_PATH; empty if the file does not exist"""
+    index = TickerIndex()
+    if os.path.exists(TICKER_LISTING_PATH):
+        index.load(TICKER_LISTING_PATH)
+    return index
@@ -0,0 +1,162 @@
+"""
+Benchmark: homepage parser backends on homepage HTML fixtures.
+
+Runs every installed backend from parsers.py (plus the streaming extractor)
+over the fixture corpus and reports documents per second and peak RSS. The
+bundled fixtures are synthetic pages; --save adds real homepages. Each backend
+runs in its own subprocess so one parser's memory high-water mark does not hide
+another's. It also checks that every backend extracts exactly the same dict as
+the stdlib parser.
+
+Usage: python website-analyzer/bench_parsers.py [--fixtures DIR] [--rounds 20] [--backends lxml,stdlib]
+       python website-analyzer/bench_parsers.py --save https://example.com [https://...]
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from parsers import BACKENDS, available_backends
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_URL = "https://fixture.example"
+STREAM_CHUNK_SIZE = 16384
+
+
+class FixtureResponse:
+    """Stands in for a StreamingResponse, serving a saved page in network-sized chunks"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.encoding = "utf-8"
+
+    async def iter_chunks(self, chunk_size: int = STREAM_CHUNK_SIZE, max_bytes=None):
+        end = len(self.body) if max_bytes is None else min(len(self.body), max_bytes)
+        for start in range(0, end, chunk_size):
+            yield self.body[start:min(start + chunk_size, end)]
+
+
+def streaming_parse(html: str, url: str):
+    from streaming_extractor import extract_streaming
+    return asyncio.run(extract_streaming(FixtureResponse(html.encode("utf-8")), url))
+
+
+def load_fixtures(directory: str):
+    paths = sorted(glob.glob(os.path.join(directory, "*.html")))
+    if not paths:
+        sys.exit(f"No .html fixtures in {directory}")
+    fixtures = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            fixtures.append((os.path.basename(path), f.read()))
+    return fixtures
+
+
+def max_rss_kb() -> int:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_worker(backend: str, directory: str, rounds: int):
+    """Time one backend in this process and print a JSON line for the parent"""
+    parse = streaming_parse if backend == "streaming" else BACKENDS[backend]
+    fixtures = load_fixtures(directory)
+    parse("<html><body></body></html>", FIXTURE_URL)  # Import the parser library before measuring memory
+    baseline_rss = max_rss_kb()
+    digests = {}
+    for name, html in fixtures:  # Warm-up round, which also records what each fixture extracts to
+        result = parse(html, FIXTURE_URL)
+        digests[name] = hashlib.sha256(json.dumps(result, sort_keys=True).encode("utf-8")).hexdigest()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, html in fixtures:
+            parse(html, FIXTURE_URL)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "backend": backend,
+        "docs": rounds * len(fixtures),
+        "seconds": elapsed,
+        "baseline_rss_kb": baseline_rss,
+        "peak_rss_kb": max_rss_kb(),
+        "digests": digests,
+    }))
+
+
+def save_fixtures(urls, directory: str):
+    """Download homepages into the fixture directory, named after their host"""
+    os.makedirs(directory, exist_ok=True)
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    for url in urls:
+        if not url.startswith("http"):
+            url = "https://" + url
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            html = response.read().decode(charset, errors="replace")
+        path = os.path.join(directory, (urlsplit(url).hostname or "page").replace("www.", "") + ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"saved {url} -> {path} ({len(html)} chars)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory of .html homepages")
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the corpus per backend")
+    parser.add_argument("--backends", help="Comma-separated backends to run (default: all installed)")
+    parser.add_argument("--save", nargs="+", metavar="URL", help="Download homepages into --fixtures and exit")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.fixtures, args.rounds)
+        return
+    if args.save:
+        save_fixtures(args.save, args.fixtures)
+        return
+
+    backends = args.backends.split(",") if args.backends else available_backends() + ["streaming"]
+    fixtures = load_fixtures(args.fixtures)
+    total_kb = sum(len(html.encode("utf-8")) for _, html in fixtures) // 1024
+    print(f"{len(fixtures)} fixtures ({total_kb} KB), {args.rounds} rounds")
+
+    reports = []
+    for backend in backends:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend,
+             "--fixtures", args.fixtures, "--rounds", str(args.rounds)],
+            capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            print(f"{backend}: failed\n{output.stderr.strip()}")
+            continue
+        reports.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    reference = next((report["digests"] for report in reports if report["backend"] == "stdlib"), None)
+    print(f"{'backend':<12}{'docs/sec':>10}{'peak RSS (MB)':>16}{'parse RSS (MB)':>17}  output")
+    for report in sorted(reports, key=lambda report: report["seconds"]):
+        if reference is None:
+            same = "unchecked"
+        else:
+            differing = [name for name, digest in report["digests"].items() if reference.get(name) != digest]
+            same = "same" if not differing else "DIFFERS: " + ", ".join(differing)
+        print(f"{report['backend']:<12}{report['docs'] / report['seconds']:>10.1f}"
+              f"{report['peak_rss_kb'] / 1024:>16.1f}"
+              f"{(report['peak_rss_kb'] - report['baseline_rss_kb']) / 1024:>17.1f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
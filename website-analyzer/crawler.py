@@ -0,0 +1,193 @@
+"""
+Bounded crawl of a company's high-value pages.
+
+The homepage alone often lacks contact details and a description of what the
+company sells. With CRAWL_ENABLED=1 the analyzer also fetches a few same-site
+pages (/about, /contact, /products and similar, plus matching URLs from the
+sitemap) while the homepage downloads. Fetches per domain are limited, the crawl
+stops at a total time budget, and duplicate pages (the same URL, redirects back
+to the homepage, identical text) are dropped before their text is merged into
+the extraction input.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urljoin, urlsplit
+
+from common.http_client import HttpClient, HttpError, http_client
+from page_cache import header, normalize_url
+from parsers import SOCIAL_LINK_LIMIT
+from streaming_extractor import extract_streaming
+
+CRAWL_ENABLED = os.environ.get("CRAWL_ENABLED", "0") == "1"
+CRAWL_PATHS = os.environ.get(
+    "CRAWL_PATHS", "/about,/about-us,/company,/contact,/contact-us,/products,/services"
+).split(",")
+CRAWL_TIME_BUDGET = float(os.environ.get("CRAWL_TIME_BUDGET", "3"))  # Seconds for the whole crawl
+CRAWL_GRACE = float(os.environ.get("CRAWL_GRACE", "0.5"))  # Seconds the crawl may outlast the homepage fetch
+CRAWL_PER_DOMAIN_LIMIT = int(os.environ.get("CRAWL_PER_DOMAIN_LIMIT", "2"))  # Concurrent fetches per site
+CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", "10"))  # Pages fetched per crawl, sitemap picks included
+CRAWL_MAX_PAGE_BYTES = int(os.environ.get("CRAWL_MAX_PAGE_BYTES", str(512 * 1024)))
+PAGE_TEXT_BUDGET = 800  # Characters kept from each crawled page
+ADDITIONAL_CONTENT_BUDGET = 2500  # Characters of crawled text added to the prompt
+
+SITEMAP_PATH = "/sitemap.xml"
+SITEMAP_KEYWORDS = ("about", "contact", "product", "service", "solution", "company", "team", "pricing")
+SITEMAP_URLS = 4  # Keyword-matching sitemap URLs crawled on top of CRAWL_PATHS
+SITEMAP_LOC = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+
+def site_host(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class SiteCrawler:
+    """Fetches a handful of same-site pages concurrently within a time budget"""
+
+    def __init__(self, client: HttpClient = http_client, paths: Optional[List[str]] = None,
+                 time_budget: float = CRAWL_TIME_BUDGET, per_domain_limit: int = CRAWL_PER_DOMAIN_LIMIT,
+                 max_pages: int = CRAWL_MAX_PAGES, max_page_bytes: int = CRAWL_MAX_PAGE_BYTES):
+        self.client = client
+        self.paths = paths if paths is not None else CRAWL_PATHS
+        self.time_budget = time_budget
+        self.per_domain_limit = per_domain_limit
+        self.max_pages = max_pages
+        self.max_page_bytes = max_page_bytes
+        self._domain_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _domain_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = site_host(url)
+        semaphore = self._domain_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_domain_limit)
+            self._domain_semaphores[host] = semaphore
+        return semaphore
+
+    async def crawl(self, homepage_url: str, stop: Optional[asyncio.Event] = None) -> List[Dict[str, Any]]:
+        """Pages fetched before the budget ran out or stop was set, in CRAWL_PATHS order, then sitemap order"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        seen: Set[str] = {normalize_url(homepage_url), normalize_url(urljoin(homepage_url, SITEMAP_PATH))}
+        scheduled: List[str] = []
+        pending: Dict[asyncio.Future, int] = {}  # Fetch task -> position in the output
+        pages: Dict[int, Dict[str, Any]] = {}
+
+        def schedule(url: str):
+            key = normalize_url(url)
+            if key in seen or len(scheduled) >= self.max_pages or site_host(url) != site_host(homepage_url):
+                return
+            seen.add(key)
+            scheduled.append(url)
+            pending[asyncio.ensure_future(self.fetch_page(url))] = len(scheduled)
+
+        sitemap = asyncio.ensure_future(self.sitemap_urls(homepage_url))
+        pending[sitemap] = 0
+        for path in self.paths:
+            schedule(urljoin(homepage_url, path.strip()))
+
+        stopped = asyncio.ensure_future(stop.wait()) if stop is not None else None
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                waiting = set(pending) if stopped is None else set(pending) | {stopped}
+                done, _ = await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is stopped:
+                        continue
+                    position = pending.pop(task)
+                    if task.exception() is not None or task.result() is None:
+                        continue
+                    if task is sitemap:
+                        for url in task.result():
+                            schedule(url)
+                    else:
+                        pages[position] = task.result()
+                if stopped is not None and stopped.done():
+                    break
+        finally:
+            # Whatever is still running when the budget is spent is abandoned
+            for task in pending:
+                task.cancel()
+            if stopped is not None:
+                stopped.cancel()
+
+        return [pages[position] for position in sorted(pages)]
+
+    async def fetch_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Extracted text of one page, or None if it is missing, not HTML or redirects off-site"""
+        try:
+            async with self._domain_semaphore(url):
+                async with self.client.stream("GET", url, headers=HEADERS, timeout=self.time_budget) as response:
+                    content_type = header(response.headers, "Content-Type") or ""
+                    if (response.status_code >= 400 or "html" not in content_type
+                            or site_host(response.url) != site_host(url)):
+                        return None
+                    extracted = await extract_streaming(response, response.url, self.max_page_bytes)
+        except HttpError:
+            return None
+        return {"url": response.url, "text": extracted["all_text"], "social_links": extracted["social_links"]}
+
+    async def sitemap_urls(self, homepage_url: str) -> List[str]:
+        """Same-site sitemap URLs whose path suggests company information, shallowest first"""
+        url = urljoin(homepage_url, SITEMAP_PATH)
+        try:
+            async with self._domain_semaphore(url):
+                async with self.client.stream("GET", url, headers=HEADERS, timeout=self.time_budget) as response:
+                    if response.status_code >= 400:
+                        return []
+                    body = b"".join([chunk async for chunk in response.iter_chunks(max_bytes=self.max_page_bytes)])
+        except HttpError:
+            return []
+
+        candidates = []
+        for match in SITEMAP_LOC.finditer(body.decode("utf-8", errors="replace")):
+            path = urlsplit(match.group(1)).path.lower()
+            # Nested sitemaps would cost another round trip; skip them
+            if path.endswith(".xml") or not any(keyword in path for keyword in SITEMAP_KEYWORDS):
+                continue
+            candidates.append((path.count("/"), len(path), match.group(1)))
+        return [url for _, _, url in sorted(candidates)[:SITEMAP_URLS]]
+
+
+def merge_subpages(extracted: Dict[str, Any], pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add crawled text and social links to a homepage extraction, skipping duplicate pages"""
+    home_text = extracted.get("all_text", "")
+    home_words = home_text.split(" ")
+    seen_texts = {text_key(home_text)}
+    sections = []
+    crawled = []
+    social_links = list(extracted.get("social_links", []))
+    for page in pages:
+        # Navigation shared with the homepage comes first on most pages; keep only the words after it
+        words = page["text"].split(" ")
+        shared = len(os.path.commonprefix([home_words, words]))
+        text = " ".join(words[shared:])[:PAGE_TEXT_BUDGET]
+        key = text_key(text)
+        if not text or key in seen_texts:
+            continue
+        seen_texts.add(key)
+        crawled.append(page["url"])
+        sections.append(f"[{urlsplit(page['url']).path or '/'}] {text}")
+        for link in page["social_links"]:
+            if link not in social_links and len(social_links) < SOCIAL_LINK_LIMIT:
+                social_links.append(link)
+
+    extracted["additional_content"] = " ".join(sections)[:ADDITIONAL_CONTENT_BUDGET]
+    extracted["crawled_pages"] = crawled
+    extracted["social_links"] = social_links
+    return extracted
+
+
+# Shared so per-domain limits hold across concurrent requests for the same site
+site_crawler = SiteCrawler()
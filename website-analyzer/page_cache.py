@@ -0,0 +1,120 @@
+"""
+On-disk cache of homepage extractions with HTTP revalidation.
+
+Corporate homepages rarely change day to day, so the extracted dict for each
+site is kept in a SQLite file keyed by normalized URL, together with the page's
+ETag and Last-Modified validators. Within PAGE_CACHE_FRESH_TTL the cached dict
+is used without any request. After that the page is fetched with If-None-Match /
+If-Modified-Since, and a 304 Not Modified reuses the cached dict without
+downloading or parsing the page again.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+PAGE_CACHE_PATH = os.environ.get(
+    "PAGE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_cache.sqlite3")
+)
+FRESH_TTL = float(os.environ.get("PAGE_CACHE_FRESH_TTL", str(12 * 3600)))  # Served without revalidating
+MAX_AGE = float(os.environ.get("PAGE_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # Dropped if not revalidated for this long
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") != "0"
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a homepage URL: scheme added, host lowercased, default port, fragment and trailing slash dropped"""
+    if not url.startswith("http"):
+        url = "https://" + url
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), parts.query, ""))
+
+
+def header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    """Case-insensitive header lookup on a plain dict of response headers"""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class PageCache:
+    """SQLite-backed store of extracted homepages and their HTTP validators"""
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, fresh_ttl: float = FRESH_TTL, max_age: float = MAX_AGE,
+                 enabled: bool = PAGE_CACHE_ENABLED):
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.enabled = enabled
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "key TEXT PRIMARY KEY, extracted TEXT, etag TEXT, last_modified TEXT, validated_at REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached entry (extracted, etag, last_modified, validated_at), or None if missing or too old"""
+        if not self.enabled:
+            return None
+        row = self._db.execute(
+            "SELECT extracted, etag, last_modified, validated_at FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[3] + self.max_age <= time.time():
+            return None
+        return {"extracted": json.loads(row[0]), "etag": row[1], "last_modified": row[2], "validated_at": row[3]}
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """True while an entry can be used without asking the site"""
+        return entry["validated_at"] + self.fresh_ttl > time.time()
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Request headers that let the site answer 304 if the page has not changed"""
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def set(self, key: str, extracted: Dict[str, Any], response_headers: Mapping[str, str]):
+        """Store a fresh extraction along with the validators from the response it came from"""
+        if not self.enabled:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO pages (key, extracted, etag, last_modified, validated_at) VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(extracted), header(response_headers, "ETag"),
+             header(response_headers, "Last-Modified"), time.time())
+        )
+        self._db.commit()
+
+    def revalidated(self, key: str, response_headers: Mapping[str, str]):
+        """Record a 304 for key; a 304 may carry updated validators"""
+        etag = header(response_headers, "ETag")
+        last_modified = header(response_headers, "Last-Modified")
+        self._db.execute(
+            "UPDATE pages SET validated_at = ?, etag = COALESCE(?, etag), "
+            "last_modified = COALESCE(?, last_modified) WHERE key = ?",
+            (time.time(), etag, last_modified, key)
+        )
+        self._db.commit()
+
+    def purge_expired(self) -> int:
+        """Delete entries not revalidated within max_age; returns how many were removed"""
+        cursor = self._db.execute("DELETE FROM pages WHERE validated_at <= ?", (time.time() - self.max_age,))
+        self._db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
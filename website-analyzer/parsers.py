@@ -0,0 +1,323 @@
+"""
+Interchangeable HTML parser backends for homepage extraction.
+
+Every backend turns a downloaded homepage into the same dict (title, meta
+description, priority-section text, page text and social links) so the analyzer
+can switch parsers per deployment without changing what the model is shown:
+
+  * stdlib     - the pure-Python HomepageParser, always available
+  * bs4        - BeautifulSoup with the html.parser tree builder (the original path)
+  * lxml       - libxml2 via lxml.html
+  * selectolax - the lexbor engine via selectolax
+
+PARSER_BACKEND picks one by name; "auto" uses the fastest one installed.
+bench_parsers.py measures them on saved homepages.
+"""
+
+import importlib.util
+import os
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+PARSER_BACKEND = os.environ.get("PARSER_BACKEND", "auto")
+BACKEND_PREFERENCE = ["selectolax", "lxml", "stdlib", "bs4"]  # Fastest first, for "auto"
+
+MAIN_CONTENT_BUDGET = 1500  # Characters of priority-section text kept
+ALL_TEXT_BUDGET = 4000  # Characters of page text kept
+SOCIAL_LINK_LIMIT = 5
+
+# Sections likely to describe the company: these tags with one of these classes
+PRIORITY_TAGS = {"main", "header", "h1", "h2", "section", "div"}
+PRIORITY_CLASSES = {"hero", "banner", "intro", "about", "main", "header"}
+SOCIAL_PATTERNS = ["facebook", "twitter", "linkedin", "instagram", "youtube", "tiktok"]
+SKIPPED_TAGS = {"script", "style"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+             "source", "track", "wbr"}
+
+
+def clean_text(text: str) -> str:
+    """Collapse line breaks and runs of spaces the same way the analyzer always has"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return " ".join(chunk for chunk in chunks if chunk)
+
+
+def is_social_link(href: str) -> bool:
+    return any(pattern in href for pattern in SOCIAL_PATTERNS)
+
+
+def is_priority(tag: str, class_attr: Optional[str]) -> bool:
+    return tag in PRIORITY_TAGS and bool(set((class_attr or "").split()) & PRIORITY_CLASSES)
+
+
+def build_result(url: str, title: Optional[str], meta_description: Optional[str], sections: Iterable[str],
+                 texts: Iterable[str], hrefs: Iterable[str]) -> Dict[str, Any]:
+    """Assemble the extracted dict, applying the text budgets and link limit"""
+    main_parts: List[str] = []
+    main_length = 0
+    for section in sections:
+        if main_length >= MAIN_CONTENT_BUDGET:
+            break
+        main_parts.append(section + " ")
+        main_length += len(section) + 1
+
+    text_parts: List[str] = []
+    text_length = 0
+    for text in texts:
+        if text_length >= ALL_TEXT_BUDGET:
+            break
+        cleaned = clean_text(text)
+        if cleaned:
+            text_parts.append(cleaned)
+            text_length += len(cleaned) + 1
+
+    social_links: List[str] = []
+    for href in hrefs:
+        if len(social_links) >= SOCIAL_LINK_LIMIT:
+            break
+        href = href.lower()
+        if is_social_link(href):
+            social_links.append(href)
+
+    return {
+        "title": title or "",
+        "meta_description": meta_description or "",
+        "main_content": "".join(main_parts)[:MAIN_CONTENT_BUDGET],
+        "all_text": " ".join(text_parts)[:ALL_TEXT_BUDGET],
+        "social_links": social_links,
+        "url": url
+    }
+
+
+class HomepageParser(HTMLParser):
+    """Event-based parser that keeps only what the analyzer needs"""
+
+    def __init__(self, main_budget: int = MAIN_CONTENT_BUDGET, text_budget: int = ALL_TEXT_BUDGET,
+                 link_limit: int = SOCIAL_LINK_LIMIT):
+        super().__init__(convert_charrefs=True)
+        self.main_budget = main_budget
+        self.text_budget = text_budget
+        self.link_limit = link_limit
+        self.title: Optional[str] = None
+        self.meta_description = ""
+        self.social_links: List[str] = []
+        self._title_parts: Optional[List[str]] = None
+        self._stack: List[str] = []  # Open elements
+        self._skip_depth = 0  # Open script/style elements
+        self._priority_depth = 0  # Stack index of the outermost open priority section, or 0
+        self._section: List[str] = []
+        self._sections: List[str] = []
+        self._main_length = 0
+        self._text_parts: List[str] = []
+        self._text_length = 0
+
+    @property
+    def text_full(self) -> bool:
+        """True once both text budgets are filled and further text would be thrown away"""
+        return (self._text_length >= self.text_budget and self._main_length >= self.main_budget
+                and self._title_parts is None)
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "meta":
+            name = (attributes.get("name") or "").lower()
+            if name == "description" and attributes.get("content") and not self.meta_description:
+                self.meta_description = attributes["content"]
+        elif tag == "a" and attributes.get("href"):
+            href = attributes["href"].lower()
+            if is_social_link(href):
+                self.social_links.append(href)
+        elif tag == "title" and self.title is None and self._title_parts is None:
+            self._title_parts = []
+
+        if tag in VOID_TAGS:
+            return
+        self._stack.append(tag)
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif not self._priority_depth and is_priority(tag, attributes.get("class")):
+            self._priority_depth = len(self._stack)
+            self._section = []
+
+    def handle_startendtag(self, tag, attrs):
+        # <div class="hero"/> opens nothing, so treat it as a void element
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self._stack and self._stack[-1] == tag:
+            self._close_top()
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+        if tag not in self._stack:
+            return
+        # Close any elements left open inside this one, like the tree builders do
+        while self._stack:
+            closed = self._stack[-1]
+            self._close_top()
+            if closed == tag:
+                break
+
+    def _close_top(self):
+        tag = self._stack.pop()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth -= 1
+        if self._priority_depth and len(self._stack) < self._priority_depth:
+            self._flush_section()
+
+    def _flush_section(self):
+        if self._main_length < self.main_budget:
+            section = " ".join(self._section)
+            self._sections.append(section)
+            self._main_length += len(section) + 1
+        self._priority_depth = 0
+        self._section = []
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._skip_depth:
+            return
+        stripped = data.strip()
+        if not stripped:
+            return
+        if self._priority_depth and self._main_length < self.main_budget:
+            self._section.append(stripped)
+        if self._text_length < self.text_budget:
+            cleaned = clean_text(stripped)
+            if cleaned:
+                self._text_parts.append(cleaned)
+                self._text_length += len(cleaned) + 1
+
+    def result(self, url: str) -> Dict[str, Any]:
+        """The extracted fields, in the same shape the analyzer's prompt expects"""
+        if self._priority_depth:
+            self._flush_section()
+        if self._title_parts is not None and self.title is None:
+            self.title = "".join(self._title_parts)
+        return build_result(url, self.title, self.meta_description, self._sections, self._text_parts,
+                            self.social_links)
+
+
+def parse_with_stdlib(html: str, url: str) -> Dict[str, Any]:
+    parser = HomepageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result(url)
+
+
+def parse_with_bs4(html: str, url: str) -> Dict[str, Any]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    meta_description = ""
+    for tag in soup.find_all("meta"):
+        if tag.get("name") and tag.get("name").lower() == "description" and tag.get("content"):
+            meta_description = tag.get("content")
+            break
+    title = soup.title.string if soup.title else ""
+
+    for tag in soup(list(SKIPPED_TAGS)):
+        tag.extract()
+    # Only outermost sections, so text inside nested priority sections is counted once
+    sections = [
+        tag.get_text(separator=" ", strip=True)
+        for tag in soup.find_all(lambda tag: is_priority(tag.name, " ".join(tag.get("class") or [])))
+        if not any(is_priority(parent.name, " ".join(parent.get("class") or [])) for parent in tag.parents)
+    ]
+    hrefs = [link["href"] for link in soup.find_all("a", href=True)]
+    return build_result(url, title, meta_description, sections, soup.stripped_strings, hrefs)
+
+
+def _xpath_priority_condition() -> str:
+    tags = " or ".join(f"self::{tag}" for tag in sorted(PRIORITY_TAGS))
+    classes = " or ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+                          for name in sorted(PRIORITY_CLASSES))
+    return f"({tags}) and ({classes})"
+
+
+_PRIORITY_CONDITION = _xpath_priority_condition()
+OUTERMOST_PRIORITY_XPATH = f"//*[{_PRIORITY_CONDITION}][not(ancestor::*[{_PRIORITY_CONDITION}])]"
+
+
+def parse_with_lxml(html: str, url: str) -> Dict[str, Any]:
+    from lxml import html as lxml_html
+
+    if not html.strip():
+        return build_result(url, "", "", [], [], [])
+    # Parse bytes so pages carrying an encoding declaration are accepted
+    root = lxml_html.document_fromstring(html.encode("utf-8"),
+                                         parser=lxml_html.HTMLParser(encoding="utf-8"))
+    meta_description = ""
+    for tag in root.iter("meta"):
+        if (tag.get("name") or "").lower() == "description" and tag.get("content"):
+            meta_description = tag.get("content")
+            break
+    title_tag = root.find(".//title")
+    title = title_tag.text_content() if title_tag is not None else ""
+
+    for tag in list(root.iter(*SKIPPED_TAGS)):
+        tag.drop_tree()  # Keeps the text that follows the element
+    sections = [" ".join(text.strip() for text in tag.xpath(".//text()") if text.strip())
+                for tag in root.xpath(OUTERMOST_PRIORITY_XPATH)]
+    texts = (text.strip() for text in root.xpath("//text()"))
+    hrefs = [tag.get("href") for tag in root.iter("a") if tag.get("href")]
+    return build_result(url, title, meta_description, sections, (text for text in texts if text), hrefs)
+
+
+def parse_with_selectolax(html: str, url: str) -> Dict[str, Any]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    meta_description = ""
+    for tag in tree.css("meta"):
+        if (tag.attributes.get("name") or "").lower() == "description" and tag.attributes.get("content"):
+            meta_description = tag.attributes["content"]
+            break
+    title_tag = tree.css_first("title")
+    title = title_tag.text() if title_tag is not None else ""
+
+    tree.strip_tags(list(SKIPPED_TAGS))
+    sections = []
+    for tag in tree.css("[class]"):
+        if not is_priority(tag.tag, tag.attributes.get("class")):
+            continue
+        parent = tag.parent
+        while parent is not None and not is_priority(parent.tag, parent.attributes.get("class")):
+            parent = parent.parent
+        if parent is None:
+            sections.append(" ".join(_split_text(tag)))
+    hrefs = [tag.attributes["href"] for tag in tree.css("a[href]") if tag.attributes.get("href")]
+    texts = _split_text(tree.root) if tree.root is not None else []
+    return build_result(url, title, meta_description, sections, texts, hrefs)
+
+
+def _split_text(node) -> List[str]:
+    # One C-level pass over the text nodes; the separator cannot occur in parsed HTML text
+    return [text for text in node.text(separator="\x00", strip=True).split("\x00") if text]
+
+
+BACKENDS: Dict[str, Callable[[str, str], Dict[str, Any]]] = {
+    "stdlib": parse_with_stdlib,
+    "bs4": parse_with_bs4,
+    "lxml": parse_with_lxml,
+    "selectolax": parse_with_selectolax,
+}
+BACKEND_MODULES = {"stdlib": None, "bs4": "bs4", "lxml": "lxml", "selectolax": "selectolax"}
+
+
+def available_backends() -> List[str]:
+    """Names of the backends whose parser library is installed, fastest first"""
+    return [name for name in BACKEND_PREFERENCE
+            if BACKEND_MODULES[name] is None or importlib.util.find_spec(BACKEND_MODULES[name]) is not None]
+
+
+def get_parser(name: str = PARSER_BACKEND) -> Callable[[str, str], Dict[str, Any]]:
+    """The parse function for a backend name, or the fastest installed one for "auto" """
+    if name == "auto":
+        return BACKENDS[available_backends()[0]]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {name!r}; choose from {', '.join(BACKENDS)} or auto")
+    if name not in available_backends():
+        raise ValueError(f"Parser backend {name!r} is not installed")
+    return BACKENDS[name]
@@ -0,0 +1,73 @@
+"""
+Single-pass, streaming homepage extraction.
+
+The homepage body is read in chunks up to a byte cap and fed to the event-based
+HomepageParser from parsers.py, which collects the title, meta description,
+priority-section text and social links in one pass. Once the text budgets the
+analyzer actually uses are filled, the parser is dropped and the rest of the
+page is only scanned for social links, so heavy homepages cost a fraction of
+the CPU and memory of building a full parse tree.
+"""
+
+import codecs
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from common.http_client import StreamingResponse
+from parsers import SOCIAL_LINK_LIMIT, HomepageParser, is_social_link
+
+MAX_PAGE_BYTES = int(os.environ.get("MAX_PAGE_BYTES", str(2 * 1024 * 1024)))  # Stop downloading after this
+
+ANCHOR_HREF = re.compile(r"""<a\s[^>]*?href\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+LINK_SCAN_OVERLAP = 1024  # Characters kept between chunks so split tags are still matched
+
+
+class LinkScanner:
+    """Finds social links in raw HTML once full parsing has stopped"""
+
+    def __init__(self, links: List[str], limit: int = SOCIAL_LINK_LIMIT):
+        self.links = links
+        self.limit = limit
+        self._tail = ""
+
+    @property
+    def done(self) -> bool:
+        return len(self.links) >= self.limit
+
+    def feed(self, text: str):
+        buffer = self._tail + text
+        for match in ANCHOR_HREF.finditer(buffer):
+            # Matches entirely inside the carried-over tail were found on the previous call
+            if match.end() <= len(self._tail):
+                continue
+            href = match.group(1).lower()
+            if is_social_link(href):
+                self.links.append(href)
+        self._tail = buffer[-LINK_SCAN_OVERLAP:]
+
+
+async def extract_streaming(response: StreamingResponse, url: str, max_bytes: int = MAX_PAGE_BYTES) -> Dict[str, Any]:
+    """Extract homepage fields from a streamed response, reading at most max_bytes"""
+    decoder = codecs.getincrementaldecoder(response.encoding)(errors="replace")
+    parser = HomepageParser()
+    scanner: Optional[LinkScanner] = None
+
+    async for chunk in response.iter_chunks(max_bytes=max_bytes):
+        text = decoder.decode(chunk)
+        if scanner is None:
+            parser.feed(text)
+            if parser.text_full:
+                # Text budgets are full; only social links are still worth looking for,
+                # starting from whatever the parser had buffered but not yet processed
+                scanner = LinkScanner(parser.social_links)
+                scanner.feed(parser.rawdata)
+        else:
+            scanner.feed(text)
+        if scanner is not None and scanner.done:
+            break
+
+    if scanner is None:
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    return parser.result(url)
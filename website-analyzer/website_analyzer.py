@@ -1,28 +1,58 @@
+import asyncio
 import json
 import os
-import requests
-from bs4 import BeautifulSoup
+import sys
+from typing import Optional
 from uagents import Agent, Context, Model
 
+# Make the shared helpers in common/ importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.http_client import HttpError, http_client
+from common.llm_cache import cache_key, llm_cache
+from common.singleflight import SingleFlight
+from common.summarizer import call_with_budget, extractive_summary
+from crawler import CRAWL_ENABLED, CRAWL_GRACE, merge_subpages, site_crawler
+from page_cache import PageCache, normalize_url
+from parsers import PARSER_BACKEND, get_parser
+from streaming_extractor import MAX_PAGE_BYTES, extract_streaming
+from common.tasks import spawn
+
 agent = Agent(name="company_processor", port=8004)
 
 # Hugging Face API configuration
 HUGGINGFACE_API_KEY = os.environ.get("HUGGINGFACE_API_KEY", "hf_api_key_here")
 
 # Using a more reliable summarization model
-HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models/tiiuae/falcon-7b-instruct"
+HUGGINGFACE_MODEL = "tiiuae/falcon-7b-instruct"
+HUGGINGFACE_API_URL = f"https://api-inference.huggingface.co/models/{HUGGINGFACE_MODEL}"
 HEADERS = {
     "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
     "Content-Type": "application/json"
 }
+HUGGINGFACE_TIMEOUT = float(os.environ.get("HUGGINGFACE_TIMEOUT", "60"))  # Seconds
+# Seconds an identical extraction prompt is answered from the LLM cache
+COMPANY_INFO_CACHE_TTL = float(os.environ.get("COMPANY_INFO_CACHE_TTL", str(7 * 24 * 3600)))
+
+# "streaming" reads the homepage incrementally (capped at MAX_PAGE_BYTES) and parses it in one pass;
+# "full" downloads the whole page and parses it with the PARSER_BACKEND parser
+EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "streaming")
+# Resolved at startup so a missing parser library fails fast rather than on the first request
+parse_homepage = get_parser(PARSER_BACKEND)
+# Extracted homepages and their ETag/Last-Modified validators, keyed by normalized URL
+page_cache = PageCache()
+# Website analyses in progress, keyed by normalized URL
+website_flights = SingleFlight()
 
 
 class Request(Model):
     website: str
+    request_id: Optional[str] = None  # Echoed back so callers can match the response
 
 
 class Error(Model):
     text: str
+    request_id: Optional[str] = None
 
 
 class CompanyData(Model):
@@ -37,78 +67,98 @@ class CompanyData(Model):
     # Optional fields that might be extracted if available
     contact_info: str = "Not found"
     social_media: str = "Not found"
+    request_id: Optional[str] = None
 
 
-def extract_text_from_website(url):
-    """Extract text content from a website homepage."""
+async def extract_text_from_website(url):
+    """Extract text content from a website homepage, reusing the cached extraction while the page is unchanged."""
+    crawl = None
     try:
         # Add http if not present
         if not url.startswith('http'):
             url = 'https://' + url
             
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract meta data that might contain company info
-        meta_description = ""
-        meta_tags = soup.find_all('meta')
-        for tag in meta_tags:
-            if tag.get('name') and tag.get('name').lower() == 'description' and tag.get('content'):
-                meta_description = tag.get('content')
-                break
-                
-        # Extract title
-        title = soup.title.string if soup.title else ""
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
+        key = normalize_url(url)
+        cached = page_cache.get(key)
+        if cached is not None and CRAWL_ENABLED and "crawled_pages" not in cached["extracted"]:
+            # Extracted while crawling was off; fetch and crawl the site again rather than reuse it
+            cached = None
+        if cached is not None and page_cache.is_fresh(cached):
+            return dict(cached["extracted"], url=url), url
             
-        # Try to extract main content areas likely to contain company info
-        main_content = ""
-        
-        # Prioritize main sections, headers, and prominent text
-        priority_tags = soup.find_all(['main', 'header', 'h1', 'h2', 'section', 'div'], 
-                                     class_=['hero', 'banner', 'intro', 'about', 'main', 'header'])
-        
-        for tag in priority_tags:
-            main_content += tag.get_text(separator=' ', strip=True) + " "
-        
-        # Get overall page text as fallback
-        all_text = soup.get_text(separator=' ', strip=True)
-        
-        # Clean up text (remove extra whitespace)
-        lines = (line.strip() for line in all_text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        all_text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Get social media links
-        social_links = []
-        social_patterns = ['facebook', 'twitter', 'linkedin', 'instagram', 'youtube', 'tiktok']
-        for link in soup.find_all('a', href=True):
-            href = link['href'].lower()
-            if any(pattern in href for pattern in social_patterns):
-                social_links.append(href)
-        
-        # Package up the extracted data
-        extracted_data = {
-            "title": title,
-            "meta_description": meta_description,
-            "main_content": main_content[:1500] if main_content else "",  # First 1500 chars of priority content
-            "all_text": all_text[:4000],  # First 4000 chars of all text as fallback
-            "social_links": social_links[:5],  # Up to 5 social links
-            "url": url
-        }
+        crawl_stop = asyncio.Event()
+        if CRAWL_ENABLED and cached is None:
+            # Subpages download alongside the homepage, so crawling adds little latency. With a cached
+            # entry the crawl waits for the conditional GET, since a 304 reuses the cached subpages.
+            crawl = asyncio.ensure_future(site_crawler.crawl(url, crawl_stop))
+            
+        extracted_data, response_headers = await fetch_homepage(url, cached)
+        if extracted_data is None:
+            # Unchanged since the cached extraction (crawled pages included): nothing to download or parse
+            page_cache.revalidated(key, response_headers)
+            return dict(cached["extracted"], url=url), url
         
+        if crawl is not None:
+            # Pages still downloading get a short grace period, not the rest of the crawl budget
+            asyncio.get_running_loop().call_later(CRAWL_GRACE, crawl_stop.set)
+            merge_subpages(extracted_data, await crawl)
+            crawl = None
+        elif CRAWL_ENABLED:
+            # The homepage changed since it was cached: crawl now, within the crawl's own time budget
+            crawl = asyncio.ensure_future(site_crawler.crawl(url, crawl_stop))
+            merge_subpages(extracted_data, await crawl)
+            crawl = None
+        page_cache.set(key, extracted_data, response_headers)
         return extracted_data, url
     except Exception as e:
         return {"error": f"Error extracting content from website: {str(e)}"}, url
+    finally:
+        if crawl is not None:
+            crawl.cancel()
+
+
+async def fetch_homepage(url, cached):
+    """Download and parse the homepage; the extraction is None when the site answers 304 Not Modified."""
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    headers.update(page_cache.conditional_headers(cached))
+    if EXTRACTION_MODE == "streaming":
+        async with http_client.stream("GET", url, headers=headers, timeout=10) as response:
+            if response.status_code == 304 and cached is not None:
+                return None, response.headers
+            response.raise_for_status()
+            return await extract_streaming(response, url, MAX_PAGE_BYTES), response.headers
+    
+    response = await http_client.get(url, headers=headers, timeout=10)
+    if response.status_code == 304 and cached is not None:
+        return None, response.headers
+    response.raise_for_status()
+    return parse_homepage(response.text, url), response.headers
+
+
+def generated_text_of(result) -> str:
+    """The generated text of a Hugging Face response"""
+    if isinstance(result, list) and len(result) > 0:
+        return result[0].get('generated_text', '') or ''
+    if isinstance(result, dict):
+        return result.get('generated_text', '') or ''
+    return ''
+
 
+def company_json(result) -> dict:
+    """The JSON object in a Hugging Face response; raises ValueError if there is none"""
+    generated_text = generated_text_of(result)
+    # Find JSON-like structure in the text
+    start_idx = generated_text.find('{')
+    end_idx = generated_text.rfind('}') + 1
+    if start_idx == -1 or end_idx == 0:
+        raise ValueError("No JSON structure found in response")
+    parsed_data = json.loads(generated_text[start_idx:end_idx])
+    if not isinstance(parsed_data, dict):
+        raise ValueError("No JSON object found in response")
+    return parsed_data
 
-def get_company_info(website_data, website_url):
+
+async def get_company_info(website_data, website_url):
     """Extract company information using a Hugging Face model"""
     if "error" in website_data:
         return Error(text=website_data["error"])
@@ -116,8 +166,11 @@ def get_company_info(website_data, website_url):
     # Extract the domain from the URL
     domain = website_url.split('//')[-1].split('/')[0].replace('www.', '')
     
+    # Text from crawled about/contact/product pages, when crawl mode found any
+    additional_pages = f"Additional Pages: {website_data['additional_content']} " if website_data.get('additional_content') else ""
+    
     # Create a more focused prompt for the model
-    prompt = f"""You are an AI assistant that extracts company information from website text. Analyze the following content from {website_url} and extract key company details. Title: {website_data['title']} Meta Description: {website_data['meta_description']} Main Content: {website_data['main_content']} Social Links: {', '.join(website_data['social_links']) if website_data['social_links'] else 'None found'} Please extract the following information in JSON format: - company_name: The official name of the company - domain: {domain} - main_offerings: A brief description of the main products, services, or solutions the company offers (1-2 sentences) - tagline: The company's slogan or tagline if present - summary: A 2-3 sentence summary of what the company does and its key value proposition - contact_info: Any contact information visible on the homepage (email, phone, address) - social_media: List of social media platforms the company is present on Respond ONLY with a valid JSON object containing these fields."""
+    prompt = f"""You are an AI assistant that extracts company information from website text. Analyze the following content from {website_url} and extract key company details. Title: {website_data['title']} Meta Description: {website_data['meta_description']} Main Content: {website_data['main_content']} Social Links: {', '.join(website_data['social_links']) if website_data['social_links'] else 'None found'} {additional_pages}Please extract the following information in JSON format: - company_name: The official name of the company - domain: {domain} - main_offerings: A brief description of the main products, services, or solutions the company offers (1-2 sentences) - tagline: The company's slogan or tagline if present - summary: A 2-3 sentence summary of what the company does and its key value proposition - contact_info: Any contact information visible on the homepage (email, phone, address) - social_media: List of social media platforms the company is present on Respond ONLY with a valid JSON object containing these fields."""
     # Prepare the payload for the Hugging Face API
     payload = {
         "inputs": prompt,
@@ -128,52 +181,55 @@ def get_company_info(website_data, website_url):
         }
     }
 
+    # The last raw reply, so the field heuristics below can still use a reply that did not parse
+    replies = []
+
     try:
-        # Make request to Hugging Face Inference API
-        response = requests.post(HUGGINGFACE_API_URL, headers=HEADERS, json=payload)
-        response.raise_for_status()
-        
-        # Extract the generated text from the response
-        result = response.json()
-        if isinstance(result, list) and len(result) > 0:
-            generated_text = result[0].get('generated_text', '')
-        else:
-            generated_text = result.get('generated_text', '')
-            
+        async def call_model():
+            # Make request to Hugging Face Inference API
+            response = await http_client.post(HUGGINGFACE_API_URL, headers=HEADERS, json=payload,
+                                              timeout=HUGGINGFACE_TIMEOUT, upstream="huggingface")
+            response.raise_for_status()
+            replies.append(response.json())
+            return replies[-1]
+
         # Try to extract JSON from the response
         try:
-            # Find JSON-like structure in the text
-            start_idx = generated_text.find('{')
-            end_idx = generated_text.rfind('}') + 1
+            # Identical prompts within the TTL are answered from the cache without any HTTP call, and only
+            # replies holding a JSON object are cached. A model call that misses the latency budget finishes
+            # in the background and fills the cache for the next request; identical requests meanwhile wait on it.
+            key = cache_key(HUGGINGFACE_MODEL, prompt, payload["parameters"])
+            parsed_data = await call_with_budget(
+                lambda: llm_cache.get_or_fetch(key, COMPANY_INFO_CACHE_TTL, call_model, parse=company_json), key
+            )
+            if parsed_data is None:
+                raise ValueError("No model reply within the latency budget")
+            # Shared with concurrent requests for the same prompt
+            parsed_data = dict(parsed_data)
             
-            if start_idx != -1 and end_idx != -1:
-                json_str = generated_text[start_idx:end_idx]
-                parsed_data = json.loads(json_str)
-                
-                # Ensure all required fields are present
-                required_fields = ["company_name", "domain", "main_offerings", "tagline", 
-                                 "summary", "contact_info", "social_media"]
-                
-                for field in required_fields:
-                    if field not in parsed_data:
-                        if field == "domain":
-                            parsed_data[field] = domain
-                        else:
-                            parsed_data[field] = "Not found"
-                    elif isinstance(parsed_data[field], dict) or isinstance(parsed_data[field], list):
-                        # Convert nested JSON objects to strings
-                        parsed_data[field] = str(parsed_data[field])
-                
-                # Add source URL
-                parsed_data["source_url"] = website_url
-                
-                # Return as CompanyData object
-                return CompanyData(**parsed_data)
-            else:
-                raise ValueError("No JSON structure found in response")
+            # Ensure all required fields are present
+            required_fields = ["company_name", "domain", "main_offerings", "tagline", 
+                             "summary", "contact_info", "social_media"]
+            
+            for field in required_fields:
+                if field not in parsed_data:
+                    if field == "domain":
+                        parsed_data[field] = domain
+                    else:
+                        parsed_data[field] = "Not found"
+                elif isinstance(parsed_data[field], dict) or isinstance(parsed_data[field], list):
+                    # Convert nested JSON objects to strings
+                    parsed_data[field] = str(parsed_data[field])
+            
+            # Add source URL
+            parsed_data["source_url"] = website_url
+            
+            # Return as CompanyData object
+            return CompanyData(**parsed_data)
                 
         except (json.JSONDecodeError, ValueError) as e:
             # Fallback with best-guess extraction
+            generated_text = generated_text_of(replies[-1]) if replies else ""
             company_name = website_data['title'].split('-')[0].split('|')[0].strip() if website_data['title'] else domain.split('.')[0].title()
             
             # Extract tagline from meta description or title
@@ -185,6 +241,7 @@ def get_company_info(website_data, website_url):
             
             # Create a simple summary from the text we have
             text_for_summary = website_data['main_content'] if website_data['main_content'] else website_data['all_text'][:1000]
+            content_summary = extractive_summary(text_for_summary, max_sentences=2)
             
             fallback_data = {
                 "company_name": company_name,
@@ -192,7 +249,7 @@ def get_company_info(website_data, website_url):
                 "main_offerings": extract_field_clean(generated_text, "main_offerings", "Products and services related to their industry"),
                 "tagline": tagline[:100] if tagline else "Not found",
                 "summary": f"This appears to be the website for {company_name}. " + 
-                          (website_data['meta_description'] if website_data['meta_description'] else 
+                          (content_summary or website_data['meta_description'] or
                            "The website contains information about their products, services, and company information."),
                 "contact_info": extract_field_clean(generated_text, "contact_info", "Not found"),
                 "social_media": ', '.join(website_data['social_links']) if website_data['social_links'] else "Not found",
@@ -200,7 +257,7 @@ def get_company_info(website_data, website_url):
             }
             return CompanyData(**fallback_data)
             
-    except requests.exceptions.RequestException as e:
+    except HttpError as e:
         return Error(text=f"Error connecting to Hugging Face API: {str(e)}")
     except Exception as e:
         # Fallback to domain-based information if everything else fails
@@ -258,30 +315,57 @@ def extract_field_clean(text, field_name, default_value):
     return default_value
 
 
+@agent.on_event("startup")
+async def startup(ctx: Context):
+    """Drop homepages that have not been revalidated for too long"""
+    removed = page_cache.purge_expired()
+    if removed:
+        ctx.logger.info(f"Purged {removed} expired pages from the page cache")
+
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    """Close pooled HTTP connections and the page cache"""
+    await http_client.close()
+    page_cache.close()
+
+
 @agent.on_message(model=Request)
 async def handle_request(ctx: Context, sender: str, request: Request):
     """Process website URL and return company information"""
     ctx.logger.info(f"Received request to process website: {request.website}")
+    # Scrape and analyze in the background so other websites can be processed meanwhile
+    spawn(process_request(ctx, sender, request), ctx.logger)
+
+
+async def process_request(ctx: Context, sender: str, request: Request):
+    """Scrape a website, extract company information and reply to the sender"""
+    # Concurrent requests for the same site share one scrape and model call; reply with a copy
+    company_data = (await website_flights.do(normalize_url(request.website),
+                                             lambda: analyze_website(ctx, request.website))).copy()
+    
+    # Log the company data before sending
+    if isinstance(company_data, CompanyData):
+        ctx.logger.info(f"Sending company data: {company_data.company_name}")
     
+    # Send response back
+    company_data.request_id = request.request_id
+    await ctx.send(sender, company_data)
+
+
+async def analyze_website(ctx: Context, website):
+    """Extract a website's content and turn it into CompanyData, or an Error"""
     # Extract text from website
-    website_data, url = extract_text_from_website(request.website)
+    website_data, url = await extract_text_from_website(website)
     
     if "error" in website_data:
-        await ctx.send(sender, Error(text=website_data["error"]))
-        return
+        return Error(text=website_data["error"])
     
     ctx.logger.info("Successfully extracted website content")
     
     # Process with Hugging Face model
     ctx.logger.info("Analyzing website content with Hugging Face model...")
-    company_data = get_company_info(website_data, url)
-    
-    # Log the company data before sending
-    if isinstance(company_data, CompanyData):
-        ctx.logger.info(f"Sending company data: {company_data.company_name}")
-    
-    # Send response back
-    await ctx.send(sender, company_data)
+    return await get_company_info(website_data, url)
 
 
 if __name__ == "__main__":